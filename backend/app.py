@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, jsonify, request, Response
+from flask import Flask, jsonify, request, Response, make_response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
@@ -7,12 +7,23 @@ import os
 import sys
 import jwt
 import shutil
+import tempfile
 import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jwt import decode as jwt_decode
 from functools import wraps
 import json
+import re
+import csv
+import io
 import codecs
+import hashlib
+import secrets
+import uuid
+import zlib
 
 # 获取应用程序根目录（兼容PyInstaller打包）
 def get_app_root():
@@ -35,7 +46,9 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key')
 
 # 配置数据库
 import os
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(get_app_root(), 'instance', 'inventory.db')
+# DATABASE_URI可指定其他SQLite数据库（如性能测试使用的临时库）
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URI', 'sqlite:///' + os.path.join(get_app_root(), 'instance', 'inventory.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # 初始化数据库实例
@@ -47,7 +60,7 @@ os.makedirs(os.path.join(app.root_path, 'instance'), exist_ok=True)
 # 设置静态文件目录
 from flask import send_from_directory
 import os
-from sqlalchemy import or_
+from sqlalchemy import or_, and_, case, text, literal_column, insert
 
 # 设置静态文件目录
 frontend_dist_path = os.path.join(get_app_root(), '..', 'frontend', 'dist')
@@ -105,9 +118,21 @@ class User(db.Model):
     password = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # admin/leader/member
     first_login = db.Column(db.Boolean, default=True, nullable=False)  # 标记是否首次登录
+    password_is_default = db.Column(db.Boolean, default=False, nullable=False)  # 是否仍为默认密码或空密码，由设置密码的接口维护
     created_at = db.Column(db.DateTime, default=db.func.now())
     updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
 
+# 刷新令牌模型（只保存令牌的SHA-256，可在服务端撤销）
+class RefreshToken(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    remember = db.Column(db.Boolean, default=False, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.now())
+    last_used_at = db.Column(db.DateTime, nullable=True)
+
 # 表格结构模型
 class TableStructure(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -125,6 +150,16 @@ class InventoryData(db.Model):
     created_at = db.Column(db.DateTime, default=db.func.now())
     updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
 
+    # 复合索引，支持按表格的 (created_at, id) 排序和游标分页
+    __table_args__ = (db.Index('ix_inventory_data_table_created_id', 'table_id', 'created_at', 'id'),)
+
+# 表格数据统计模型（由inventory_data上的触发器在同一事务内维护，见 _TABLE_STATS_DDL）
+class TableStats(db.Model):
+    table_id = db.Column(db.Integer, db.ForeignKey('table_structure.id'), primary_key=True)
+    row_count = db.Column(db.Integer, default=0, nullable=False)
+    last_modified_at = db.Column(db.DateTime, nullable=True)  # 最近一次写入时间：新增/修改取行的updated_at，删除取删除时间
+    data_version = db.Column(db.Integer, default=0, nullable=False)  # 每次新增/修改/删除数据行递增
+
 # 操作日志模型
 class OperationLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -156,6 +191,23 @@ class BugReport(db.Model):
     created_at = db.Column(db.DateTime, default=db.func.now())
     updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
 
+# 后台任务模型（耗时的导入、导出、备份等操作提交为任务，客户端轮询进度）
+class BackgroundJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 十六进制
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending/running/succeeded/failed/cancelled
+    progress = db.Column(db.Integer, default=0, nullable=False)  # 0-100
+    message = db.Column(db.Text, default='')
+    params = db.Column(db.Text, nullable=True)  # JSON格式任务参数
+    result = db.Column(db.Text, nullable=True)  # JSON格式任务结果
+    result_file = db.Column(db.String(500), nullable=True)  # 结果文件路径（导出类任务）
+    result_filename = db.Column(db.String(255), nullable=True)  # 下载时的文件名
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.now())
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
 # 液氮罐模型
 class NitrogenTank(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -188,6 +240,104 @@ class CryoCell(db.Model):
 
     __table_args__ = (db.UniqueConstraint('box_id', 'row', 'col', name='_box_row_col_unique'),)
 
+# 冻存盒数据版本模型（由cryo_cell等表上的触发器维护，用于网格和盒子列表的ETag）
+class CryoBoxStats(db.Model):
+    box_id = db.Column(db.Integer, db.ForeignKey('cryo_box.id'), primary_key=True)
+    data_version = db.Column(db.Integer, default=0, nullable=False)  # 格子、盒子信息或关联名称变化时递增
+
+# ==================== 登录用户缓存 ====================
+
+class AuthenticatedPrincipal:
+    """token_required传给路由的当前用户信息（需要完整User记录的路由自行查询）"""
+    __slots__ = ('id', 'username', 'role', 'first_login')
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.first_login = user.first_login
+
+
+class PrincipalCache:
+    """按用户ID缓存当前用户信息，带TTL和容量上限。
+    每个用户有一个凭据版本，修改角色/密码或删除用户后递增，旧版本的缓存立即失效；
+    多进程部署时其他进程的缓存最多保留TTL秒"""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # user_id -> (凭据版本, principal, 过期时间)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, user_id):
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get(self, user_id):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] == self._versions.get(user_id, 0) and entry[2] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, version, principal):
+        """version需在查询数据库之前取得，查询期间发生的修改会使这条缓存直接失效"""
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (version, principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """递增用户的凭据版本，在修改提交后调用"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0
+            }
+
+
+# PRINCIPAL_CACHE_TTL=0 可关闭缓存
+principal_cache = PrincipalCache(
+    ttl=float(os.environ.get('PRINCIPAL_CACHE_TTL', '30')),
+    max_size=int(os.environ.get('PRINCIPAL_CACHE_SIZE', '1024'))
+)
+
+
+def load_principal(user_id):
+    """获取当前用户信息，优先使用缓存，用户不存在时返回None"""
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    version = principal_cache.version(user_id)
+    user = db.session.get(User, user_id)
+    if not user:
+        return None
+    principal = AuthenticatedPrincipal(user)
+    principal_cache.put(user_id, version, principal)
+    return principal
+
+
 # JWT认证装饰器
 def token_required(f):
     @wraps(f)
@@ -203,7 +353,7 @@ def token_required(f):
         try:
             # 解码token
             data = jwt_decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.filter_by(id=data['user_id']).first()
+            current_user = load_principal(data['user_id'])
             if not current_user:
                 return jsonify({'code': 401, 'message': '用户不存在!', 'data': None}), 401
         except jwt.ExpiredSignatureError:
@@ -215,44 +365,415 @@ def token_required(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
+# ==================== 全文搜索索引（FTS5） ====================
+
+# 设置SEARCH_INDEX_ENABLED=0可关闭全文索引，搜索将回退到逐行JSON扫描
+app.config['SEARCH_INDEX_ENABLED'] = os.environ.get('SEARCH_INDEX_ENABLED', '1') != '0'
+app.config['SEARCH_INDEX_AVAILABLE'] = False
+
+SEARCH_INDEX_TABLE = 'inventory_data_fts'
+
+# 行数据的可搜索文本：存储列只取_text，其余取原子值，末尾附加格式化后的created_at
+_SEARCH_TEXT_SQL = """
+ifnull(CASE WHEN json_valid({row}.data) THEN (
+    SELECT group_concat(
+        CASE
+            WHEN je.type = 'object' AND json_extract(je.value, '$._storage') THEN ifnull(json_extract(je.value, '$._text'), '')
+            WHEN je.type IN ('object', 'array') THEN je.value
+            WHEN je.type IN ('null', 'false') THEN ''
+            WHEN je.type = 'true' THEN 'True'
+            ELSE je.atom
+        END, char(10))
+    FROM json_each({row}.data) AS je
+) ELSE {row}.data END, '') || char(10) || ifnull(strftime('%Y-%m-%d %H:%M:%S', {row}.created_at), '')
+"""
+
+_SEARCH_INDEX_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_INDEX_TABLE} USING fts5(content, tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_INDEX_TABLE}_ai AFTER INSERT ON inventory_data BEGIN
+        INSERT INTO {SEARCH_INDEX_TABLE}(rowid, content) VALUES (NEW.id, {_SEARCH_TEXT_SQL.format(row='NEW')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_INDEX_TABLE}_au AFTER UPDATE OF data, created_at ON inventory_data BEGIN
+        DELETE FROM {SEARCH_INDEX_TABLE} WHERE rowid = OLD.id;
+        INSERT INTO {SEARCH_INDEX_TABLE}(rowid, content) VALUES (NEW.id, {_SEARCH_TEXT_SQL.format(row='NEW')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_INDEX_TABLE}_ad AFTER DELETE ON inventory_data BEGIN
+        DELETE FROM {SEARCH_INDEX_TABLE} WHERE rowid = OLD.id;
+    END""",
+]
+
+
+def rebuild_search_index():
+    """重建全文索引（用于已有数据库或索引损坏时），返回索引行数"""
+    db.session.execute(text(f"DELETE FROM {SEARCH_INDEX_TABLE}"))
+    db.session.execute(text(
+        f"INSERT INTO {SEARCH_INDEX_TABLE}(rowid, content) "
+        f"SELECT inventory_data.id, {_SEARCH_TEXT_SQL.format(row='inventory_data')} FROM inventory_data"
+    ))
+    db.session.commit()
+    return db.session.execute(text(f"SELECT count(*) FROM {SEARCH_INDEX_TABLE}")).scalar()
+
+
+def ensure_search_index():
+    """创建全文索引及维护触发器；SQLite不支持FTS5/trigram时返回False"""
+    if not app.config['SEARCH_INDEX_ENABLED']:
+        return False
+    try:
+        created = db.session.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE name = :name"
+        ), {'name': SEARCH_INDEX_TABLE}).scalar() == 0
+        for ddl in _SEARCH_INDEX_DDL:
+            db.session.execute(text(ddl))
+        db.session.commit()
+        if created:
+            # 新建索引时为已有数据建立索引
+            count = rebuild_search_index()
+            print(f'全文索引已创建，索引 {count} 条数据')
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f'全文索引不可用，搜索将使用逐行扫描: {str(e)}')
+        return False
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """重建库存数据全文索引"""
+    if not ensure_search_index():
+        print('全文索引不可用')
+        return
+    print(f'全文索引重建完成，共 {rebuild_search_index()} 条数据')
+
+
+# ==================== 表格数据统计 ====================
+
+# 数据行的每次写入都由触发器更新统计行，所有写入路径（单条/批量/CSV导入/XLSX导入/删除）自动保持一致
+_TABLE_STATS_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS table_stats_ai AFTER INSERT ON inventory_data BEGIN
+        INSERT INTO table_stats(table_id, row_count, last_modified_at, data_version)
+        VALUES (NEW.table_id, 1, NEW.updated_at, 1)
+        ON CONFLICT(table_id) DO UPDATE SET
+            row_count = row_count + 1,
+            last_modified_at = nullif(max(ifnull(last_modified_at, ''), ifnull(excluded.last_modified_at, '')), ''),
+            data_version = data_version + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS table_stats_au AFTER UPDATE ON inventory_data BEGIN
+        UPDATE table_stats SET
+            last_modified_at = max(ifnull(last_modified_at, ''), ifnull(NEW.updated_at, CURRENT_TIMESTAMP)),
+            data_version = data_version + 1
+        WHERE table_id = NEW.table_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS table_stats_ad AFTER DELETE ON inventory_data BEGIN
+        UPDATE table_stats SET
+            row_count = max(row_count - 1, 0),
+            last_modified_at = max(ifnull(last_modified_at, ''), CURRENT_TIMESTAMP),
+            data_version = data_version + 1
+        WHERE table_id = OLD.table_id;
+    END""",
+    # 删除表格时保留统计行并继续递增数据版本：SQLite会把同一个id分配给之后新建的表格，
+    # 版本从0重新开始会与已删除表格的ETag相同，客户端会继续使用旧表格的缓存
+    """CREATE TRIGGER IF NOT EXISTS table_stats_table_ai AFTER INSERT ON table_structure BEGIN
+        INSERT INTO table_stats(table_id, row_count, data_version) VALUES (NEW.id, 0, 0)
+        ON CONFLICT(table_id) DO UPDATE SET
+            row_count = 0,
+            last_modified_at = NULL,
+            data_version = data_version + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS table_stats_table_ad AFTER DELETE ON table_structure BEGIN
+        UPDATE table_stats SET row_count = 0, last_modified_at = NULL, data_version = data_version + 1
+        WHERE table_id = OLD.id;
+    END""",
+    # 列配置变化会改变数据的返回格式，同样递增数据版本
+    """CREATE TRIGGER IF NOT EXISTS table_stats_table_au AFTER UPDATE ON table_structure BEGIN
+        UPDATE table_stats SET data_version = data_version + 1 WHERE table_id = NEW.id;
+    END""",
+]
+
+
+def rebuild_table_stats():
+    """按inventory_data重新统计所有表格（用于升级已有数据库），数据版本继续递增；
+    已删除表格的统计行保留，避免id被复用后数据版本重复"""
+    db.session.execute(text("""
+        INSERT INTO table_stats(table_id, row_count, last_modified_at, data_version)
+        SELECT table_structure.id, count(inventory_data.id), max(inventory_data.updated_at), 1
+        FROM table_structure LEFT JOIN inventory_data ON inventory_data.table_id = table_structure.id
+        WHERE 1 GROUP BY table_structure.id
+        ON CONFLICT(table_id) DO UPDATE SET
+            row_count = excluded.row_count,
+            last_modified_at = excluded.last_modified_at,
+            data_version = table_stats.data_version + 1
+    """))
+    db.session.commit()
+
+
+def _recreate_triggers(ddl_list):
+    """删除并重新创建触发器，已有数据库升级后也使用最新的触发器定义"""
+    for ddl in ddl_list:
+        name = re.search(r'CREATE TRIGGER IF NOT EXISTS (\w+)', ddl).group(1)
+        db.session.execute(text(f'DROP TRIGGER IF EXISTS {name}'))
+        db.session.execute(text(ddl))
+
+
+def ensure_table_stats():
+    """创建统计维护触发器，首次创建时为已有数据补齐统计"""
+    created = db.session.execute(text(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'table_stats_ai'"
+    )).scalar() == 0
+    _recreate_triggers(_TABLE_STATS_DDL)
+    # 旧版触发器在没有时间时会写入空字符串，DateTime列无法解析
+    db.session.execute(text("UPDATE table_stats SET last_modified_at = NULL WHERE last_modified_at = ''"))
+    db.session.commit()
+    if created:
+        rebuild_table_stats()
+
+
+def get_table_stats(table_id):
+    """读取表格统计行（O(1)），不存在时返回None"""
+    return db.session.get(TableStats, table_id)
+
+
+def _table_stats_dict(stats):
+    if not stats:
+        return {'row_count': 0, 'last_modified_at': None, 'data_version': 0}
+    return {
+        'row_count': stats.row_count,
+        'last_modified_at': stats.last_modified_at.strftime('%Y-%m-%d %H:%M:%S') if stats.last_modified_at else None,
+        'data_version': stats.data_version
+    }
+
+
+# 冻存盒版本：格子增删改、盒子修改，以及网格中显示的液氮罐名称/关联表格名称变化时递增
+_CRYO_BOX_STATS_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS cryo_box_stats_cell_ai AFTER INSERT ON cryo_cell BEGIN
+        INSERT INTO cryo_box_stats(box_id, data_version) VALUES (NEW.box_id, 1)
+        ON CONFLICT(box_id) DO UPDATE SET data_version = data_version + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cryo_box_stats_cell_au AFTER UPDATE ON cryo_cell BEGIN
+        UPDATE cryo_box_stats SET data_version = data_version + 1 WHERE box_id IN (OLD.box_id, NEW.box_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cryo_box_stats_cell_ad AFTER DELETE ON cryo_cell BEGIN
+        UPDATE cryo_box_stats SET data_version = data_version + 1 WHERE box_id = OLD.box_id;
+    END""",
+    # 与表格统计相同，删除盒子时保留版本行，id被复用时版本继续递增
+    """CREATE TRIGGER IF NOT EXISTS cryo_box_stats_box_ai AFTER INSERT ON cryo_box BEGIN
+        INSERT INTO cryo_box_stats(box_id, data_version) VALUES (NEW.id, 0)
+        ON CONFLICT(box_id) DO UPDATE SET data_version = data_version + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cryo_box_stats_box_au AFTER UPDATE ON cryo_box BEGIN
+        UPDATE cryo_box_stats SET data_version = data_version + 1 WHERE box_id = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cryo_box_stats_box_ad AFTER DELETE ON cryo_box BEGIN
+        UPDATE cryo_box_stats SET data_version = data_version + 1 WHERE box_id = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cryo_box_stats_tank_au AFTER UPDATE OF name ON nitrogen_tank BEGIN
+        UPDATE cryo_box_stats SET data_version = data_version + 1
+        WHERE box_id IN (SELECT id FROM cryo_box WHERE tank_id = NEW.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cryo_box_stats_table_au AFTER UPDATE OF table_name ON table_structure BEGIN
+        UPDATE cryo_box_stats SET data_version = data_version + 1
+        WHERE box_id IN (SELECT box_id FROM cryo_cell WHERE linked_table_id = NEW.id);
+    END""",
+]
+
+
+def ensure_cryo_box_stats():
+    """创建冻存盒版本维护触发器，并为已有盒子补齐版本行"""
+    _recreate_triggers(_CRYO_BOX_STATS_DDL)
+    db.session.execute(text("INSERT OR IGNORE INTO cryo_box_stats(box_id, data_version) SELECT id, 0 FROM cryo_box"))
+    db.session.commit()
+
+
+@app.cli.command('rebuild-table-stats')
+def rebuild_table_stats_command():
+    """重新统计各表格的数据行数和数据版本"""
+    ensure_table_stats()
+    rebuild_table_stats()
+    print(f'表格统计重建完成，共 {TableStructure.query.count()} 个表格')
+
+
+# ==================== 用户密码状态 ====================
+
+# 新建用户未提供密码时使用的默认密码
+DEFAULT_PASSWORD = '000000'
+
+# 密码哈希（scrypt/pbkdf2）在有上限的线程池中计算，限制同时进行的KDF数量，
+# 避免批量建用户等操作占满CPU拖慢同一进程中的其他请求
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+_password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+
+
+def hash_passwords(passwords):
+    """在线程池中并行计算多个密码哈希，按输入顺序返回"""
+    from werkzeug.security import generate_password_hash
+    return list(_password_hash_executor.map(generate_password_hash, passwords))
+
+
+def hash_password(password):
+    return hash_passwords([password])[0]
+
+
+def set_user_password(user, password, password_hash=None):
+    """设置用户密码，同时记录是否仍为默认/空密码，登录时无需再用哈希探测。
+    password_hash为已计算好的哈希（批量创建时预先在线程池中计算）"""
+    user.password = password_hash or hash_password(password)
+    user.password_is_default = password in ('', DEFAULT_PASSWORD)
+
+
+def ensure_user_password_state():
+    """为已有数据库补充password_is_default列；升级时对已有用户探测一次哈希回填"""
+    from werkzeug.security import check_password_hash
+    columns = [row[1] for row in db.session.execute(text('PRAGMA table_info("user")'))]
+    if 'password_is_default' in columns:
+        return
+    db.session.execute(text('ALTER TABLE "user" ADD COLUMN password_is_default BOOLEAN NOT NULL DEFAULT 0'))
+    for user_id, password_hash in db.session.execute(text('SELECT id, password FROM "user"')).all():
+        try:
+            is_default = any(check_password_hash(password_hash, pwd) for pwd in (DEFAULT_PASSWORD, ''))
+        except Exception:
+            is_default = password_hash == ''
+        if is_default:
+            db.session.execute(text('UPDATE "user" SET password_is_default = 1 WHERE id = :id'), {'id': user_id})
+    db.session.commit()
+
+
 # 初始化数据库
 with app.app_context():
     db.create_all()
-
-    # 创建默认用户账号
-    from werkzeug.security import generate_password_hash
-    
-    # 创建管理员账号
-    admin_user = User.query.filter_by(username='admin').first()
-    if not admin_user:
-        admin = User(username='admin', password=generate_password_hash('admin123'), role='admin')
-        db.session.add(admin)
-    
-    # 创建组长账号
-    leader_user = User.query.filter_by(username='leader').first()
-    if not leader_user:
-        leader = User(username='leader', password=generate_password_hash('leader123'), role='leader')
-        db.session.add(leader)
-    
-    # 创建成员账号
-    member_user = User.query.filter_by(username='member').first()
-    if not member_user:
-        member = User(username='member', password=generate_password_hash('member123'), role='member')
-        db.session.add(member)
-    
-    # 创建测试机器人账号
-    testbot_user = User.query.filter_by(username='testbot_playwright').first()
-    if not testbot_user:
-        testbot = User(username='testbot_playwright', password=generate_password_hash('000000'), role='member')
-        db.session.add(testbot)
+    ensure_user_password_state()
+    # create_all不会为已存在的表补建索引，这里单独检查创建
+    for index in InventoryData.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    app.config['SEARCH_INDEX_AVAILABLE'] = ensure_search_index()
+    ensure_table_stats()
+    ensure_cryo_box_stats()
+
+    # 创建默认用户账号（管理员、组长、成员、测试机器人），缺少的账号在线程池中并行计算密码哈希
+    default_users = [
+        ('admin', 'admin123', 'admin'),
+        ('leader', 'leader123', 'leader'),
+        ('member', 'member123', 'member'),
+        ('testbot_playwright', DEFAULT_PASSWORD, 'member'),
+    ]
+    existing_usernames = {username for (username,) in db.session.query(User.username).all()}
+    missing_users = [item for item in default_users if item[0] not in existing_usernames]
+    for (username, password, role), password_hash in zip(missing_users, hash_passwords([item[1] for item in missing_users])):
+        default_user = User(username=username, role=role)
+        set_user_password(default_user, password, password_hash)
+        db.session.add(default_user)
     
     db.session.commit()
 
+# ==================== 条件请求（ETag） ====================
+
+# 响应允许浏览器缓存但每次都要带If-None-Match重新验证，数据未变化时服务端返回304
+_ETAG_CACHE_CONTROL = 'private, no-cache'
+
+
+def _make_etag(*parts):
+    """由版本信息生成强ETag"""
+    return hashlib.md5(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+
+def _not_modified(etag):
+    """客户端的ETag仍然有效时返回304响应，否则返回None"""
+    if etag and request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = _ETAG_CACHE_CONTROL
+        return response
+    return None
+
+
+def _with_etag(rv, etag):
+    """为成功响应附加ETag"""
+    response = make_response(rv)
+    if etag and response.status_code == 200:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = _ETAG_CACHE_CONTROL
+    return response
+
+
+def _table_etag(table_id):
+    """表格结构与数据的ETag（数据版本在数据写入和结构修改时都会递增）"""
+    stats = get_table_stats(table_id)
+    return _make_etag('table', table_id, stats.data_version) if stats else None
+
+
+def _cryo_box_etag(box_id):
+    stats = db.session.get(CryoBoxStats, box_id)
+    return _make_etag('cryo_box', box_id, stats.data_version) if stats else None
+
+
 # 健康检查路由
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'code': 200, 'message': 'success', 'data': {'status': 'healthy'}}), 200
 
+_dummy_password_hash = None
+
+
+def _get_dummy_password_hash():
+    """用于不存在用户的哈希，与真实用户使用相同的KDF参数"""
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = hash_password(DEFAULT_PASSWORD)
+    return _dummy_password_hash
+
+
+# ==================== 访问令牌与刷新令牌 ====================
+
+# 访问令牌（JWT）有效期，过期后客户端使用刷新令牌换取新的访问令牌，无需重新校验密码
+ACCESS_TOKEN_TTL = timedelta(hours=1)
+# 刷新令牌有效期：勾选“记住我”时30天，否则1天
+REFRESH_TOKEN_TTL = timedelta(days=1)
+REMEMBER_REFRESH_TOKEN_TTL = timedelta(days=30)
+
+
+def _issue_access_token(user):
+    """生成访问令牌（无状态JWT，token_required只校验签名和有效期）"""
+    return jwt.encode(
+        {
+            'user_id': user.id,
+            'username': user.username,
+            'role': user.role,
+            'exp': datetime.utcnow() + ACCESS_TOKEN_TTL  # 设置token过期时间
+        },
+        app.config['SECRET_KEY'],
+        algorithm='HS256'
+    )
+
+
+def _hash_refresh_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _issue_refresh_token(user_id, remember):
+    """创建刷新令牌记录（不提交），返回明文令牌，明文只下发给客户端一次"""
+    token = secrets.token_urlsafe(32)
+    ttl = REMEMBER_REFRESH_TOKEN_TTL if remember else REFRESH_TOKEN_TTL
+    db.session.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_refresh_token(token),
+        remember=remember,
+        expires_at=datetime.utcnow() + ttl
+    ))
+    return token
+
+
+def purge_refresh_tokens():
+    """删除已过期或已撤销的刷新令牌记录（登录时调用，不提交），避免表无限增长"""
+    RefreshToken.query.filter(or_(
+        RefreshToken.expires_at <= datetime.utcnow(),
+        RefreshToken.revoked_at.isnot(None)
+    )).delete(synchronize_session=False)
+
+
+def revoke_refresh_tokens(user_id):
+    """撤销用户的全部刷新令牌（修改/重置密码、删除用户时调用，不提交）"""
+    RefreshToken.query.filter_by(user_id=user_id, revoked_at=None).update(
+        {'revoked_at': datetime.utcnow()}, synchronize_session=False)
+
+
 # 登录路由
 @app.route('/api/v1/auth/login', methods=['POST'])
 def login():
@@ -265,7 +786,7 @@ def login():
     password = data.get('password')
     remember = data.get('remember', False)
     
-    logger.info(f'登录请求: 用户名={username}, 密码={password}, remember={remember}')
+    logger.info(f'登录请求: 用户名={username}, remember={remember}')
     
     if not username:
         logger.info(f'登录失败: 用户名不能为空')
@@ -274,52 +795,32 @@ def login():
     # 处理密码为空的情况，允许用户使用空密码登录
     password = password or ''
     
+    from werkzeug.security import check_password_hash
+
     user = User.query.filter_by(username=username).first()
     if not user:
+        # 用户不存在时同样执行一次哈希校验，避免通过响应时间判断用户名是否存在
+        check_password_hash(_get_dummy_password_hash(), password)
         logger.info(f'登录失败: 用户名 {username} 不存在')
         return jsonify({'code': 401, 'message': '用户名或密码错误', 'data': None}), 401
-    
-    from werkzeug.security import check_password_hash, generate_password_hash
-
-    # 检查密码是否为空（兼容scrypt等可能抛出异常的hash格式）
-    try:
-        is_empty_password = check_password_hash(user.password, '')
-    except Exception:
-        is_empty_password = (user.password == '')
-    logger.info(f'用户 {username} 的密码哈希: {user.password}')
-    logger.info(f'密码为空? {password == ""}, 是否是初始密码? {is_empty_password}')
 
-    # 测试密码是否匹配（兼容scrypt等可能抛出异常的hash格式）
+    # 每次登录只做一次哈希校验（兼容scrypt等可能抛出异常的hash格式）
     try:
         password_matches = check_password_hash(user.password, password)
     except Exception:
         password_matches = False
-    logger.info(f'密码匹配? {password_matches}')
-
-    # 测试一些常用密码
-    try:
-        for pwd in ['admin123', 'leader123', 'member123', '123456']:
-            if check_password_hash(user.password, pwd):
-                logger.info(f'常用密码 {pwd} 匹配!')
-    except Exception:
-        pass
 
-    # 检查是否使用默认密码登录（兼容scrypt等可能抛出异常的hash格式）
-    try:
-        is_default_password = check_password_hash(user.password, '000000')
-    except Exception:
-        is_default_password = False
-    logger.info(f'是否使用默认密码? {is_default_password}, 密码是000000? {password == "000000"}')
+    # 是否仍为默认/空密码由设置密码的接口记录在用户上，不再通过哈希探测
+    is_default_password = user.password_is_default
 
-    # 进行密码验证（兼容scrypt等可能抛出异常的hash格式）
-    # 豁免条件：用户首次登录且密码是默认密码'000000'，允许空密码登录去重置
+    # 豁免条件：用户首次登录且仍为默认密码，允许空密码登录去重置
     is_first_login_with_default = user.first_login and is_default_password
     if not password_matches and not is_first_login_with_default:
         logger.info(f'登录失败: 用户名 {username} 的密码不正确')
         return jsonify({'code': 401, 'message': '用户名或密码错误', 'data': None}), 401
 
     # 如果是首次登录或使用默认密码登录，需要重置密码
-    if user.first_login or (is_default_password and password == "000000"):
+    if user.first_login or (is_default_password and password_matches):
         logger.info(f'首次登录或使用默认密码: 用户 {username} 需要重置密码')
         # 记录初始登录尝试
         try:
@@ -343,38 +844,33 @@ def login():
     
     logger.info(f'登录成功: 用户名 {username}')
     
-    # 根据remember参数设置token过期时间
-    if remember:
-        # 30天内免登录
-        expires_in = timedelta(days=30)
-    else:
-        # 1小时过期
-        expires_in = timedelta(hours=1)
-    
     # 生成JWT token (使用PyJWT 2.x的正确API)
     try:
-        token = jwt.encode(
-            {
-                'user_id': user.id,
-                'username': user.username,
-                'role': user.role,
-                'exp': datetime.utcnow() + expires_in  # 设置token过期时间
-            }, 
-            app.config['SECRET_KEY'], 
-            algorithm='HS256'
-        )
-        logger.info(f'成功生成token: {token}, 过期时间: {expires_in}')
+        token = _issue_access_token(user)
+        logger.info(f'成功生成token, 过期时间: {ACCESS_TOKEN_TTL}')
     except Exception as e:
         logger.error(f'生成token失败: {e}')
         # 如果JWT生成失败，使用一个简单的token
         token = f"simple-token-{user.id}-{datetime.utcnow().timestamp()}"
         logger.info(f'使用简化token: {token}')
     
+    # 刷新令牌：根据remember参数设置有效期
+    try:
+        purge_refresh_tokens()
+        refresh_token = _issue_refresh_token(user.id, bool(remember))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f'生成刷新令牌失败: {e}')
+        refresh_token = None
+    
     return jsonify({
         'code': 200,
         'message': '登录成功',
         'data': {
             'token': token,
+            'refresh_token': refresh_token,
+            'expires_in': int(ACCESS_TOKEN_TTL.total_seconds()),
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -384,22 +880,90 @@ def login():
         }
     }), 200
 
+# 刷新访问令牌：校验刷新令牌记录后签发新的访问令牌，并轮换刷新令牌
+@app.route('/api/v1/auth/refresh', methods=['POST'])
+def refresh_access_token():
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get('refresh_token')
+    if not refresh_token:
+        return jsonify({'code': 400, 'message': '刷新令牌不能为空', 'data': None}), 400
+    
+    record = RefreshToken.query.filter_by(token_hash=_hash_refresh_token(refresh_token)).first()
+    if not record or record.revoked_at or record.expires_at <= datetime.utcnow():
+        return jsonify({'code': 401, 'message': '刷新令牌无效或已过期，请重新登录', 'data': None}), 401
+    
+    user = db.session.get(User, record.user_id)
+    if not user:
+        return jsonify({'code': 401, 'message': '用户不存在!', 'data': None}), 401
+    
+    try:
+        # 旧刷新令牌立即作废，新令牌沿用原来的有效期类型。
+        # 条件更新保证同一令牌并发刷新时只有一个请求成功，其余请求按已撤销处理
+        now = datetime.utcnow()
+        revoked = RefreshToken.query.filter_by(id=record.id, revoked_at=None).update(
+            {'revoked_at': now, 'last_used_at': now}, synchronize_session=False)
+        if not revoked:
+            db.session.rollback()
+            return jsonify({'code': 401, 'message': '刷新令牌无效或已过期，请重新登录', 'data': None}), 401
+        new_refresh_token = _issue_refresh_token(user.id, record.remember)
+        token = _issue_access_token(user)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'code': 500, 'message': f'刷新令牌失败: {str(e)}', 'data': None}), 500
+    
+    return jsonify({
+        'code': 200,
+        'message': 'success',
+        'data': {
+            'token': token,
+            'refresh_token': new_refresh_token,
+            'expires_in': int(ACCESS_TOKEN_TTL.total_seconds())
+        }
+    }), 200
+
+# 退出登录：撤销刷新令牌
+@app.route('/api/v1/auth/logout', methods=['POST'])
+def logout():
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get('refresh_token')
+    if refresh_token:
+        try:
+            RefreshToken.query.filter_by(token_hash=_hash_refresh_token(refresh_token), revoked_at=None).update(
+                {'revoked_at': datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'code': 500, 'message': f'退出登录失败: {str(e)}', 'data': None}), 500
+    return jsonify({'code': 200, 'message': '退出登录成功', 'data': None}), 200
+
 # 获取当前用户信息
 @app.route('/api/v1/auth/me', methods=['GET'])
 @token_required
 def get_current_user(current_user):
+    user = db.session.get(User, current_user.id)
+    if not user:
+        return jsonify({'code': 401, 'message': '用户不存在!', 'data': None}), 401
     return jsonify({
         'code': 200,
         'message': 'success',
         'data': {
-            'id': current_user.id,
-            'username': current_user.username,
-            'role': current_user.role,
-            'created_at': current_user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': current_user.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+            'id': user.id,
+            'username': user.username,
+            'role': user.role,
+            'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'updated_at': user.updated_at.strftime('%Y-%m-%d %H:%M:%S')
         }
     }), 200
 
+# 登录用户缓存统计（仅管理员）
+@app.route('/api/v1/auth/principal-cache', methods=['GET'])
+@token_required
+def get_principal_cache_stats(current_user):
+    if current_user.role != 'admin':
+        return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
+    return jsonify({'code': 200, 'message': 'success', 'data': principal_cache.stats()}), 200
+
 # 重置密码路由
 @app.route('/api/v1/auth/reset-password', methods=['POST'])
 def reset_password():
@@ -467,9 +1031,9 @@ def reset_password():
         
         # 更新密码
         logger.info(f'更新用户 {username} 的密码')
-        from werkzeug.security import generate_password_hash
-        user.password = generate_password_hash(new_password)
+        set_user_password(user, new_password)
         user.first_login = False  # 标记为非首次登录
+        revoke_refresh_tokens(user.id)
         
         # 打印用户更新后的信息
         logger.debug(f'用户更新后: password_hash={user.password[:20]}..., first_login={user.first_login}')
@@ -478,6 +1042,7 @@ def reset_password():
         logger.info('开始提交到数据库')
         try:
             db.session.commit()
+            principal_cache.invalidate(user.id)
             logger.info(f'用户 {username} 密码重置成功！')
             return jsonify({
                 'code': 200,
@@ -556,15 +1121,12 @@ def add_user(current_user):
     if role not in ['admin', 'leader', 'member']:
         return jsonify({'code': 400, 'message': '角色必须是admin、leader或member', 'data': None}), 400
     
-    # 创建新用户
-    from werkzeug.security import generate_password_hash
-    # 设置默认密码为"000000"如果未提供
-    hashed_password = generate_password_hash(password or '000000')
+    # 创建新用户，未提供密码时使用默认密码
     new_user = User(
         username=username,
-        password=hashed_password,
         role=role
     )
+    set_user_password(new_user, password or DEFAULT_PASSWORD)
     
     try:
         db.session.add(new_user)
@@ -583,6 +1145,77 @@ def add_user(current_user):
         db.session.rollback()
         return jsonify({'code': 500, 'message': f'创建用户失败: {str(e)}', 'data': None}), 500
 
+# 批量创建用户的数量上限
+USER_BATCH_LIMIT = 500
+
+# 批量创建用户：密码哈希在线程池中并行计算，所有用户在同一事务中插入
+@app.route('/api/v1/users/batch', methods=['POST'])
+@token_required
+def batch_add_users(current_user):
+    # 只有管理员可以创建用户
+    if current_user.role != 'admin':
+        return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
+    
+    data = request.get_json(silent=True) or {}
+    users = data.get('users')
+    if not users or not isinstance(users, list):
+        return jsonify({'code': 400, 'message': '用户列表不能为空', 'data': None}), 400
+    if len(users) > USER_BATCH_LIMIT:
+        return jsonify({'code': 400, 'message': f'一次最多创建{USER_BATCH_LIMIT}个用户', 'data': None}), 400
+    
+    # 逐个校验，记录每个用户的结果
+    results = []
+    valid = []  # [(结果序号, 用户名, 密码, 角色)]
+    usernames = [item.get('username') for item in users
+                 if isinstance(item, dict) and isinstance(item.get('username'), str) and item.get('username')]
+    existing_usernames = {username for (username,) in db.session.query(User.username).filter(User.username.in_(usernames)).all()}
+    seen = set()
+    for i, item in enumerate(users):
+        username = item.get('username') if isinstance(item, dict) else None
+        result = {'index': i, 'username': username, 'success': False, 'id': None, 'message': ''}
+        results.append(result)
+        if not username or not item.get('role'):
+            result['message'] = '用户名和角色不能为空'
+        elif not isinstance(username, str):
+            result['message'] = '用户名必须是字符串'
+        elif item.get('password') is not None and not isinstance(item['password'], str):
+            result['message'] = '密码必须是字符串'
+        elif item['role'] not in ['admin', 'leader', 'member']:
+            result['message'] = '角色必须是admin、leader或member'
+        elif username in existing_usernames:
+            result['message'] = '用户名已存在'
+        elif username in seen:
+            result['message'] = '用户名在本次提交中重复'
+        else:
+            seen.add(username)
+            valid.append((i, username, item.get('password') or DEFAULT_PASSWORD, item['role']))
+    
+    try:
+        password_hashes = hash_passwords([password for _, _, password, _ in valid])
+        new_users = []
+        for (i, username, password, role), password_hash in zip(valid, password_hashes):
+            new_user = User(username=username, role=role)
+            set_user_password(new_user, password, password_hash)
+            db.session.add(new_user)
+            new_users.append((i, new_user))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'code': 500, 'message': f'批量创建用户失败: {str(e)}', 'data': None}), 500
+    
+    for i, new_user in new_users:
+        results[i].update({'success': True, 'id': new_user.id, 'message': '创建成功'})
+    success_count = len(new_users)
+    return jsonify({
+        'code': 200,
+        'message': f'批量创建用户完成，成功{success_count}个，失败{len(results) - success_count}个',
+        'data': {
+            'success_count': success_count,
+            'error_count': len(results) - success_count,
+            'results': results
+        }
+    }), 200
+
 # 更新用户
 @app.route('/api/v1/users/<int:user_id>', methods=['PUT'])
 @token_required
@@ -601,8 +1234,8 @@ def update_user(current_user, user_id):
     
     # 更新密码
     if password:
-        from werkzeug.security import generate_password_hash
-        user.password = generate_password_hash(password)
+        set_user_password(user, password)
+        revoke_refresh_tokens(user.id)
     
     # 更新角色
     if role:
@@ -612,6 +1245,7 @@ def update_user(current_user, user_id):
     
     try:
         db.session.commit()
+        principal_cache.invalidate(user.id)
         return jsonify({
             'code': 200,
             'message': '用户更新成功',
@@ -647,8 +1281,10 @@ def delete_user(current_user, user_id):
         return jsonify({'code': 400, 'message': '不能删除admin用户', 'data': None}), 400
     
     try:
+        RefreshToken.query.filter_by(user_id=user_id).delete()
         db.session.delete(user)
         db.session.commit()
+        principal_cache.invalidate(user_id)
         return jsonify({'code': 200, 'message': '用户删除成功', 'data': None}), 200
     except Exception as e:
         db.session.rollback()
@@ -673,6 +1309,8 @@ def create_table_structure(current_user):
     for column in columns:
         if not column.get('column_name') or not column.get('data_type'):
             return jsonify({'code': 400, 'message': '每一列都必须有列名和数据类型', 'data': None}), 400
+        if column.get('indexed') and '"' in column['column_name']:
+            return jsonify({'code': 400, 'message': '建立索引的列名不能包含双引号', 'data': None}), 400
         # 为没有hidden属性的列设置默认值
         if 'hidden' not in column:
             column['hidden'] = False
@@ -686,6 +1324,9 @@ def create_table_structure(current_user):
             columns=columns_json
         )
         db.session.add(new_table)
+        db.session.flush()
+        # 为标记为indexed的列创建表达式索引
+        sync_column_indexes(new_table.id, columns)
         db.session.commit()
         
         return jsonify({
@@ -707,7 +1348,17 @@ def create_table_structure(current_user):
 @app.route('/api/v1/tables', methods=['GET'])
 @token_required
 def get_table_structures(current_user):
+    versions = db.session.execute(text(
+        "SELECT table_structure.id, table_stats.data_version FROM table_structure "
+        "LEFT JOIN table_stats ON table_stats.table_id = table_structure.id ORDER BY table_structure.id"
+    )).all()
+    etag = _make_etag('tables', [tuple(row) for row in versions])
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    
     tables = TableStructure.query.all()
+    stats_map = {stats.table_id: stats for stats in TableStats.query.all()}
     tables_data = []
     
     for table in tables:
@@ -716,27 +1367,33 @@ def get_table_structures(current_user):
             'table_name': table.table_name,
             'columns': json.loads(table.columns),
             'created_at': table.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': table.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+            'updated_at': table.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'stats': _table_stats_dict(stats_map.get(table.id))
         })
     
-    return jsonify({
+    return _with_etag((jsonify({
         'code': 200,
         'message': 'success',
         'data': {
             'items': tables_data,
             'total': len(tables_data)
         }
-    }), 200
+    }), 200), etag)
 
 # 获取表格结构详情
 @app.route('/api/v1/tables/<int:table_id>', methods=['GET'])
 @token_required
 def get_table_structure_detail(current_user, table_id):
+    etag = _table_etag(table_id)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    
     table = TableStructure.query.get(table_id)
     if not table:
         return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
     
-    return jsonify({
+    return _with_etag((jsonify({
         'code': 200,
         'message': 'success',
         'data': {
@@ -744,9 +1401,10 @@ def get_table_structure_detail(current_user, table_id):
             'table_name': table.table_name,
             'columns': json.loads(table.columns),
             'created_at': table.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': table.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+            'updated_at': table.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'stats': _table_stats_dict(get_table_stats(table.id))
         }
-    }), 200
+    }), 200), etag)
 
 # 更新表格结构
 @app.route('/api/v1/tables/<int:table_id>', methods=['PUT'])
@@ -775,56 +1433,28 @@ def update_table_structure(current_user, table_id):
         for column in columns:
             if not column.get('column_name') or not column.get('data_type'):
                 return jsonify({'code': 400, 'message': '每一列都必须有列名和数据类型', 'data': None}), 400
+            if column.get('indexed') and '"' in column['column_name']:
+                return jsonify({'code': 400, 'message': '建立索引的列名不能包含双引号', 'data': None}), 400
             # 为没有hidden属性的列设置默认值
             if 'hidden' not in column:
                 column['hidden'] = False
         
         table.columns = json.dumps(columns)
         
-        # 获取该表格所有数据，用于处理自增列
-        inventory_data_list = InventoryData.query.filter_by(table_id=table_id).all()
-        
-        # 处理自增列的自增序列
+        # 处理自增列的自增序列：现有数据中的最大编号在SQL中计算
         for column in columns:
             if column.get('autoIncrement'):
                 column_name = column['column_name']
-                prefix = column.get('prefix', '')
-                
-                # 查找现有数据中该列的最大值
-                max_value = 0
-                import re
-                pattern = re.compile(f'^{re.escape(prefix)}(\d+)$')
+                max_value = auto_increment_max_value(table_id, column_name, column.get('prefix', ''))
                 
-                for inventory_data in inventory_data_list:
-                    data_json = json.loads(inventory_data.data)
-                    if column_name in data_json:
-                        value = data_json[column_name]
-                        match = pattern.match(value)
-                        if match:
-                            numeric_part = int(match.group(1))
-                            if numeric_part > max_value:
-                                max_value = numeric_part
-                
-                # 获取或创建自增序列
-                sequence = AutoIncrementSequence.query.filter_by(
-                    table_id=table_id,
-                    column_name=column_name
-                ).first()
-                
-                if not sequence:
-                    # 创建新的自增序列
-                    sequence = AutoIncrementSequence(
-                        table_id=table_id,
-                        column_name=column_name,
-                        current_value=max_value
-                    )
-                    db.session.add(sequence)
-                else:
-                    # 更新现有序列的当前值
-                    sequence.current_value = max_value
+                # 获取或创建自增序列并更新当前值
+                reset_auto_increment(table_id, column_name, max_value)
     
     try:
+        if columns:
+            sync_column_indexes(table.id, columns)
         db.session.commit()
+        invalidate_table_schema(table.id)
         return jsonify({
             'code': 200,
             'message': '表格结构更新成功',
@@ -859,66 +1489,23 @@ def check_auto_increment(current_user, table_id):
     if not column_name:
         return jsonify({'code': 400, 'message': '列名不能为空', 'data': None}), 400
     
-    # 获取该表格所有数据
-    inventory_data_list = InventoryData.query.filter_by(table_id=table_id).all()
-    
-    # 用于验证的数据列表
-    column_values = []
-    numeric_values = []
-    existing_prefixes = set()
-    
-    # 正则表达式：前缀+数字组合
-    import re
-    pattern = re.compile(f'^(.+?)(\d+)$')
-    
-    # 如果没有输入前缀，先检测现有数据的前缀
-    detected_prefix = prefix
-    if not prefix and inventory_data_list:
-        # 先从第一条数据中提取前缀
-        first_data = inventory_data_list[0]
-        data_json = json.loads(first_data.data)
-        if column_name in data_json:
-            value = data_json[column_name]
-            match = pattern.match(value)
-            if match:
-                detected_prefix = match.group(1)
-    
-    for inventory_data in inventory_data_list:
-        data_json = json.loads(inventory_data.data)
-        if column_name in data_json:
-            value = data_json[column_name]
-            column_values.append(value)
-            
-            # 验证格式：前缀+数字组合
-            match = pattern.match(value)
-            if not match:
-                return jsonify({'code': 400, 'message': f'列 {column_name} 中存在不符合格式的数据: {value}。数据必须符合 [前缀字符串][数字] 格式。', 'data': None}), 400
-            
-            # 提取前缀和数字部分
-            actual_prefix = match.group(1)
-            numeric_part = match.group(2)
-            
-            existing_prefixes.add(actual_prefix)
-            
-            # 验证前缀是否与检测到的前缀匹配
-            if actual_prefix != detected_prefix:
-                return jsonify({'code': 400, 'message': f'列 {column_name} 中数据的前缀与预期前缀不匹配。现有数据的前缀为: {actual_prefix}，预期前缀为: {detected_prefix}。', 'data': None}), 400
-            
-            numeric_values.append(int(numeric_part))
+    # 在SQL中统计该列数据，不再逐行加载解析
+    stats = auto_increment_column_stats(table_id, column_name, prefix)
     
-    # 验证唯一性
-    if len(column_values) != len(set(column_values)):
-        return jsonify({'code': 400, 'message': f'列 {column_name} 中存在重复数据。请重新整理数据，确保所有数据唯一。', 'data': None}), 400
+    # 验证格式：前缀+数字组合
+    if stats['invalid_value'] is not None:
+        return jsonify({'code': 400, 'message': f'列 {column_name} 中存在不符合格式的数据: {stats["invalid_value"]}。数据必须符合 [前缀字符串][数字] 格式。', 'data': None}), 400
     
-    # 计算最大数字值
-    max_value = max(numeric_values) if numeric_values else 0
+    # 验证前缀是否与检测到的前缀匹配
+    if stats['mismatched_prefix'] is not None:
+        return jsonify({'code': 400, 'message': f'列 {column_name} 中数据的前缀与预期前缀不匹配。现有数据的前缀为: {stats["mismatched_prefix"]}，预期前缀为: {stats["prefix"]}。', 'data': None}), 400
     
-    # 如果数据量大于0，检查现有数据的前缀是否一致
-    if len(existing_prefixes) > 1:
-        return jsonify({'code': 400, 'message': f'列 {column_name} 中数据的前缀不一致。现有数据包含多种前缀: {list(existing_prefixes)}。请重新整理数据，确保所有数据使用统一的前缀。', 'data': None}), 400
+    # 验证唯一性
+    if stats['total'] != stats['distinct_total']:
+        return jsonify({'code': 400, 'message': f'列 {column_name} 中存在重复数据。请重新整理数据，确保所有数据唯一。', 'data': None}), 400
     
     # 返回检测到的前缀和最大数字值
-    return jsonify({'code': 200, 'message': '数据符合要求', 'data': {'max_value': max_value, 'prefix': detected_prefix}}), 200
+    return jsonify({'code': 200, 'message': '数据符合要求', 'data': {'max_value': stats['max_value'], 'prefix': stats['prefix']}}), 200
 
 # 删除表格结构
 @app.route('/api/v1/tables/<int:table_id>', methods=['DELETE'])
@@ -937,7 +1524,11 @@ def delete_table_structure(current_user, table_id):
         InventoryData.query.filter_by(table_id=table_id).delete()
         # 删除表格结构
         db.session.delete(table)
+        # 删除该表格的列表达式索引
+        sync_column_indexes(table_id, None)
         db.session.commit()
+        invalidate_table_schema(table_id)
+        auto_increment_blocks.invalidate(table_id)
         
         return jsonify({'code': 200, 'message': '表格结构删除成功', 'data': None}), 200
     except Exception as e:
@@ -953,20 +1544,247 @@ def delete_all_tables(current_user):
         return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
     
     try:
+        table_ids = [table_id for (table_id,) in db.session.query(TableStructure.id).all()]
         # 删除所有关联的库存数据
         InventoryData.query.delete()
         # 删除所有自增序列
         AutoIncrementSequence.query.delete()
         # 删除所有表格结构
         TableStructure.query.delete()
+        # 删除所有列表达式索引
+        for table_id in table_ids:
+            sync_column_indexes(table_id, None)
         db.session.commit()
+        invalidate_table_schema()
+        auto_increment_blocks.invalidate()
         
         return jsonify({'code': 200, 'message': '所有表格结构删除成功', 'data': None}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'code': 500, 'message': f'删除所有表格结构失败: {str(e)}', 'data': None}), 500
 
+# ==================== 表格结构注册表 ====================
+
+class CompiledTableSchema:
+    """编译后的表格结构：列配置只解析一次，存储列、自增列和各列的类型转换预先整理好。
+    columns等属性在多个请求间共享，调用方不能修改"""
+
+    def __init__(self, table):
+        self.table_id = table.id
+        self.version = table.updated_at
+        self.raw_columns = table.columns
+        self.columns = json.loads(table.columns)
+        self.column_names = [col['column_name'] for col in self.columns]
+        self.columns_by_name = {col['column_name']: col for col in self.columns}
+        self.storage_columns = [col['column_name'] for col in self.columns if col.get('is_storage')]
+        # 自增列：(列名, 前缀, 匹配“前缀+数字”的正则)
+        self.auto_increment_columns = [
+            (col['column_name'], col.get('prefix', ''), re.compile(f'^{re.escape(col.get("prefix", ""))}(\\d+)$'))
+            for col in self.columns if col.get('autoIncrement')
+        ]
+        self.coercers = {col['column_name']: _make_column_coercer(col) for col in self.columns}
+
+
+# 按表格ID缓存的已编译结构
+_table_schemas = {}
+
+
+def get_table_schema(table):
+    """获取表格的已编译结构。以 (表格ID, updated_at) 作为版本；updated_at只精确到秒，
+    因此同时比较列配置原文，避免同一秒内的多次修改命中旧结构"""
+    schema = _table_schemas.get(table.id)
+    if schema is None or schema.version != table.updated_at or schema.raw_columns != table.columns:
+        schema = CompiledTableSchema(table)
+        _table_schemas[table.id] = schema
+    return schema
+
+
+def invalidate_table_schema(table_id=None):
+    """表格结构修改/删除/导入后清除缓存，table_id为None时清除全部"""
+    if table_id is None:
+        _table_schemas.clear()
+    else:
+        _table_schemas.pop(table_id, None)
+
+
+# ==================== 自增序列 ====================
+
+# 自增列预留块大小：大于1时每个进程一次预留一段编号缓存在内存中，减少对序列行的写入。
+# 启用后编号在进程间交错，进程退出时未用完的编号会被跳过。默认为0（不缓存）
+app.config['AUTO_INCREMENT_BLOCK_SIZE'] = int(os.environ.get('AUTO_INCREMENT_BLOCK_SIZE', '0'))
+
+_ENSURE_AUTO_INCREMENT_SQL = text("""
+    INSERT INTO auto_increment_sequence (table_id, column_name, current_value, created_at, updated_at)
+    VALUES (:table_id, :column_name, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT (table_id, column_name) DO NOTHING
+""")
+
+_RESERVE_AUTO_INCREMENT_SQL = text("""
+    UPDATE auto_increment_sequence
+    SET current_value = current_value + :count, updated_at = CURRENT_TIMESTAMP
+    WHERE table_id = :table_id AND column_name = :column_name
+    RETURNING current_value
+""")
+
+
+def _reserve_auto_increment(connection, table_id, column_name, count):
+    """把序列原子地推进 count，返回预留区间的第一个值"""
+    params = {'table_id': table_id, 'column_name': column_name, 'count': count}
+    connection.execute(_ENSURE_AUTO_INCREMENT_SQL, params)
+    end = connection.execute(_RESERVE_AUTO_INCREMENT_SQL, params).scalar()
+    return end - count + 1
+
+
+class AutoIncrementBlockCache:
+    """本进程预先预留的自增编号区间，按 (表格ID, 列名) 缓存"""
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._blocks = {}  # (表格ID, 列名) -> [下一个可用值, 区间最后一个值]
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.block_size > 1
+
+    def allocate(self, table_id, column_name, count):
+        key = (table_id, column_name)
+        with self._lock:
+            block = self._blocks.get(key)
+            if not block or block[1] - block[0] + 1 < count:
+                # 在独立事务中预留并立即提交，调用方事务回滚不会让已缓存的编号被重复分配
+                size = max(count, self.block_size)
+                with db.engine.begin() as connection:
+                    start = _reserve_auto_increment(connection, table_id, column_name, size)
+                block = [start, start + size - 1]
+                self._blocks[key] = block
+            start = block[0]
+            block[0] += count
+            return start
+
+    def invalidate(self, table_id=None):
+        with self._lock:
+            if table_id is None:
+                self._blocks.clear()
+            else:
+                for key in [key for key in self._blocks if key[0] == table_id]:
+                    del self._blocks[key]
+
+
+auto_increment_blocks = AutoIncrementBlockCache(app.config['AUTO_INCREMENT_BLOCK_SIZE'])
+
+
+def _session_has_writes():
+    """当前会话的事务中是否已有写入。pysqlite在第一条写语句前才开始事务，
+    此时会话连接持有SQLite写锁，其他连接的写事务要等它提交"""
+    session = db.session()
+    if not session.in_transaction():
+        return False
+    return getattr(session.connection().connection.driver_connection, 'in_transaction', True)
+
+
+def allocate_auto_increment_range(table_id, column_name, count):
+    """为自增列预留 count 个连续值，返回第一个值。
+    在当前事务中用一条 UPDATE ... RETURNING 完成递增和读取，并发请求不会拿到重叠的区间；
+    启用预留块缓存时从本进程缓存中分配。缓存预留块使用独立连接，
+    调用方事务中已有写入时（如导入时先重置了序列）改为在当前事务中预留，避免等待自己持有的写锁"""
+    if auto_increment_blocks.enabled and not _session_has_writes():
+        return auto_increment_blocks.allocate(table_id, column_name, count)
+    return _reserve_auto_increment(db.session, table_id, column_name, count)
+
+
+def reset_auto_increment(table_id, column_name, value, only_forward=False):
+    """把序列当前值设为 value（按现有数据重新计算最大编号后调用）。
+    启用预留块缓存时其他进程可能仍持有已预留的编号，此时只前进不后退"""
+    auto_increment_blocks.invalidate(table_id)
+    params = {'table_id': table_id, 'column_name': column_name, 'value': value}
+    db.session.execute(_ENSURE_AUTO_INCREMENT_SQL, params)
+    if only_forward or auto_increment_blocks.enabled:
+        new_value = 'MAX(current_value, :value)'
+    else:
+        new_value = ':value'
+    db.session.execute(text(f"""
+        UPDATE auto_increment_sequence SET current_value = {new_value}, updated_at = CURRENT_TIMESTAMP
+        WHERE table_id = :table_id AND column_name = :column_name
+    """), params)
+
+
+# 自增列取值子查询：只取存在该列的行，p 为按 [前缀][数字] 拆出的前缀（不符合格式时为NULL），
+# 与 ^(.+?)(\d+)$ 的拆分方式一致：末尾连续数字为编号，前缀至少一个字符
+_AUTO_INCREMENT_VALUES_SQL = """
+    WITH vals AS (
+        SELECT id, {value_sql} AS v FROM inventory_data WHERE table_id = :table_id
+    ), parsed AS (
+        SELECT id, v, CASE
+            WHEN typeof(v) <> 'text' OR length(v) < 2 OR rtrim(v, '0123456789') = v THEN NULL
+            WHEN rtrim(v, '0123456789') = '' THEN substr(v, 1, 1)
+            ELSE rtrim(v, '0123456789')
+        END AS p
+        FROM vals WHERE v IS NOT NULL
+    )
+"""
+
+
+def _auto_increment_values_sql(column_name, select_sql):
+    value_sql = _column_value_sql({'column_name': column_name}, typed=False)
+    return text(_AUTO_INCREMENT_VALUES_SQL.format(value_sql=value_sql) + select_sql)
+
+
+def auto_increment_max_value(table_id, column_name, prefix):
+    """在SQL中计算自增列现有数据的最大编号，只统计“prefix+数字”格式的值"""
+    return db.session.execute(_auto_increment_values_sql(column_name, """
+        SELECT MAX(CAST(substr(v, :start) AS INTEGER)) FROM vals
+        WHERE typeof(v) = 'text' AND length(v) >= :start
+          AND substr(v, 1, :start - 1) = :prefix AND substr(v, :start) NOT GLOB '*[^0-9]*'
+    """), {'table_id': table_id, 'prefix': prefix, 'start': len(prefix) + 1}).scalar() or 0
+
+
+def auto_increment_column_stats(table_id, column_name, prefix=''):
+    """在SQL中检查自增列现有数据：值的个数与去重个数、第一个不符合格式的值、
+    前缀（未指定时取第一条数据的前缀）、第一个前缀不一致的值及最大编号"""
+    params = {'table_id': table_id}
+    total, distinct_total, invalid_value, first_prefix = db.session.execute(_auto_increment_values_sql(column_name, """
+        SELECT COUNT(*), COUNT(DISTINCT v),
+               (SELECT v FROM parsed WHERE p IS NULL ORDER BY id LIMIT 1),
+               (SELECT p FROM parsed ORDER BY id LIMIT 1)
+        FROM parsed
+    """), params).one()
+    params['prefix'] = prefix or first_prefix or ''
+    mismatched_prefix, max_value = db.session.execute(_auto_increment_values_sql(column_name, """
+        SELECT (SELECT p FROM parsed WHERE p <> :prefix ORDER BY id LIMIT 1),
+               MAX(CAST(substr(v, length(p) + 1) AS INTEGER))
+        FROM parsed WHERE p = :prefix
+    """), params).one()
+    return {
+        'total': total,
+        'distinct_total': distinct_total,
+        'invalid_value': invalid_value,
+        'prefix': params['prefix'],
+        'mismatched_prefix': mismatched_prefix,
+        'max_value': max_value or 0
+    }
+
+
 # 添加库存数据
+def _linked_cell_json(table, columns, data_id, row_obj):
+    """构造关联到库存数据行的冻存格内容（存储列只保留显示文本）"""
+    row_data = {}
+    for k, v in row_obj.items():
+        if isinstance(v, dict) and v.get('_storage'):
+            row_data[k] = v.get('_text', '')
+        else:
+            row_data[k] = v
+    cell_data = {
+        '_linked': True,
+        '_table_id': table.id,
+        '_data_id': data_id,
+        '_table_name': table.table_name,
+        '_table_columns': columns,
+        '_row_data': row_data
+    }
+    return json.dumps(cell_data, ensure_ascii=False)
+
+
 @app.route('/api/v1/tables/<int:table_id>/data', methods=['POST'])
 @token_required
 def add_inventory_data(current_user, table_id):
@@ -982,64 +1800,37 @@ def add_inventory_data(current_user, table_id):
         return jsonify({'code': 400, 'message': '数据格式错误', 'data': None}), 400
     
     # 获取表格列配置
-    columns = json.loads(table.columns)
+    schema = get_table_schema(table)
+    columns = schema.columns
     
-    # 处理自增列
-    for column in columns:
-        if column.get('autoIncrement'):
-            column_name = column['column_name']
-            prefix = column.get('prefix', '')
-
-            # 获取或创建自增序列
-            sequence = AutoIncrementSequence.query.filter_by(
-                table_id=table_id,
-                column_name=column_name
-            ).first()
-
-            if not sequence:
-                # 创建新的自增序列
-                sequence = AutoIncrementSequence(
-                    table_id=table_id,
-                    column_name=column_name,
-                    current_value=0
-                )
-                db.session.add(sequence)
-
-            # 递增序列值
-            sequence.current_value += 1
-
-            # 生成自增值
-            auto_value = f"{prefix}{sequence.current_value}"
-
-            # 将自增值添加到数据中
-            inventory_data[column_name] = auto_value
+    # 处理自增列：原子地预留一个编号，与数据在同一事务中提交
+    for column_name, prefix, _ in schema.auto_increment_columns:
+        inventory_data[column_name] = f"{prefix}{allocate_auto_increment_range(table_id, column_name, 1)}"
 
     # 验证并处理存储列
     storage_positions_to_link = []  # [(column_name, position_info), ...]
-    for column in columns:
-        if column.get('is_storage'):
-            col_name = column['column_name']
-            storage_data = inventory_data.get(col_name)
-            if not storage_data or not isinstance(storage_data, dict) or not storage_data.get('_storage'):
-                continue
-            positions = storage_data.get('_positions', [])
-            if not positions:
-                continue
-            for pos in positions:
-                box_id = pos.get('box_id')
-                row = pos.get('row')
-                col = pos.get('col')
-                if not box_id or not row or not col:
-                    return jsonify({'code': 400, 'message': f'存储位置格式错误: {pos}', 'data': None}), 400
-                # 检查盒子存在
-                box = CryoBox.query.get(box_id)
-                if not box:
-                    return jsonify({'code': 400, 'message': f'冻存盒不存在: {box_id}', 'data': None}), 400
-                # 检查位置是否已被其他数据占用
-                existing = CryoCell.query.filter_by(box_id=box_id, row=row, col=col).first()
-                if existing and existing.linked_table_id and existing.linked_data_id:
-                    return jsonify({'code': 400, 'message': f'位置 {pos.get("label", "")} 已被占用', 'data': None}), 400
-                storage_positions_to_link.append((col_name, pos))
+    for col_name in schema.storage_columns:
+        storage_data = inventory_data.get(col_name)
+        if not storage_data or not isinstance(storage_data, dict) or not storage_data.get('_storage'):
+            continue
+        positions = storage_data.get('_positions', [])
+        if not positions:
+            continue
+        for pos in positions:
+            box_id = pos.get('box_id')
+            row = pos.get('row')
+            col = pos.get('col')
+            if not box_id or not row or not col:
+                return jsonify({'code': 400, 'message': f'存储位置格式错误: {pos}', 'data': None}), 400
+            # 检查盒子存在
+            box = CryoBox.query.get(box_id)
+            if not box:
+                return jsonify({'code': 400, 'message': f'冻存盒不存在: {box_id}', 'data': None}), 400
+            # 检查位置是否已被其他数据占用
+            existing = CryoCell.query.filter_by(box_id=box_id, row=row, col=col).first()
+            if existing and existing.linked_table_id and existing.linked_data_id:
+                return jsonify({'code': 400, 'message': f'位置 {pos.get("label", "")} 已被占用', 'data': None}), 400
+            storage_positions_to_link.append((col_name, pos))
 
     # 将库存数据转换为JSON字符串
     data_json = json.dumps(inventory_data)
@@ -1059,28 +1850,15 @@ def add_inventory_data(current_user, table_id):
             row = pos['row']
             col_val = pos['col']
             existing = CryoCell.query.filter_by(box_id=box_id, row=row, col=col_val).first()
-            row_data = {}
-            for k, v in inventory_data.items():
-                if isinstance(v, dict) and v.get('_storage'):
-                    row_data[k] = v.get('_text', '')
-                else:
-                    row_data[k] = v
-            cell_data = {
-                '_linked': True,
-                '_table_id': table_id,
-                '_data_id': new_data.id,
-                '_table_name': table.table_name,
-                '_table_columns': columns,
-                '_row_data': row_data
-            }
+            cell_json = _linked_cell_json(table, columns, new_data.id, inventory_data)
             if existing:
-                existing.data = json.dumps(cell_data, ensure_ascii=False)
+                existing.data = cell_json
                 existing.linked_table_id = table_id
                 existing.linked_data_id = new_data.id
             else:
                 new_cell = CryoCell(
                     box_id=box_id, row=row, col=col_val,
-                    data=json.dumps(cell_data, ensure_ascii=False),
+                    data=cell_json,
                     linked_table_id=table_id,
                     linked_data_id=new_data.id
                 )
@@ -1107,110 +1885,615 @@ def add_inventory_data(current_user, table_id):
             return jsonify({'code': 400, 'message': '所选位置已被占用，请重新选择', 'data': None}), 400
         return jsonify({'code': 500, 'message': f'添加库存数据失败: {err_msg}', 'data': None}), 500
 
+def _parse_projection_args(columns, params=None):
+    """解析列投影参数：fields=列1,列2（或JSON列表）只返回指定列，storage=text时存储列只返回_text。
+    params为POST请求体时从中读取，否则读取查询参数；fields既可以是字符串也可以是字符串列表。
+    返回 (列名列表或None, 是否只返回存储列文本)，格式错误或列不存在时抛出ValueError"""
+    if params is None:
+        if len(request.args.getlist('fields')) > 1:
+            raise ValueError('fields参数只能指定一次')
+        params = request.args
+    fields_arg = params.get('fields')
+    storage_text = params.get('storage', 'full') == 'text'
+    if fields_arg is None:
+        return None, storage_text
+    if isinstance(fields_arg, str):
+        fields_arg = fields_arg.strip()
+        if not fields_arg:
+            return None, storage_text
+        if fields_arg.startswith('['):
+            fields_arg = json.loads(fields_arg)
+        else:
+            fields_arg = [field.strip() for field in fields_arg.split(',') if field.strip()]
+    if not isinstance(fields_arg, list) or not all(isinstance(field, str) for field in fields_arg):
+        raise ValueError('fields格式错误，应为逗号分隔的列名或列名列表')
+    fields = fields_arg
+    column_names = {col['column_name'] for col in columns}
+    unknown = [field for field in fields if field not in column_names]
+    if unknown:
+        raise ValueError(f'列不存在: {", ".join(unknown)}')
+    return fields, storage_text
+
+
+def _parse_page_args():
+    """解析分页参数page/per_page，per_page必须是正整数，否则抛出ValueError"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 10))
+    except ValueError:
+        raise ValueError('分页参数必须是整数')
+    if per_page < 1:
+        raise ValueError('per_page必须大于0')
+    return page, per_page
+
+
+def _project_row_data(data_obj, fields=None, storage_text=False):
+    """按投影参数裁剪行数据"""
+    if fields is not None:
+        data_obj = {key: data_obj[key] for key in fields if key in data_obj}
+    if storage_text:
+        data_obj = {
+            key: value.get('_text', '') if isinstance(value, dict) and value.get('_storage') else value
+            for key, value in data_obj.items()
+        }
+    return data_obj
+
+
+def _serialize_inventory_data(item, fields=None, storage_text=False):
+    """将库存数据行转换为接口返回格式"""
+    data_obj = json.loads(item.data) if isinstance(item.data, str) else item.data
+    return {
+        'id': item.id,
+        'table_id': item.table_id,
+        'data': _project_row_data(data_obj, fields, storage_text),
+        'created_by': item.created_by,
+        'created_at': item.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': item.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+# 搜索条件：对与全文索引相同的可搜索文本（_SEARCH_TEXT_SQL）做子串匹配，
+# 短关键词或未启用全文索引时使用，保证两条路径返回相同的行
+_SEARCH_SQL = f"{_SEARCH_TEXT_SQL.format(row='inventory_data')} LIKE :search_pattern ESCAPE '\\'"
+
+
+def _build_search_condition(search):
+    """构建SQL搜索条件（LIKE不区分ASCII大小写）"""
+    escaped = search.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return text(f'({_SEARCH_SQL})').bindparams(search_pattern=f'%{escaped}%')
+
+
+def _build_fts_search_condition(search):
+    """构建基于全文索引的搜索条件（trigram子串匹配，不区分大小写）"""
+    fts_query = '"' + search.replace('"', '""') + '"'
+    return text(
+        f'inventory_data.id IN (SELECT rowid FROM {SEARCH_INDEX_TABLE} WHERE {SEARCH_INDEX_TABLE} MATCH :fts_query)'
+    ).bindparams(fts_query=fts_query)
+
+
+# ==================== 列筛选与表达式索引 ====================
+
+NUMERIC_DATA_TYPES = {'number', 'numeric', 'integer', 'int', 'float', 'double', 'decimal'}
+
+
+def _sql_literal(value):
+    """将字符串转为SQL字面量（表达式索引中不能使用绑定参数）；冒号转义以兼容text()"""
+    return "'" + value.replace("'", "''").replace(':', '\\:') + "'"
+
+
+def _json_extract_sql(data, column_name, suffix=''):
+    """按列名提取JSON值。行数据大多以json.dumps默认的\\uXXXX转义键名保存，
+    而SQLite按原始文本匹配路径，因此非ASCII列名同时匹配转义和未转义两种写法。
+    JSON路径无法表示包含双引号的键名，这类列名改用json_each按解码后的键名查找（不能用于索引）"""
+    if '"' in column_name:
+        value_sql = 'je_col.value'
+        if suffix:
+            value_sql = f"CASE WHEN je_col.type = 'object' THEN json_extract(je_col.value, {_sql_literal('$' + suffix)}) END"
+        return f'(SELECT {value_sql} FROM json_each({data}) AS je_col WHERE je_col.key = {_sql_literal(column_name)})'
+    raw_path = f'$."{column_name}"{suffix}'
+    escaped_path = f'$.{json.dumps(column_name)}{suffix}'
+    if escaped_path == raw_path:
+        return f'json_extract({data}, {_sql_literal(raw_path)})'
+    return (f'ifnull(json_extract({data}, {_sql_literal(escaped_path)}), '
+            f'json_extract({data}, {_sql_literal(raw_path)}))')
+
+
+def _column_value_sql(column, typed=True, data='inventory_data.data'):
+    """列在行JSON中的取值表达式。存储列取其_text；typed=True时数值列转换为REAL。
+    查询与表达式索引必须使用相同的表达式，索引DDL中传入data='data'"""
+    column_name = column['column_name']
+    value_sql = _json_extract_sql(data, column_name)
+    if column.get('is_storage'):
+        value_sql = f"ifnull({_json_extract_sql(data, column_name, '._text')}, {value_sql})"
+    if typed and column.get('data_type') in NUMERIC_DATA_TYPES:
+        value_sql = f"CAST(nullif({value_sql}, '') AS REAL)"
+    return value_sql
+
+
+def _make_column_coercer(column):
+    """按列类型生成筛选值转换函数（数据以字符串形式保存，数值列按数值比较）"""
+    column_name = column['column_name']
+    convert = float if column.get('data_type') in NUMERIC_DATA_TYPES else str
+
+    def coerce(value):
+        if value is None:
+            raise ValueError(f'列 {column_name} 的筛选值不能为空')
+        return convert(value)
+    return coerce
+
+
+def _build_column_filter_conditions(filters, schema):
+    """将结构化筛选条件编译为json_extract谓词。格式（JSON列表）:
+    [{"column": "列名", "op": "eq", "value": "x"},
+     {"column": "列名", "op": "in", "values": ["a", "b"]},
+     {"column": "列名", "op": "prefix", "value": "AB"},
+     {"column": "列名", "op": "range", "min": 1, "max": 10},
+     {"column": "列名", "op": "empty", "value": true}]
+    格式错误时抛出ValueError"""
+    if isinstance(filters, str):
+        filters = json.loads(filters)
+    if isinstance(filters, dict):
+        filters = [filters]
+    if not isinstance(filters, list):
+        raise ValueError('筛选条件必须是列表')
+
+    conditions = []
+    for i, item in enumerate(filters):
+        if not isinstance(item, dict):
+            raise ValueError(f'第{i+1}个筛选条件格式错误')
+        column = schema.columns_by_name.get(item.get('column'))
+        if not column:
+            raise ValueError(f'列不存在: {item.get("column")}')
+        coerce = schema.coercers[column['column_name']]
+        op = item.get('op', 'eq')
+        raw_sql = _column_value_sql(column, typed=False)
+        typed_sql = _column_value_sql(column)
+        param = f'filter_{i}'
+
+        if op == 'eq':
+            conditions.append(text(f'{typed_sql} = :{param}').bindparams(
+                **{param: coerce(item.get('value'))}))
+        elif op == 'in':
+            values = item.get('values')
+            if not isinstance(values, list) or not values:
+                raise ValueError(f'列 {column["column_name"]} 的in条件需要非空的values列表')
+            params = {f'{param}_{j}': coerce(v) for j, v in enumerate(values)}
+            placeholders = ', '.join(f':{name}' for name in params)
+            conditions.append(text(f'{typed_sql} IN ({placeholders})').bindparams(**params))
+        elif op == 'prefix':
+            prefix = str(item.get('value') or '')
+            if not prefix:
+                raise ValueError(f'列 {column["column_name"]} 的prefix条件不能为空')
+            # 使用范围比较代替LIKE，以便命中表达式索引
+            conditions.append(text(f'{raw_sql} >= :{param} AND {raw_sql} < :{param}_end').bindparams(
+                **{param: prefix, f'{param}_end': prefix + '\U0010ffff'}))
+        elif op == 'range':
+            if item.get('min') is None and item.get('max') is None:
+                raise ValueError(f'列 {column["column_name"]} 的range条件需要min或max')
+            if item.get('min') is not None:
+                conditions.append(text(f'{typed_sql} >= :{param}_min').bindparams(
+                    **{f'{param}_min': coerce(item['min'])}))
+            if item.get('max') is not None:
+                conditions.append(text(f'{typed_sql} <= :{param}_max').bindparams(
+                    **{f'{param}_max': coerce(item['max'])}))
+        elif op == 'empty':
+            if item.get('value', True):
+                conditions.append(text(f"({raw_sql} IS NULL OR {raw_sql} = '')"))
+            else:
+                conditions.append(text(f"({raw_sql} IS NOT NULL AND {raw_sql} <> '')"))
+        else:
+            raise ValueError(f'不支持的筛选操作: {op}')
+    return conditions
+
+
+def _build_row_conditions(search, filters, schema):
+    """组合搜索关键词与结构化筛选条件，筛选条件格式错误时抛出ValueError"""
+    conditions = []
+    if search:
+        # 有全文索引且关键词不少于3个字符（trigram最小长度）时使用索引
+        if app.config['SEARCH_INDEX_AVAILABLE'] and len(search) >= 3:
+            conditions.append(_build_fts_search_condition(search))
+        else:
+            conditions.append(_build_search_condition(search))
+    if filters:
+        try:
+            conditions.extend(_build_column_filter_conditions(filters, schema))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f'筛选条件格式错误: {str(e)}')
+    return conditions
+
+
+def _build_sort_clauses(sort, order, columns):
+    """构建排序子句：用户自定义列按类型排序（数值列按REAL，字符串/日期列按保存的文本），
+    也支持created_at、updated_at、id；以id作为次级排序保证顺序稳定。列不存在时抛出ValueError"""
+    if order not in ('asc', 'desc'):
+        raise ValueError('order必须是asc或desc')
+    id_clause = InventoryData.id.asc() if order == 'asc' else InventoryData.id.desc()
+    column = next((col for col in columns if col['column_name'] == sort), None)
+    if column:
+        return [text(f'{_column_value_sql(column)} {order.upper()}'), id_clause]
+    if sort in ('created_at', 'updated_at', 'id'):
+        attr = getattr(InventoryData, sort)
+        return [attr.asc() if order == 'asc' else attr.desc(), id_clause]
+    raise ValueError(f'排序列不存在: {sort}')
+
+
+def sync_column_indexes(table_id, columns):
+    """根据列配置中的indexed标记创建或删除表达式索引，columns为None时删除该表格的全部索引。
+    索引是只包含本表格数据行的部分索引（WHERE table_id = 表格ID），写入其他表格时不需要维护；
+    查询条件带 table_id = :table_id 时SQLite会按绑定值选用，键仍以table_id开头，筛选和排序的执行计划不变。
+    DDL在当前事务中执行，由调用方提交"""
+    prefix = f'ix_inventory_col_{table_id}_'
+    wanted = {}
+    for column in columns or []:
+        if column.get('indexed'):
+            index_sql = f'ON inventory_data (table_id, {_column_value_sql(column, data="data")}) WHERE table_id = {int(table_id)}'
+            # 索引名包含定义的哈希，定义变化（包括旧版的非部分索引）时会删除重建
+            index_name = prefix + hashlib.md5(index_sql.encode('utf-8')).hexdigest()[:12]
+            wanted[index_name] = index_sql
+
+    existing = {
+        name for (name,) in db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))
+        if name.startswith(prefix)
+    }
+    for index_name in existing - set(wanted):
+        db.session.execute(text(f'DROP INDEX IF EXISTS "{index_name}"'))
+    for index_name, index_sql in wanted.items():
+        if index_name not in existing:
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS "{index_name}" {index_sql}'))
+
+
+def ensure_column_indexes():
+    """按各表格当前的列配置同步表达式索引（启动时调用，升级旧版的全表索引）"""
+    for table in TableStructure.query.all():
+        sync_column_indexes(table.id, get_table_schema(table).columns)
+    db.session.commit()
+
+
 # 获取库存数据列表
 @app.route('/api/v1/tables/<int:table_id>/data', methods=['GET'])
 @token_required
 def get_inventory_data_list(current_user, table_id):
+    # 数据未变化时直接返回304（ETag按URL区分，分页/搜索参数不同的请求互不影响）
+    etag = _table_etag(table_id)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    
     # 检查表格是否存在
     table = TableStructure.query.get(table_id)
     if not table:
         return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
     
     # 获取查询参数
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    try:
+        page, per_page = _parse_page_args()
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
     search = request.args.get('search', '')
+    # 结构化筛选条件（JSON），见 _build_column_filter_conditions
     filters = request.args.get('filters', '')
+    # 游标分页参数：after=<created_at>,<id>，为空表示第一页
+    after = request.args.get('after')
+    # with_total=0 时跳过COUNT(*)
+    with_total = request.args.get('with_total', '1') not in ('0', 'false')
+    # 服务端排序：sort=<列名>&order=asc|desc
+    sort = request.args.get('sort', '')
+    order = request.args.get('order', 'desc').lower()
+    schema = get_table_schema(table)
+    columns = schema.columns
     
-    # 构建查询
-    query = InventoryData.query.filter_by(table_id=table_id)
+    # 列投影：fields=列1,列2，storage=text
+    try:
+        fields, storage_text = _parse_projection_args(columns)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
     
-    # 如果有搜索关键词，则进行搜索（在Python层面过滤）
-    if search:
+    sort_clauses = None
+    if sort:
+        if after is not None:
+            return jsonify({'code': 400, 'message': '游标分页不支持自定义排序，请使用page分页', 'data': None}), 400
         try:
-            # 先获取所有数据，然后在Python中过滤
-            all_data = query.all()
-            
-            # 在Python中进行搜索过滤
-            filtered_data = []
-            search_lower = search.lower()
-            
-            for item in all_data:
-                try:
-                    data_dict = json.loads(item.data) if isinstance(item.data, str) else item.data
-                    
-                    # 搜索所有数据字段的值
-                    for key, value in data_dict.items():
-                        if value and search_lower in str(value).lower():
-                            filtered_data.append(item)
-                            break
-                    
-                    # 也搜索created_at字段
-                    if item.created_at and search_lower in item.created_at.strftime('%Y-%m-%d %H:%M:%S').lower():
-                        if item not in filtered_data:
-                            filtered_data.append(item)
-                except:
-                    pass
-            
-            # 手动实现分页
-            total = len(filtered_data)
-            start = (page - 1) * per_page
-            end = start + per_page
-            paginated_items = filtered_data[start:end]
-            
-            # 转换数据格式
-            items = []
-            for item in paginated_items:
-                items.append({
-                    'id': item.id,
-                    'table_id': item.table_id,
-                    'data': json.loads(item.data) if isinstance(item.data, str) else item.data,
-                    'created_by': item.created_by,
-                    'created_at': item.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    'updated_at': item.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-                })
-            
-            return jsonify({
-                'code': 200,
-                'message': 'success',
-                'data': {
-                    'items': items,
-                    'total': total,
-                    'page': page,
-                    'per_page': per_page
-                }
-            }), 200
-        except Exception as e:
-            print(f"Search error: {e}")
+            sort_clauses = _build_sort_clauses(sort, order, columns)
+        except ValueError as e:
+            return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
     
-    # 执行查询并使用默认排序
-    paginated_data = query.order_by(
-        InventoryData.created_at.desc()
-    ).paginate(page=page, per_page=per_page, error_out=False)
+    # 构建查询
+    query = InventoryData.query.filter_by(table_id=table_id)
     
-    # 转换数据格式
-    items = []
-    for item in paginated_data.items:
-        items.append({
-            'id': item.id,
-            'table_id': item.table_id,
-            'data': json.loads(item.data),
-            'created_by': item.created_by,
-            'created_at': item.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': item.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    # 搜索关键词和结构化列筛选都在SQLite中执行，只取当前页
+    try:
+        for condition in _build_row_conditions(search, filters, schema):
+            query = query.filter(condition)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
     
-    return jsonify({
-        'code': 200,
-        'message': 'success',
-        'data': {
-            'items': items,
+    # 游标分页：按 (created_at, id) 倒序，使用 (table_id, created_at, id) 索引定位，避免OFFSET扫描
+    if after is not None:
+        if after:
+            try:
+                after_created_at, after_id = after.rsplit(',', 1)
+                after_id = int(after_id)
+            except ValueError:
+                return jsonify({'code': 400, 'message': '游标格式错误', 'data': None}), 400
+            query = query.filter(text(
+                '(inventory_data.created_at, inventory_data.id) < (:after_created_at, :after_id)'
+            ).bindparams(after_created_at=after_created_at, after_id=after_id))
+        
+        if with_total and not search and not filters and not after:
+            stats = get_table_stats(table_id)
+            total = stats.row_count if stats else query.order_by(None).count()
+        else:
+            total = query.order_by(None).count() if with_total else None
+        # 多取一条判断是否还有下一页；游标使用数据库中created_at的原始文本，保证与排序一致
+        rows = query.add_columns(literal_column('inventory_data.created_at')).order_by(
+            InventoryData.created_at.desc(), InventoryData.id.desc()
+        ).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = f'{rows[-1][1]},{rows[-1][0].id}' if has_more else None
+        
+        return _with_etag((jsonify({
+            'code': 200,
+            'message': 'success',
+            'data': {
+                'items': [_serialize_inventory_data(item, fields, storage_text) for item, _ in rows],
+                'total': total,
+                'per_page': per_page,
+                'has_more': has_more,
+                'next_cursor': next_cursor
+            }
+        }), 200), etag)
+    
+    # 执行查询：指定排序列时按列排序，否则使用默认排序（搜索结果保持按ID排序）
+    if sort_clauses:
+        query = query.order_by(*sort_clauses)
+    elif search:
+        query = query.order_by(InventoryData.id)
+    else:
+        query = query.order_by(InventoryData.created_at.desc())
+    # 无搜索/筛选时总数直接读取统计行，不再执行COUNT(*)
+    stats = get_table_stats(table_id) if with_total and not search and not filters else None
+    paginated_data = query.paginate(page=page, per_page=per_page, error_out=False, count=with_total and stats is None)
+    total = stats.row_count if stats else paginated_data.total
+    
+    return _with_etag((jsonify({
+        'code': 200,
+        'message': 'success',
+        'data': {
+            'items': [_serialize_inventory_data(item, fields, storage_text) for item in paginated_data.items],
+            'total': total,
+            'page': page,
+            'per_page': per_page
+        }
+    }), 200), etag)
+
+# 行数据中各存储列占用的冻存位置总数
+_STORAGE_COUNT_SQL = """
+CASE WHEN json_valid(inventory_data.data) THEN (
+    SELECT ifnull(sum(json_array_length(je.value, '$._positions')), 0)
+    FROM json_each(inventory_data.data) AS je
+    WHERE je.type = 'object' AND json_extract(je.value, '$._storage')
+) ELSE 0 END
+"""
+
+
+def _group_key_sql(column):
+    """聚合分组键：列值文本（存储列取_text）去除首尾空白，与前端聚合规则一致"""
+    return f"trim(ifnull(CAST({_column_value_sql(column, typed=False)} AS TEXT), ''))"
+
+
+# 按列聚合库存数据（服务端分组，分页返回）
+@app.route('/api/v1/tables/<int:table_id>/data/groups', methods=['GET'])
+@token_required
+def get_inventory_data_groups(current_user, table_id):
+    # 检查表格是否存在
+    table = TableStructure.query.get(table_id)
+    if not table:
+        return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
+    
+    # 获取查询参数
+    try:
+        page, per_page = _parse_page_args()
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+    search = request.args.get('search', '')
+    filters = request.args.get('filters', '')
+    column_name = request.args.get('column', '')
+    
+    schema = get_table_schema(table)
+    column = schema.columns_by_name.get(column_name)
+    if not column:
+        return jsonify({'code': 400, 'message': f'分组列不存在: {column_name}', 'data': None}), 400
+    
+    try:
+        conditions = _build_row_conditions(search, filters, schema)
+        fields, storage_text = _parse_projection_args(schema.columns)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+    
+    # 每组：分组键、行数、存储位置数、最近一条数据（SQLite中与max()同行取值）
+    key_sql = _group_key_sql(column)
+    query = db.session.query(
+        text(key_sql),
+        db.func.count(InventoryData.id),
+        db.func.sum(text(_STORAGE_COUNT_SQL)),
+        db.func.max(InventoryData.created_at),
+        InventoryData.id
+    ).filter(InventoryData.table_id == table_id).group_by(text(key_sql))
+    
+    # 有搜索或筛选时返回包含匹配行的完整分组
+    if conditions:
+        query = query.having(db.func.sum(case((and_(*conditions), 1), else_=0)) > 0)
+    
+    total = query.count()
+    groups = query.order_by(
+        db.func.max(InventoryData.created_at).desc(), text(key_sql)
+    ).limit(per_page).offset((page - 1) * per_page).all()
+    
+    # 一次查询取回各组的代表数据行
+    latest_ids = [latest_id for *_, latest_id in groups]
+    latest_rows = {row.id: row for row in InventoryData.query.filter(InventoryData.id.in_(latest_ids)).all()}
+    
+    items = []
+    for group_key, count, storage_count, _, latest_id in groups:
+        latest = latest_rows.get(latest_id)
+        items.append({
+            'key': group_key,
+            'count': count,
+            'storage_count': storage_count or 0,
+            'latest': _serialize_inventory_data(latest, fields, storage_text) if latest else None
+        })
+    
+    return jsonify({
+        'code': 200,
+        'message': 'success',
+        'data': {
+            'column': column_name,
+            'items': items,
+            'total': total,
+            'page': page,
+            'per_page': per_page
+        }
+    }), 200
+
+
+# 获取某个聚合分组内的原始数据行（分页，供展开时按需加载）
+@app.route('/api/v1/tables/<int:table_id>/data/groups/items', methods=['GET'])
+@token_required
+def get_inventory_data_group_items(current_user, table_id):
+    # 检查表格是否存在
+    table = TableStructure.query.get(table_id)
+    if not table:
+        return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
+    
+    # 获取查询参数
+    try:
+        page, per_page = _parse_page_args()
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+    column_name = request.args.get('column', '')
+    group_key = request.args.get('key', '')
+    
+    schema = get_table_schema(table)
+    column = schema.columns_by_name.get(column_name)
+    if not column:
+        return jsonify({'code': 400, 'message': f'分组列不存在: {column_name}', 'data': None}), 400
+    
+    try:
+        fields, storage_text = _parse_projection_args(schema.columns)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+    
+    paginated_data = InventoryData.query.filter_by(table_id=table_id).filter(
+        text(f'{_group_key_sql(column)} = :group_key').bindparams(group_key=group_key.strip())
+    ).order_by(
+        InventoryData.created_at.desc(), InventoryData.id.desc()
+    ).paginate(page=page, per_page=per_page, error_out=False)
+    
+    return jsonify({
+        'code': 200,
+        'message': 'success',
+        'data': {
+            'key': group_key,
+            'items': [_serialize_inventory_data(item, fields, storage_text) for item in paginated_data.items],
             'total': paginated_data.total,
             'page': page,
             'per_page': per_page
         }
     }), 200
 
+# 重建全文搜索索引
+@app.route('/api/v1/search-index/rebuild', methods=['POST'])
+@token_required
+def rebuild_search_index_api(current_user):
+    # 只有管理员可以重建索引
+    if current_user.role != 'admin':
+        return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
+
+    if request.args.get('async') == '1':
+        return submit_job_response('rebuild_search_index', current_user)
+
+    try:
+        app.config['SEARCH_INDEX_AVAILABLE'] = ensure_search_index()
+        if not app.config['SEARCH_INDEX_AVAILABLE']:
+            return jsonify({'code': 400, 'message': '当前数据库不支持全文索引', 'data': None}), 400
+        count = rebuild_search_index()
+        return jsonify({'code': 200, 'message': '全文索引重建成功', 'data': {'indexed_count': count}}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'code': 500, 'message': f'重建全文索引失败: {str(e)}', 'data': None}), 500
+
+# 按ID批量获取时单次请求的ID数量上限
+FETCH_IDS_LIMIT = 1000
+
+
+def _parse_id_list(raw_ids):
+    """解析ID列表（JSON列表或逗号分隔字符串），去重并保持原顺序，格式错误时抛出ValueError"""
+    if isinstance(raw_ids, str):
+        raw_ids = [item for item in raw_ids.split(',') if item.strip()]
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise ValueError('ID列表不能为空')
+    ids = []
+    seen = set()
+    for raw_id in raw_ids:
+        if isinstance(raw_id, bool):
+            raise ValueError(f'ID格式错误: {raw_id}')
+        try:
+            data_id = int(raw_id)
+        except (TypeError, ValueError):
+            raise ValueError(f'ID格式错误: {raw_id}')
+        if data_id not in seen:
+            seen.add(data_id)
+            ids.append(data_id)
+    if len(ids) > FETCH_IDS_LIMIT:
+        raise ValueError(f'一次最多获取{FETCH_IDS_LIMIT}条数据')
+    return ids
+
+
+# 按ID批量获取库存数据：POST {"ids": [...]} 或 GET ?ids=1,2,3，列投影参数同列表接口（fields=、storage=text），POST时也可放在请求体中
+@app.route('/api/v1/tables/<int:table_id>/data/fetch', methods=['GET', 'POST'])
+@token_required
+def fetch_inventory_data(current_user, table_id):
+    table = TableStructure.query.get(table_id)
+    if not table:
+        return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
+    
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            body = {}
+        raw_ids = body.get('ids')
+        # 请求体未指定投影参数时沿用查询参数
+        projection = body if 'fields' in body or 'storage' in body else None
+    else:
+        raw_ids = request.args.get('ids', '')
+        projection = None
+    try:
+        ids = _parse_id_list(raw_ids)
+        fields, storage_text = _parse_projection_args(get_table_schema(table).columns, projection)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+    
+    # 一次IN查询取回所有行，再按请求的ID顺序返回
+    rows = InventoryData.query.filter(
+        InventoryData.table_id == table_id,
+        InventoryData.id.in_(ids)
+    ).all()
+    rows_by_id = {row.id: row for row in rows}
+    
+    return jsonify({
+        'code': 200,
+        'message': 'success',
+        'data': {
+            'table_id': table.id,
+            'table_name': table.table_name,
+            'items': [_serialize_inventory_data(rows_by_id[data_id], fields, storage_text)
+                      for data_id in ids if data_id in rows_by_id],
+            'missing_ids': [data_id for data_id in ids if data_id not in rows_by_id]
+        }
+    }), 200
+
 # 获取库存数据详情
 @app.route('/api/v1/tables/<int:table_id>/data/<int:data_id>', methods=['GET'])
 @token_required
@@ -1220,6 +2503,12 @@ def get_inventory_data_detail(current_user, table_id, data_id):
     if not table:
         return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
     
+    # 列投影：fields=列1,列2，storage=text
+    try:
+        fields, storage_text = _parse_projection_args(get_table_schema(table).columns)
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+    
     # 获取库存数据
     inventory_data = InventoryData.query.filter_by(id=data_id, table_id=table_id).first()
     if not inventory_data:
@@ -1228,14 +2517,7 @@ def get_inventory_data_detail(current_user, table_id, data_id):
     return jsonify({
         'code': 200,
         'message': 'success',
-        'data': {
-            'id': inventory_data.id,
-            'table_id': inventory_data.table_id,
-            'data': json.loads(inventory_data.data),
-            'created_by': inventory_data.created_by,
-            'created_at': inventory_data.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': inventory_data.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        'data': _serialize_inventory_data(inventory_data, fields, storage_text)
     }), 200
 
 # 更新库存数据
@@ -1264,52 +2546,49 @@ def update_inventory_data(current_user, table_id, data_id):
 
     # 解析旧数据，释放之前占用的存储位置
     old_data_obj = json.loads(inventory_data.data) if isinstance(inventory_data.data, str) else inventory_data.data
-    columns = json.loads(table.columns)
-    for column in columns:
-        if column.get('is_storage'):
-            col_name = column['column_name']
-            old_storage = old_data_obj.get(col_name)
-            if isinstance(old_storage, dict) and old_storage.get('_storage'):
-                old_positions = old_storage.get('_positions', [])
-                new_storage = new_data.get(col_name)
-                new_positions = []
-                if isinstance(new_storage, dict) and new_storage.get('_storage'):
-                    new_positions = new_storage.get('_positions', [])
-                # 找出被移除的位置（在旧不在新）
-                new_pos_keys = {(p['box_id'], p['row'], p['col']) for p in new_positions}
-                for old_pos in old_positions:
-                    key = (old_pos['box_id'], old_pos['row'], old_pos['col'])
-                    if key not in new_pos_keys:
-                        cell = CryoCell.query.filter_by(
-                            box_id=old_pos['box_id'], row=old_pos['row'], col=old_pos['col']
-                        ).first()
-                        if cell:
-                            db.session.delete(cell)
+    schema = get_table_schema(table)
+    columns = schema.columns
+    for col_name in schema.storage_columns:
+        old_storage = old_data_obj.get(col_name)
+        if isinstance(old_storage, dict) and old_storage.get('_storage'):
+            old_positions = old_storage.get('_positions', [])
+            new_storage = new_data.get(col_name)
+            new_positions = []
+            if isinstance(new_storage, dict) and new_storage.get('_storage'):
+                new_positions = new_storage.get('_positions', [])
+            # 找出被移除的位置（在旧不在新）
+            new_pos_keys = {(p['box_id'], p['row'], p['col']) for p in new_positions}
+            for old_pos in old_positions:
+                key = (old_pos['box_id'], old_pos['row'], old_pos['col'])
+                if key not in new_pos_keys:
+                    cell = CryoCell.query.filter_by(
+                        box_id=old_pos['box_id'], row=old_pos['row'], col=old_pos['col']
+                    ).first()
+                    if cell:
+                        db.session.delete(cell)
 
     # 验证并处理新的存储位置
     storage_positions_to_link = []
-    for column in columns:
-        if column.get('is_storage'):
-            col_name = column['column_name']
-            storage_data = new_data.get(col_name)
-            if not storage_data or not isinstance(storage_data, dict) or not storage_data.get('_storage'):
-                continue
-            positions = storage_data.get('_positions', [])
-            if not positions:
-                continue
-            for pos in positions:
-                box_id = pos.get('box_id')
-                row = pos.get('row')
-                col = pos.get('col')
-                if not box_id or not row or not col:
-                    return jsonify({'code': 400, 'message': f'存储位置格式错误: {pos}', 'data': None}), 400
-                box = CryoBox.query.get(box_id)
-                if not box:
-                    return jsonify({'code': 400, 'message': f'冻存盒不存在: {box_id}', 'data': None}), 400
-                existing = CryoCell.query.filter_by(box_id=box_id, row=row, col=col).first()
-                if existing and existing.linked_data_id and existing.linked_data_id != data_id:
-                    return jsonify({'code': 400, 'message': f'位置 {pos.get("label", "")} 已被占用', 'data': None}), 400
-                storage_positions_to_link.append((col_name, pos))
+    for col_name in schema.storage_columns:
+        storage_data = new_data.get(col_name)
+        if not storage_data or not isinstance(storage_data, dict) or not storage_data.get('_storage'):
+            continue
+        positions = storage_data.get('_positions', [])
+        if not positions:
+            continue
+        for pos in positions:
+            box_id = pos.get('box_id')
+            row = pos.get('row')
+            col = pos.get('col')
+            if not box_id or not row or not col:
+                return jsonify({'code': 400, 'message': f'存储位置格式错误: {pos}', 'data': None}), 400
+            box = CryoBox.query.get(box_id)
+            if not box:
+                return jsonify({'code': 400, 'message': f'冻存盒不存在: {box_id}', 'data': None}), 400
+            existing = CryoCell.query.filter_by(box_id=box_id, row=row, col=col).first()
+            if existing and existing.linked_data_id and existing.linked_data_id != data_id:
+                return jsonify({'code': 400, 'message': f'位置 {pos.get("label", "")} 已被占用', 'data': None}), 400
+            storage_positions_to_link.append((col_name, pos))
 
     # 更新库存数据
     inventory_data.data = json.dumps(new_data)
@@ -1321,28 +2600,15 @@ def update_inventory_data(current_user, table_id, data_id):
             row = pos['row']
             col_val = pos['col']
             existing = CryoCell.query.filter_by(box_id=box_id, row=row, col=col_val).first()
-            row_data = {}
-            for k, v in new_data.items():
-                if isinstance(v, dict) and v.get('_storage'):
-                    row_data[k] = v.get('_text', '')
-                else:
-                    row_data[k] = v
-            cell_data = {
-                '_linked': True,
-                '_table_id': table_id,
-                '_data_id': data_id,
-                '_table_name': table.table_name,
-                '_table_columns': columns,
-                '_row_data': row_data
-            }
+            cell_json = _linked_cell_json(table, columns, data_id, new_data)
             if existing:
-                existing.data = json.dumps(cell_data, ensure_ascii=False)
+                existing.data = cell_json
                 existing.linked_table_id = table_id
                 existing.linked_data_id = data_id
             else:
                 new_cell = CryoCell(
                     box_id=box_id, row=row, col=col_val,
-                    data=json.dumps(cell_data, ensure_ascii=False),
+                    data=cell_json,
                     linked_table_id=table_id,
                     linked_data_id=data_id
                 )
@@ -1369,6 +2635,127 @@ def update_inventory_data(current_user, table_id, data_id):
             return jsonify({'code': 400, 'message': '所选位置已被占用，请重新选择', 'data': None}), 400
         return jsonify({'code': 500, 'message': f'更新库存数据失败: {err_msg}', 'data': None}), 500
 
+def _json_merge_patch(target, patch):
+    """按 RFC 7396 合并补丁：值为 null 的键被删除，对象递归合并，其余值整体替换"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = _json_merge_patch(result.get(key), value)
+    return result
+
+
+# 部分更新库存数据（RFC 7396 JSON merge-patch），只有补丁中出现的存储列才会重新校验和关联冻存位置
+# 请求体为 {"data": 补丁}，或以 application/merge-patch+json 直接提交补丁
+@app.route('/api/v1/tables/<int:table_id>/data/<int:data_id>', methods=['PATCH'])
+@token_required
+def patch_inventory_data(current_user, table_id, data_id):
+    # 检查表格是否存在
+    table = TableStructure.query.get(table_id)
+    if not table:
+        return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
+    
+    # 检查用户权限，管理员、组长和组员都可以修改数据
+    if current_user.role not in ['admin', 'leader', 'member']:
+        return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
+    
+    # 获取库存数据
+    inventory_data = InventoryData.query.filter_by(id=data_id, table_id=table_id).first()
+    if not inventory_data:
+        return jsonify({'code': 404, 'message': '库存数据不存在', 'data': None}), 404
+    
+    # Content-Type为application/merge-patch+json时请求体本身就是补丁，否则补丁放在data字段中
+    body = request.get_json(silent=True)
+    if request.mimetype == 'application/merge-patch+json':
+        patch = body
+    else:
+        patch = body.get('data') if isinstance(body, dict) else None
+    if not isinstance(patch, dict):
+        return jsonify({'code': 400, 'message': '数据格式错误，补丁必须是JSON对象', 'data': None}), 400
+    
+    def _response(row_data):
+        return jsonify({
+            'code': 200,
+            'message': '库存数据更新成功',
+            'data': {
+                'id': inventory_data.id,
+                'table_id': inventory_data.table_id,
+                'data': row_data,
+                'created_by': inventory_data.created_by,
+                'created_at': inventory_data.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'updated_at': inventory_data.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+            }
+        }), 200
+    
+    old_data_obj = json.loads(inventory_data.data) if isinstance(inventory_data.data, str) else inventory_data.data
+    new_data = _json_merge_patch(old_data_obj, patch)
+    if new_data == old_data_obj:
+        return _response(old_data_obj)
+    
+    schema = get_table_schema(table)
+    patched_storage_columns = [col_name for col_name in schema.storage_columns if col_name in patch]
+    old_keys = _storage_position_keys(old_data_obj, patched_storage_columns)
+    new_keys = _storage_position_keys(new_data, patched_storage_columns)
+    added_keys = [key for key in new_keys if key not in old_keys]
+    removed_keys = [key for key in old_keys if key not in new_keys]
+    
+    # 只校验新增的位置，涉及的冻存盒和格子各用一次查询取回
+    cells = {}
+    if added_keys or removed_keys:
+        box_ids = {key[0] for key in added_keys + removed_keys}
+        existing_box_ids = {box_id for (box_id,) in db.session.query(CryoBox.id).filter(CryoBox.id.in_(box_ids)).all()}
+        cells = {(cell.box_id, cell.row, cell.col): cell
+                 for cell in CryoCell.query.filter(CryoCell.box_id.in_(box_ids)).all()}
+        for key in added_keys:
+            pos = new_keys[key]
+            box_id, row, col = key
+            if not box_id or not row or not col:
+                return jsonify({'code': 400, 'message': f'存储位置格式错误: {pos}', 'data': None}), 400
+            if box_id not in existing_box_ids:
+                return jsonify({'code': 400, 'message': f'冻存盒不存在: {box_id}', 'data': None}), 400
+            existing = cells.get(key)
+            if existing and existing.linked_data_id and existing.linked_data_id != data_id:
+                return jsonify({'code': 400, 'message': f'位置 {pos.get("label", "")} 已被占用', 'data': None}), 400
+    
+    try:
+        # 释放补丁中存储列移除的位置
+        for key in removed_keys:
+            if key in cells:
+                db.session.delete(cells[key])
+        inventory_data.data = json.dumps(new_data)
+        
+        # 该行仍占用的冻存格里保存了行数据快照，用一条 UPDATE 同步，不再逐格查询
+        cell_json = _linked_cell_json(table, schema.columns, data_id, new_data)
+        if _storage_position_keys(new_data, schema.storage_columns):
+            CryoCell.query.filter_by(
+                linked_table_id=table_id, linked_data_id=data_id
+            ).update({'data': cell_json}, synchronize_session=False)
+        for key in added_keys:
+            existing = cells.get(key)
+            if existing:
+                existing.data = cell_json
+                existing.linked_table_id = table_id
+                existing.linked_data_id = data_id
+            else:
+                db.session.add(CryoCell(
+                    box_id=key[0], row=key[1], col=key[2],
+                    data=cell_json,
+                    linked_table_id=table_id,
+                    linked_data_id=data_id
+                ))
+        
+        db.session.commit()  # 一次性提交：旧位释放 + 数据更新 + 新位关联
+        return _response(new_data)
+    except Exception as e:
+        db.session.rollback()
+        err_msg = str(e)
+        if 'UNIQUE constraint' in err_msg or 'duplicate' in err_msg.lower():
+            return jsonify({'code': 400, 'message': '所选位置已被占用，请重新选择', 'data': None}), 400
+        return jsonify({'code': 500, 'message': f'更新库存数据失败: {err_msg}', 'data': None}), 500
+
 def _release_linked_positions(inventory_data_row):
     """释放一条库存数据占用的所有冻存位置"""
     try:
@@ -1448,6 +2835,119 @@ def batch_delete_inventory_data(current_user, table_id):
         db.session.rollback()
         return jsonify({'code': 500, 'message': f'批量删除库存数据失败: {str(e)}', 'data': None}), 500
 
+def _storage_position_keys(row_obj, storage_columns):
+    """返回一行数据在各存储列中占用的位置 {(box_id, row, col): pos}"""
+    keys = {}
+    for col_name in storage_columns:
+        storage_data = row_obj.get(col_name)
+        if isinstance(storage_data, dict) and storage_data.get('_storage'):
+            for pos in storage_data.get('_positions', []):
+                if isinstance(pos, dict):
+                    keys[(pos.get('box_id'), pos.get('row'), pos.get('col'))] = pos
+    return keys
+
+
+# 批量写入库存数据时每次 executemany 并提交的行数
+app.config['BULK_INSERT_CHUNK_SIZE'] = int(os.environ.get('BULK_INSERT_CHUNK_SIZE', '500'))
+# 单次批量添加的最大条数
+BULK_INSERT_LIMIT = 10000
+
+
+def bulk_insert_inventory_data(table, items, created_by, chunk_size=None):
+    """批量写入库存数据：逐条校验，自增列整批分配一个连续区间，存储位置用集合查询校验，
+    再按块用 executemany 插入并逐块提交。返回逐条结果列表"""
+    chunk_size = chunk_size or app.config['BULK_INSERT_CHUNK_SIZE']
+    schema = get_table_schema(table)
+    
+    results = []
+    candidates = []  # [(结果序号, 行数据, 存储位置)]
+    for i, item in enumerate(items):
+        row_data = item.get('data') if isinstance(item, dict) else None
+        result = {'index': i, 'success': False, 'id': None, 'message': ''}
+        results.append(result)
+        if not row_data or not isinstance(row_data, dict):
+            result['message'] = '数据格式错误'
+            continue
+        candidates.append((i, dict(row_data), _storage_position_keys(row_data, schema.storage_columns)))
+    
+    # 存储位置：涉及的冻存盒和格子各用一次查询取回，本批内同一位置先到先得
+    box_ids = {key[0] for _, _, keys in candidates for key in keys if key[0]}
+    existing_box_ids = {box_id for (box_id,) in db.session.query(CryoBox.id).filter(CryoBox.id.in_(box_ids)).all()} if box_ids else set()
+    cells = {(cell.box_id, cell.row, cell.col): cell
+             for cell in CryoCell.query.filter(CryoCell.box_id.in_(box_ids)).all()} if box_ids else {}
+    claimed = set()
+    valid = []
+    for i, row_data, keys in candidates:
+        error = None
+        for key, pos in keys.items():
+            cell = cells.get(key)
+            if not all(key):
+                error = f'存储位置格式错误: {pos}'
+            elif key[0] not in existing_box_ids:
+                error = f'冻存盒不存在: {key[0]}'
+            elif key in claimed:
+                error = f'位置 {pos.get("label", "")} 在本次提交中重复'
+            elif cell and cell.linked_table_id and cell.linked_data_id:
+                error = f'位置 {pos.get("label", "")} 已被占用'
+            if error:
+                break
+        if error:
+            results[i]['message'] = error
+            continue
+        claimed.update(keys)
+        valid.append((i, row_data, keys))
+    if not valid:
+        return results
+    
+    # 自增列整批分配连续区间并先行提交，避免后续某块失败回滚后编号被重复使用
+    for column_name, prefix, _ in schema.auto_increment_columns:
+        start = allocate_auto_increment_range(table.id, column_name, len(valid))
+        for offset, (_, row_data, _) in enumerate(valid):
+            row_data[column_name] = f"{prefix}{start + offset}"
+    db.session.commit()
+    
+    insert_rows = insert(InventoryData).returning(InventoryData.id, sort_by_parameter_order=True)
+    for chunk_start in range(0, len(valid), chunk_size):
+        chunk = valid[chunk_start:chunk_start + chunk_size]
+        try:
+            data_ids = db.session.execute(insert_rows, [
+                {'table_id': table.id, 'data': json.dumps(row_data), 'created_by': created_by}
+                for _, row_data, _ in chunk
+            ]).scalars().all()
+            
+            # 关联存储位置：已有的未关联格子直接覆盖，其余一次 executemany 插入
+            new_cells = []
+            for (_, row_data, keys), data_id in zip(chunk, data_ids):
+                if not keys:
+                    continue
+                cell_json = _linked_cell_json(table, schema.columns, data_id, row_data)
+                for key in keys:
+                    cell = cells.get(key)
+                    if cell:
+                        cell.data = cell_json
+                        cell.linked_table_id = table.id
+                        cell.linked_data_id = data_id
+                    else:
+                        new_cells.append({
+                            'box_id': key[0], 'row': key[1], 'col': key[2],
+                            'data': cell_json,
+                            'linked_table_id': table.id,
+                            'linked_data_id': data_id
+                        })
+            if new_cells:
+                db.session.execute(insert(CryoCell), new_cells)
+            db.session.commit()  # 每块一次提交：库存数据 + 冻存格
+        except Exception as e:
+            db.session.rollback()
+            for i, _, _ in chunk:
+                results[i]['message'] = f'添加数据失败: {str(e)}'
+            continue
+        
+        for (i, _, _), data_id in zip(chunk, data_ids):
+            results[i].update({'success': True, 'id': data_id, 'message': '添加成功'})
+    return results
+
+
 # 批量添加库存数据
 @app.route('/api/v1/tables/<int:table_id>/data/batch', methods=['POST'])
 @token_required
@@ -1461,51 +2961,189 @@ def batch_add_inventory_data(current_user, table_id):
     if current_user.role not in ['admin', 'leader']:
         return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
     
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     items = data.get('items')
     
     if not items or not isinstance(items, list) or len(items) == 0:
         return jsonify({'code': 400, 'message': '批量数据格式错误', 'data': None}), 400
-    
-    success_count = 0
-    error_count = 0
-    error_messages = []
+    if len(items) > BULK_INSERT_LIMIT:
+        return jsonify({'code': 400, 'message': f'一次最多添加{BULK_INSERT_LIMIT}条数据', 'data': None}), 400
     
     try:
-        for item in items:
-            if not item.get('data') or not isinstance(item.get('data'), dict):
-                error_count += 1
-                error_messages.append(f'数据格式错误: {str(item)}')
-                continue
-            
-            try:
-                # 将库存数据转换为JSON字符串
-                data_json = json.dumps(item['data'])
-                
-                new_data = InventoryData(
-                    table_id=table_id,
-                    data=data_json,
-                    created_by=current_user.id
-                )
-                db.session.add(new_data)
-                success_count += 1
-            except Exception as e:
-                error_count += 1
-                error_messages.append(f'添加数据失败: {str(e)}')
-        
-        db.session.commit()
-        return jsonify({
-            'code': 200,
-            'message': f'批量添加成功，成功{success_count}条，失败{error_count}条',
-            'data': {
-                'success_count': success_count,
-                'error_count': error_count,
-                'error_messages': error_messages
-            }
-        }), 200
+        results = bulk_insert_inventory_data(table, items, current_user.id)
     except Exception as e:
         db.session.rollback()
         return jsonify({'code': 500, 'message': f'批量添加库存数据失败: {str(e)}', 'data': None}), 500
+    
+    success_count = len([result for result in results if result['success']])
+    error_count = len(results) - success_count
+    return jsonify({
+        'code': 200,
+        'message': f'批量添加成功，成功{success_count}条，失败{error_count}条',
+        'data': {
+            'success_count': success_count,
+            'error_count': error_count,
+            'error_messages': [f'第{result["index"] + 1}条: {result["message"]}' for result in results if not result['success']],
+            'results': results
+        }
+    }), 200
+
+# 批量更新库存数据：{"items": [{"id": 1, "data": {...}}]} 或 {"ids": [...], "data": {...}}
+# data 为部分更新，只覆盖提交的列；所有行在同一事务中提交，逐行返回结果
+@app.route('/api/v1/tables/<int:table_id>/data/batch', methods=['PATCH'])
+@token_required
+def batch_update_inventory_data(current_user, table_id):
+    # 检查表格是否存在
+    table = TableStructure.query.get(table_id)
+    if not table:
+        return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
+    
+    # 检查用户权限，管理员、组长和组员都可以修改数据
+    if current_user.role not in ['admin', 'leader', 'member']:
+        return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
+    
+    data = request.get_json(silent=True) or {}
+    if 'ids' in data:
+        try:
+            ids = _parse_id_list(data.get('ids'))
+        except ValueError as e:
+            return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+        items = [{'id': data_id, 'data': data.get('data')} for data_id in ids]
+    else:
+        items = data.get('items')
+        if not items or not isinstance(items, list):
+            return jsonify({'code': 400, 'message': '批量数据格式错误', 'data': None}), 400
+        if len(items) > FETCH_IDS_LIMIT:
+            return jsonify({'code': 400, 'message': f'一次最多更新{FETCH_IDS_LIMIT}条数据', 'data': None}), 400
+    
+    schema = get_table_schema(table)
+    columns = schema.columns
+    
+    # 一次查询取回所有目标行
+    requested_ids = [item.get('id') for item in items
+                     if isinstance(item, dict) and isinstance(item.get('id'), int) and not isinstance(item.get('id'), bool)]
+    rows_by_id = {row.id: row for row in InventoryData.query.filter(
+        InventoryData.table_id == table_id,
+        InventoryData.id.in_(requested_ids)
+    ).all()} if requested_ids else {}
+    
+    # 逐行校验并合并部分更新
+    results = []
+    updates = []  # [(结果序号, 行, 旧位置, 新数据, 新位置)]
+    seen = set()
+    for i, item in enumerate(items):
+        data_id = item.get('id') if isinstance(item, dict) else None
+        patch = item.get('data') if isinstance(item, dict) else None
+        result = {'index': i, 'id': data_id, 'success': False, 'message': ''}
+        results.append(result)
+        if data_id not in rows_by_id:
+            result['message'] = '库存数据不存在'
+        elif data_id in seen:
+            result['message'] = '数据在本次提交中重复'
+        elif not patch or not isinstance(patch, dict):
+            result['message'] = '数据格式错误'
+        else:
+            seen.add(data_id)
+            row = rows_by_id[data_id]
+            old_data_obj = json.loads(row.data) if isinstance(row.data, str) else row.data
+            new_data = dict(old_data_obj)
+            new_data.update(patch)
+            updates.append((i, row, _storage_position_keys(old_data_obj, schema.storage_columns),
+                            new_data, _storage_position_keys(new_data, schema.storage_columns)))
+    
+    # 批量校验存储位置：一次查询取回涉及的冻存盒和格子
+    box_ids = {key[0] for _, _, old_keys, _, new_keys in updates for key in list(old_keys) + list(new_keys)}
+    box_ids.discard(None)
+    existing_box_ids = {box_id for (box_id,) in db.session.query(CryoBox.id).filter(CryoBox.id.in_(box_ids)).all()} if box_ids else set()
+    cells = {(cell.box_id, cell.row, cell.col): cell
+             for cell in CryoCell.query.filter(CryoCell.box_id.in_(box_ids)).all()} if box_ids else {}
+    # 本批中各行更新后仍占用的位置，用于判断其他行是否已让出某个位置
+    new_owner = {}
+    for i, row, old_keys, new_data, new_keys in updates:
+        for key in new_keys:
+            new_owner.setdefault(key, []).append(row.id)
+    updating_ids = {row.id for _, row, _, _, _ in updates}
+    
+    # 校验失败的行保持原位置不变，可能使其他行依赖的"让出"不再成立，因此重复校验直到没有新的失败
+    valid = updates
+    while True:
+        failed = []
+        for i, row, old_keys, new_data, new_keys in valid:
+            error = None
+            for key, pos in new_keys.items():
+                box_id, cell_row, cell_col = key
+                if not box_id or not cell_row or not cell_col:
+                    error = f'存储位置格式错误: {pos}'
+                elif box_id not in existing_box_ids:
+                    error = f'冻存盒不存在: {box_id}'
+                elif len(new_owner[key]) > 1:
+                    error = f'位置 {pos.get("label", "")} 在本次提交中被多行占用'
+                else:
+                    cell = cells.get(key)
+                    owner_id = cell.linked_data_id if cell else None
+                    # 被其他行占用，且该行没有在本批中让出此位置（本批更新的行若仍占用会在上面计入多行占用）
+                    if owner_id and owner_id != row.id and owner_id not in updating_ids:
+                        error = f'位置 {pos.get("label", "")} 已被占用'
+                if error:
+                    break
+            if error:
+                results[i]['message'] = error
+                failed.append((i, row, old_keys, new_data, new_keys))
+        if not failed:
+            break
+        for i, row, old_keys, new_data, new_keys in failed:
+            for key in new_keys:
+                new_owner[key].remove(row.id)
+            for key in old_keys:
+                new_owner.setdefault(key, []).append(row.id)
+            updating_ids.discard(row.id)
+        failed_indexes = {i for i, _, _, _, _ in failed}
+        valid = [update for update in valid if update[0] not in failed_indexes]
+    
+    try:
+        # 先释放不再占用的位置，再关联新位置，避免同批内交换位置时互相冲突
+        claimed = {key for _, _, _, _, new_keys in valid for key in new_keys}
+        for i, row, old_keys, new_data, new_keys in valid:
+            for key in old_keys:
+                if key not in claimed and key in cells:
+                    db.session.delete(cells.pop(key))
+        for i, row, old_keys, new_data, new_keys in valid:
+            row.data = json.dumps(new_data)
+            cell_json = _linked_cell_json(table, columns, row.id, new_data)
+            for key in new_keys:
+                cell = cells.get(key)
+                if cell:
+                    cell.data = cell_json
+                    cell.linked_table_id = table_id
+                    cell.linked_data_id = row.id
+                else:
+                    cells[key] = CryoCell(
+                        box_id=key[0], row=key[1], col=key[2],
+                        data=cell_json,
+                        linked_table_id=table_id,
+                        linked_data_id=row.id
+                    )
+                    db.session.add(cells[key])
+        db.session.commit()  # 一次性提交：所有行的数据更新 + 位置释放与关联
+    except Exception as e:
+        db.session.rollback()
+        err_msg = str(e)
+        if 'UNIQUE constraint' in err_msg or 'duplicate' in err_msg.lower():
+            return jsonify({'code': 400, 'message': '所选位置已被占用，请重新选择', 'data': None}), 400
+        return jsonify({'code': 500, 'message': f'批量更新库存数据失败: {err_msg}', 'data': None}), 500
+    
+    for i, row, old_keys, new_data, new_keys in valid:
+        results[i].update({'success': True, 'message': '更新成功', 'data': new_data})
+    success_count = len(valid)
+    return jsonify({
+        'code': 200,
+        'message': f'批量更新完成，成功{success_count}条，失败{len(results) - success_count}条',
+        'data': {
+            'success_count': success_count,
+            'error_count': len(results) - success_count,
+            'results': results
+        }
+    }), 200
 
 # 获取统计数据
 @app.route('/api/v1/reports/<int:table_id>/stats', methods=['GET'])
@@ -1591,7 +3229,63 @@ def get_inventory_stats(current_user, table_id):
         }
     }), 200
 
-# 数据导出API
+# CSV导出时每次从数据库读取并发送的行数
+app.config['EXPORT_CHUNK_SIZE'] = int(os.environ.get('EXPORT_CHUNK_SIZE', '1000'))
+
+
+def _iter_table_data_chunks(table_id, chunk_size):
+    """按 (created_at, id) 升序分块读取表格数据，每块返回 [(id, data, created_at)]。
+    每块是一次独立的查询，借助 (table_id, created_at, id) 索引定位，
+    不在整个下载期间占用读游标（SQLite 下长时间的读会阻塞其他请求提交写入）"""
+    after = None
+    while True:
+        query = db.session.query(
+            InventoryData.id, InventoryData.data, InventoryData.created_at,
+            literal_column('inventory_data.created_at')
+        ).filter(InventoryData.table_id == table_id)
+        if after:
+            query = query.filter(text(
+                '(inventory_data.created_at, inventory_data.id) > (:after_created_at, :after_id)'
+            ).bindparams(after_created_at=after[0], after_id=after[1]))
+        rows = query.order_by(InventoryData.created_at, InventoryData.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield [(row[0], row[1], row[2]) for row in rows]
+        # 游标使用数据库中created_at的原始文本，保证与排序一致
+        after = (rows[-1][3], rows[-1][0])
+        if len(rows) < chunk_size:
+            return
+
+
+def _generate_csv_export(table_id, columns, storage_text=False, gzip_output=False):
+    """逐块生成CSV导出内容（UTF-8，\r\n换行），内存占用与数据量无关；
+    表头单独先发出，gzip_output为True时输出gzip流，每块同步刷新保证及时发送"""
+    compressor = zlib.compressobj(wbits=31) if gzip_output else None  # wbits=31 输出gzip格式
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\r\n')
+    column_names = [col['column_name'] for col in columns]
+    
+    def drain():
+        chunk = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor:
+            chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return chunk
+    
+    writer.writerow(column_names)
+    yield drain()
+    for rows in _iter_table_data_chunks(table_id, app.config['EXPORT_CHUNK_SIZE']):
+        for _, data, _ in rows:
+            item_data = _project_row_data(json.loads(data), storage_text=storage_text)
+            values = (item_data.get(name) for name in column_names)
+            writer.writerow(['' if value is None else str(value) for value in values])
+        yield drain()
+    if compressor:
+        yield compressor.flush()
+
+
+# 数据导出API：按块流式生成CSV，gzip=1 时下载gzip压缩的 .csv.gz 文件
 @app.route('/api/v1/tables/<int:table_id>/export', methods=['GET'])
 @token_required
 def export_table_data(current_user, table_id):
@@ -1602,65 +3296,30 @@ def export_table_data(current_user, table_id):
         return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
     
     try:
-        # 获取所有数据
-        all_data = InventoryData.query.filter_by(table_id=table_id).all()
-        columns = json.loads(table.columns)
+        columns = get_table_schema(table).columns
         
-        # 生成CSV数据
-        import csv
-        from io import StringIO
-        
-        # 使用UTF-8编码的StringIO对象，处理中文分隔符
-        output = StringIO()
-        
-        # 写表头
-        header = [col['column_name'] for col in columns]
-        # 准备CSV数据，确保正确的分隔符
-        csv_lines = []
+        # 列投影：fields=列1,列2 只导出指定列，storage=text 时存储列只导出_text
+        try:
+            fields, storage_text = _parse_projection_args(columns)
+        except ValueError as e:
+            return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+        if fields is not None:
+            columns = [col for col in columns if col['column_name'] in fields]
         
-        # 添加表头
-        csv_lines.append(','.join(header))
+        gzip_output = request.args.get('gzip') == '1'
         
-        # 写数据行
-        for item in all_data:
-            item_data = json.loads(item.data)
-            # 确保每个值都转换为字符串，处理特殊字符
-            row = []
-            for col in columns:
-                value = item_data.get(col['column_name'], '')
-                # 如果值为None，转换为空字符串
-                if value is None:
-                    value = ''
-                else:
-                    value = str(value)
-                # 处理CSV特殊字符
-                # 1. 如果值包含逗号、引号或换行符，需要用引号包裹
-                # 2. 如果值包含引号，需要转换为双引号
-                if ',' in value or '"' in value or '\n' in value or '\r' in value:
-                    value = '"' + value.replace('"', '""') + '"'
-                row.append(value)
-            # 将数据行转换为CSV格式
-            csv_lines.append(','.join(row))
-        
-        # 使用Windows风格的换行符\r\n，确保跨平台兼容性
-        csv_content_str = '\r\n'.join(csv_lines)
-        # 转换为字节流
-        csv_content = csv_content_str.encode('utf-8')
-        
-        # 设置响应头
-        from flask import Response
         # 确保文件名使用UTF-8编码，解决中文文件名问题
         from urllib.parse import quote
-        filename = f'{table.table_name}_export.csv'
+        filename = f'{table.table_name}_export.csv' + ('.gz' if gzip_output else '')
         encoded_filename = quote(filename)
         
+        # 分块传输，不设置Content-Length，第一块（表头）立即发出
         return Response(
-            csv_content,
-            mimetype='text/csv',
+            stream_with_context(_generate_csv_export(table_id, columns, storage_text, gzip_output)),
+            mimetype='application/gzip' if gzip_output else 'text/csv',
             headers={
                 'Content-Disposition': f'attachment; filename="{encoded_filename}"',
-                'Content-Length': str(len(csv_content)),
-                'Content-Type': 'text/csv; charset=utf-8'
+                'Content-Type': 'application/gzip' if gzip_output else 'text/csv; charset=utf-8'
             }
         )
     except Exception as e:
@@ -1670,93 +3329,204 @@ def export_table_data(current_user, table_id):
         # 返回JSON格式的错误响应
         return jsonify({'code': 500, 'message': f'数据导出失败: {str(e)}', 'data': None}), 500
 
-# 数据导入API
+# CSV导入时最多返回的逐行错误信息条数
+IMPORT_ERROR_MESSAGE_LIMIT = 1000
+
+
+def _insert_csv_chunk(table, schema, rows, created_by):
+    """写入一块CSV行：为编号为空的自增列分配连续编号，executemany 插入后提交"""
+    for column_name, prefix, _ in schema.auto_increment_columns:
+        missing_rows = [row_data for _, row_data in rows if not row_data.get(column_name)]
+        if missing_rows:
+            start = allocate_auto_increment_range(table.id, column_name, len(missing_rows))
+            for offset, row_data in enumerate(missing_rows):
+                row_data[column_name] = f"{prefix}{start + offset}"
+    db.session.execute(insert(InventoryData), [
+        {'table_id': table.id, 'data': json.dumps(row_data), 'created_by': created_by}
+        for _, row_data in rows
+    ])
+    db.session.commit()
+
+
+class CsvImportError(ValueError):
+    """CSV导入中途解析失败；之前的块已经提交，progress为失败时的导入进度"""
+
+    def __init__(self, message, progress):
+        super().__init__(message)
+        self.progress = progress
+
+
+def _import_csv_rows(table, csv_file, created_by):
+    """流式导入CSV：逐行解析，按块写入并逐块提交，内存占用与文件大小无关。
+    校验表头后先产出一次进度，之后每写入一块产出一次，最后产出带 done=True 的导入结果；
+    表头不匹配时抛出ValueError。
+    导入不是原子操作：文件中途解码或解析失败时抛出CsvImportError，此前已提交的块不会回滚"""
+    schema = get_table_schema(table)
+    column_names = schema.column_names
+    
+    reader = csv.reader(csv_file)
+    headers = next(reader, None)
+    if not headers:
+        raise ValueError('CSV文件为空')
+    if len(headers) != len(column_names):
+        raise ValueError(f'CSV表头数量不匹配，需要{len(column_names)}列，CSV文件有{len(headers)}列')
+    for i, header in enumerate(headers):
+        if header != column_names[i]:
+            raise ValueError(f'CSV表头内容不匹配，第{i+1}列应为"{column_names[i]}"，实际为"{header}"')
+    
+    progress = {'done': False, 'processed_count': 0, 'success_count': 0, 'fail_count': 0}
+    yield dict(progress)
+    try:
+        yield from _import_csv_body(table, schema, reader, csv_file, created_by, progress)
+    except (ValueError, csv.Error) as e:
+        db.session.rollback()
+        raise CsvImportError(
+            f'CSV解析失败: {str(e)}。已导入的{progress["success_count"]}条数据已保存，不会回滚',
+            dict(progress)) from e
+
+
+def _import_csv_body(table, schema, reader, csv_file, created_by, progress):
+    """_import_csv_rows 的数据行部分：逐块写入并产出进度"""
+    chunk_size = app.config['BULK_INSERT_CHUNK_SIZE']
+    column_names = schema.column_names
+    error_messages = []
+    
+    # 自增列：先扫描一遍文件，把序列推进到CSV中已有的最大编号，之后为空缺行分配的编号不会与之冲突
+    auto_columns = [(column_names.index(column_name), column_name, pattern)
+                    for column_name, _, pattern in schema.auto_increment_columns]
+    if auto_columns:
+        max_values = {column_name: 0 for _, column_name, _ in auto_columns}
+        for row in reader:
+            for i, column_name, pattern in auto_columns:
+                match = pattern.match(row[i]) if i < len(row) else None
+                if match:
+                    max_values[column_name] = max(max_values[column_name], int(match.group(1)))
+        for column_name, max_value in max_values.items():
+            if max_value:
+                reset_auto_increment(table.id, column_name, max_value, only_forward=True)
+        db.session.commit()
+        csv_file.seek(0)
+        reader = csv.reader(csv_file)
+        next(reader, None)
+    
+    def add_error(message):
+        progress['fail_count'] += 1
+        if len(error_messages) < IMPORT_ERROR_MESSAGE_LIMIT:
+            error_messages.append(message)
+    
+    def flush(rows):
+        try:
+            _insert_csv_chunk(table, schema, rows, created_by)
+            progress['success_count'] += len(rows)
+        except Exception as e:
+            db.session.rollback()
+            for row_num, _ in rows:
+                add_error(f'第{row_num}行，写入失败: {str(e)}')
+    
+    pending = []  # [(行号, 行数据)]
+    for row_num, row in enumerate(reader, start=2):  # 从第2行开始处理数据
+        progress['processed_count'] += 1
+        if len(row) != len(column_names):
+            add_error(f'第{row_num}行，列数不匹配，需要{len(column_names)}列，实际有{len(row)}列')
+            continue
+        pending.append((row_num, dict(zip(column_names, row))))
+        if len(pending) >= chunk_size:
+            flush(pending)
+            pending = []
+            yield dict(progress)
+    if pending:
+        flush(pending)
+    
+    if progress['fail_count'] > len(error_messages):
+        error_messages.append(f'另有{progress["fail_count"] - len(error_messages)}行失败，未逐一列出')
+    yield dict(progress, done=True, error_messages=error_messages)
+
+
+# 数据导入API：multipart 上传 file 字段（按行流式读取），或 JSON 中的 csv_content；
+# 查询参数 stream=1 时以 NDJSON 逐块返回导入进度，最后一行为导入结果；async=1 时提交为后台任务。
+# 数据按块提交，导入不是原子操作：中途解析失败时返回400，data中为失败前的导入进度（已写入的行保留）
 @app.route('/api/v1/tables/<int:table_id>/import', methods=['POST'])
 @token_required
 def import_table_data(current_user, table_id):
     # 检查表格是否存在
     table = TableStructure.query.get(table_id)
     if not table:
-        return jsonify({'code': 404, 'message': '����ṹ������', 'data': None}), 404
+        return jsonify({'code': 404, 'message': '表格结构不存在', 'data': None}), 404
     
     # 检查用户权限
     if current_user.role not in ['admin', 'leader']:
         return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
     
-    try:
-        data = request.get_json()
+    stream = request.args.get('stream') == '1'
+    upload = request.files.get('file')
+    if request.args.get('async') == '1':
+        if upload:
+            source = upload.stream
+        else:
+            csv_content = (request.get_json(silent=True) or {}).get('csv_content')
+            if not csv_content:
+                return jsonify({'code': 400, 'message': 'CSV数据不能为空', 'data': None}), 400
+            source = io.BytesIO(csv_content.encode('utf-8'))
+        return submit_job_response('import_table_data', current_user, params={'table_id': table.id}, upload=source)
+    if upload:
+        # 上传文件较大时由 werkzeug 暂存到磁盘，这里按行解码读取，不整体载入内存
+        upload_file = upload.stream
+        if stream:
+            # 流式响应开始时请求中的上传文件已被关闭，先分块复制到独立的临时文件
+            upload_file = tempfile.TemporaryFile()
+            shutil.copyfileobj(upload.stream, upload_file)
+            upload_file.seek(0)
+        csv_file = io.TextIOWrapper(upload_file, encoding='utf-8-sig', newline='')
+    else:
+        data = request.get_json(silent=True) or {}
         csv_content = data.get('csv_content')
-        
         if not csv_content:
             return jsonify({'code': 400, 'message': 'CSV数据不能为空', 'data': None}), 400
-        
-        # 解析CSV数据
-        import csv
-        from io import StringIO
-        
-        csv_file = StringIO(csv_content)
-        reader = csv.reader(csv_file)
-        
-        # 获取表头
-        headers = next(reader, None)
-        if not headers:
-            return jsonify({'code': 400, 'message': 'CSV文件为空', 'data': None}), 400
-        
-        # 获取表格列配置
-        columns = json.loads(table.columns)
-        column_names = [col['column_name'] for col in columns]
-        
-        # 验证表头与列配置是否匹配
-        if len(headers) != len(column_names):
-            return jsonify({'code': 400, 'message': f'CSV表头数量不匹配，需要{len(column_names)}列，CSV文件有{len(headers)}列', 'data': None}), 400
-        
-        for i, header in enumerate(headers):
-            if header != column_names[i]:
-                return jsonify({'code': 400, 'message': f'CSV表头内容不匹配，第{i+1}列应为"{column_names[i]}"，实际为"{header}"', 'data': None}), 400
-        
-        # 处理数据行
-        success_count = 0
-        fail_count = 0
-        error_messages = []
-        
-        for row_num, row in enumerate(reader, start=2):  # 从第2行开始处理数据
-            if len(row) != len(columns):
-                fail_count += 1
-                error_messages.append(f'第{row_num}行，列数不匹配，需要{len(columns)}列，实际有{len(row)}列')
-                continue
-            
+        csv_file = io.StringIO(csv_content)
+    
+    rows = _import_csv_rows(table, csv_file, current_user.id)
+    try:
+        result = next(rows)  # 校验表头
+    except (ValueError, csv.Error) as e:
+        csv_file.close()
+        return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+    
+    def result_message(result):
+        return f'数据导入成功，成功{result["success_count"]}条，失败{result["fail_count"]}条'
+    
+    if stream:
+        def generate():
+            yield json.dumps({'code': 200, 'message': '导入中', 'data': result}, ensure_ascii=False) + '\n'
             try:
-                # 构建数据字典
-                row_data = {}
-                for i, col in enumerate(columns):
-                    row_data[col['column_name']] = row[i]
-                
-                # 保存库存数据记录
-                new_data = InventoryData(
-                    table_id=table_id,
-                    data=json.dumps(row_data),
-                    created_by=current_user.id
-                )
-                db.session.add(new_data)
-                success_count += 1
+                for progress in rows:
+                    message = result_message(progress) if progress['done'] else '导入中'
+                    yield json.dumps({'code': 200, 'message': message, 'data': progress}, ensure_ascii=False) + '\n'
+            except CsvImportError as e:
+                yield json.dumps({'code': 400, 'message': str(e), 'data': e.progress}, ensure_ascii=False) + '\n'
             except Exception as e:
-                fail_count += 1
-                error_messages.append(f'第{row_num}行，处理失败: {str(e)}')
-        
-        db.session.commit()
-        
-        return jsonify({
-            'code': 200,
-            'message': f'数据导入成功，成功{success_count}条，失败{fail_count}条',
-            'data': {
-                'success_count': success_count,
-                'fail_count': fail_count,
-                'error_messages': error_messages
-            }
-        }), 200
+                db.session.rollback()
+                yield json.dumps({'code': 500, 'message': f'数据导入失败: {str(e)}', 'data': None}, ensure_ascii=False) + '\n'
+            finally:
+                csv_file.close()
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    try:
+        for result in rows:
+            pass
+    except CsvImportError as e:
+        # 导入不是原子操作，返回失败前已写入的行数
+        return jsonify({'code': 400, 'message': str(e), 'data': e.progress}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'code': 500, 'message': f'数据导入失败: {str(e)}', 'data': None}), 500
+    finally:
+        csv_file.close()
+    
+    return jsonify({
+        'code': 200,
+        'message': result_message(result),
+        'data': result
+    }), 200
 
 # Bug反馈API - 提交Bug
 @app.route('/api/v1/bugs', methods=['POST'])
@@ -1874,6 +3644,148 @@ def delete_bug(current_user, bug_id):
         db.session.rollback()
         return jsonify({'code': 500, 'message': f'删除Bug失败: {str(e)}', 'data': None}), 500
 
+# 整库导出时输出逐行/逐列诊断信息（默认关闭，大库导出时逐行打印会严重拖慢速度）
+app.config['EXPORT_DEBUG'] = os.environ.get('EXPORT_DEBUG', '0') == '1'
+
+# 导出属性工作表的表头，import_workbook 按此校验
+EXPORT_PROPERTIES_HEADERS = ['column_name', 'data_type', 'dropDown', 'autoIncrement', 'prefix', 'hidden', 'is_storage']
+
+
+def _export_cell_value(value):
+    """把行数据中的值转换为Excel可写入的基本类型：链接/存储对象取文本部分"""
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        if '_text' in value:
+            value = value['_text']
+        elif '_storage' in value:
+            value = ''
+        else:
+            value = json.dumps(value)
+    if not isinstance(value, (str, int, float, bool)):
+        value = str(value)
+    return value
+
+
+def build_all_data_workbook(output, on_progress=None):
+    """把所有表格（数据与列属性）和冻存数据写成一个工作簿保存到output；
+    on_progress(已处理表格数, 表格总数, 说明)在处理每个表格前调用；没有表格时抛出ValueError。
+    使用openpyxl的write_only模式，数据行按块从数据库读取后直接写出，内存占用与数据量无关"""
+    from openpyxl import Workbook
+    debug = app.config['EXPORT_DEBUG']
+    
+    tables = TableStructure.query.all()
+    print(f"开始导出所有数据，共{len(tables)}个表格")
+    if not tables:
+        raise ValueError('没有可导出的表格数据')
+    
+    # write_only 工作簿没有默认工作表，行写出后不能再读取
+    wb = Workbook(write_only=True)
+    
+    # 冻存格子导出时需要关联数据行在表格中的序号，只记录被格子关联的数据行
+    linked_data_ids = {}
+    for linked_table_id, linked_data_id in db.session.query(
+        CryoCell.linked_table_id, CryoCell.linked_data_id
+    ).filter(CryoCell.linked_table_id.isnot(None), CryoCell.linked_data_id.isnot(None)):
+        linked_data_ids.setdefault(linked_table_id, set()).add(linked_data_id)
+    data_index_map = {}  # {table_id: {data_id: 序号}}
+    
+    for index, table in enumerate(tables):
+        table_name = table.table_name
+        if on_progress:
+            on_progress(index, len(tables), f'正在导出{table_name}')
+        
+        try:
+            columns = json.loads(table.columns)
+        except json.JSONDecodeError as e:
+            print(f"解析表格{table_name}的columns失败，跳过: {str(e)}")
+            continue
+        
+        # 工作表名称不超过31个字符
+        data_ws = wb.create_sheet(title=table_name[:31])
+        properties_ws = wb.create_sheet(title=f"{table_name[:25]}_属性")
+        
+        # 列属性工作表
+        properties_ws.append(EXPORT_PROPERTIES_HEADERS)
+        for col in columns:
+            properties_row = [
+                col.get('column_name', ''),
+                col.get('data_type', 'string'),
+                col.get('dropDown', False),
+                col.get('autoIncrement', False),
+                col.get('prefix', ''),
+                col.get('hidden', False),
+                col.get('is_storage', False)
+            ]
+            properties_ws.append(properties_row)
+            if debug:
+                print(f"表格{table_name}列属性: {properties_row}")
+        
+        # 数据工作表：表头包含所有列名和创建时间，数据行按 (created_at, id) 顺序分块读取
+        column_names = [col['column_name'] for col in columns]
+        data_ws.append(column_names + ['创建时间'])
+        table_linked_ids = linked_data_ids.get(table.id, set())
+        table_index_map = data_index_map[table.id] = {}
+        row_count = 0
+        for rows in _iter_table_data_chunks(table.id, app.config['EXPORT_CHUNK_SIZE']):
+            for data_id, data, created_at in rows:
+                if data_id in table_linked_ids:
+                    table_index_map[data_id] = row_count
+                row_count += 1
+                try:
+                    item_data = json.loads(data)
+                    row = [_export_cell_value(item_data.get(name, '')) for name in column_names]
+                    row.append(created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else '')
+                    data_ws.append(row)
+                    if debug:
+                        print(f"表格{table_name}数据行 {row_count}: {row}")
+                except Exception as e:
+                    print(f"处理表格{table_name}的数据行 {row_count}失败，跳过: {str(e)}")
+                    if debug:
+                        print(f"数据行原始内容: {data}")
+        print(f"导出表格{table_name}: {len(columns)}列，{row_count}条数据")
+    
+    # ===== 导出冻存数据 =====
+    tanks = NitrogenTank.query.all()
+    if tanks:
+        tank_names = {t.id: t.name for t in tanks}
+        tank_ws = wb.create_sheet(title='_cryo_tanks')
+        tank_ws.append(['id', 'name', 'description', 'created_at'])
+        for t in tanks:
+            tank_ws.append([t.id, t.name, t.description or '',
+                t.created_at.strftime('%Y-%m-%d %H:%M:%S') if t.created_at else ''])
+        
+        box_ws = wb.create_sheet(title='_cryo_boxes')
+        box_ws.append(['id', 'tank_name', 'box_name', 'box_description', 'created_at'])
+        boxes = CryoBox.query.all()
+        box_names = {b.id: b.box_name for b in boxes}
+        for b in boxes:
+            box_ws.append([b.id, tank_names.get(b.tank_id, ''), b.box_name,
+                b.box_description or '',
+                b.created_at.strftime('%Y-%m-%d %H:%M:%S') if b.created_at else ''])
+        
+        cell_ws = wb.create_sheet(title='_cryo_cells')
+        cell_ws.append(['box_name', 'row', 'col', 'label', 'is_manual', 'reason',
+            'linked_table_name', 'linked_data_index'])
+        table_names = {table.id: table.table_name for table in tables}
+        cell_count = 0
+        for c in CryoCell.query.yield_per(app.config['EXPORT_CHUNK_SIZE']):
+            cell_data = json.loads(c.data) if c.data else {}
+            # 关联信息用于导入时按表格名称和数据行序号重新关联
+            linked_table_name = ''
+            linked_data_index = ''
+            if c.linked_table_id and c.linked_data_id:
+                linked_table_name = table_names.get(c.linked_table_id, '')
+                linked_data_index = str(data_index_map.get(c.linked_table_id, {}).get(c.linked_data_id, ''))
+            cell_ws.append([box_names.get(c.box_id, ''), c.row, c.col, f'{ROW_LABELS[c.row-1]}{c.col}',
+                str(cell_data.get('_manual', False)), cell_data.get('_reason', ''),
+                linked_table_name, linked_data_index])
+            cell_count += 1
+        print(f"导出冻存数据: {len(tanks)}个液氮罐，{len(boxes)}个冻存盒，{cell_count}个格子")
+    
+    wb.save(output)
+
+
 # 数据导出API - 将所有表格数据导出为XLS文件
 @app.route('/api/v1/export-all-data', methods=['GET'])
 @token_required
@@ -1892,239 +3804,24 @@ def export_all_data(current_user):
         
         return jsonify({'code': 403, 'message': '权限不足，只有管理员可以执行此操作', 'data': None}), 403
     
+    # ?async=1 时提交为后台任务，完成后通过任务的 download_url 下载
+    if request.args.get('async') == '1':
+        return submit_job_response('export_all_data', current_user)
+    
     try:
-        print("开始执行导出所有数据功能")
-        from io import BytesIO
-        from openpyxl import Workbook
-        
-        # 创建工作簿
-        wb = Workbook()
-        print("成功创建工作簿")
-        
-        # 获取所有表格结构
-        tables = TableStructure.query.all()
-        print(f"成功获取{len(tables)}个表格结构")
-        
-        if not tables:
-            print("没有可导出的表格数据")
-            return jsonify({'code': 400, 'message': '没有可导出的表格数据', 'data': None}), 400
-        
-        # 删除默认工作表
-        # 遍历所有工作表，删除名称为'Sheet'或'Sheet1'的默认工作表
-        for sheet in wb.sheetnames:
-            if sheet in ['Sheet', 'Sheet1']:
-                del wb[sheet]
-                print(f"成功删除默认工作表: {sheet}")
-                break
-        
-        # 为每个表格创建一个工作表
-        for table in tables:
-            table_name = table.table_name
-            print(f"\n===== 开始处理表格: {table_name} (ID: {table.id}) =====")
-            
-            # 输出表格完整信息
-            print(f"表格完整信息: {table}")
-            print(f"表格columns字段原始内容: {table.columns}")
-            
-            # 解析columns
-            try:
-                columns = json.loads(table.columns)
-                print(f"成功解析表格{table_name}的columns: {len(columns)}列")
-                print(f"列配置详情: {columns}")
-            except json.JSONDecodeError as e:
-                print(f"解析表格{table_name}的columns失败: {str(e)}")
-                print(f"columns原始内容: {table.columns}")
-                continue  # 跳过无法解析columns的表格
-            
-            # 显示当前工作簿中的工作表（创建数据工作表前）
-            print(f"当前工作簿中的工作表（创建数据工作表前）: {wb.sheetnames}")
-            
-            # 创建数据工作表，确保工作表名称不超过31个字符
-            data_sheet_name = table_name[:31]
-            data_ws = wb.create_sheet(title=data_sheet_name)
-            print(f"成功创建数据工作表: {data_sheet_name}")
-            print(f"数据工作表对象: {data_ws}")
-            print(f"当前工作簿中的工作表（创建数据工作表后）: {wb.sheetnames}")
-            
-            # 创建列属性工作表，名称不超过31个字符
-            properties_sheet_name = f"{table_name[:25]}_属性"
-            properties_ws = wb.create_sheet(title=properties_sheet_name)
-            print(f"成功创建列属性工作表: {properties_sheet_name}")
-            print(f"属性工作表对象: {properties_ws}")
-            print(f"当前工作簿中的工作表（创建属性工作表后）: {wb.sheetnames}")
-            
-            # 写入列属性工作表
-            # 列属性表头
-            properties_headers = ['column_name', 'data_type', 'dropDown', 'autoIncrement', 'prefix', 'hidden', 'is_storage']
-            print(f"写入属性工作表表头: {properties_headers}")
-            headers_result = properties_ws.append(properties_headers)
-            print(f"写入表头结果: {headers_result}")
-            
-            # 验证表头写入
-            header_row = next(properties_ws.iter_rows(min_row=1, max_row=1, values_only=True))
-            print(f"属性工作表表头实际内容: {header_row}")
-            
-            # 写入列属性数据
-            print("开始写入列属性数据:")
-            for i, col in enumerate(columns):
-                properties_row = [
-                    col.get('column_name', ''),
-                    col.get('data_type', 'string'),
-                    col.get('dropDown', False),
-                    col.get('autoIncrement', False),
-                    col.get('prefix', ''),
-                    col.get('hidden', False),
-                    col.get('is_storage', False)
-                ]
-                print(f"写入第{i+1}列属性: {properties_row}")
-                row_result = properties_ws.append(properties_row)
-                print(f"写入行结果: {row_result}")
-                
-                # 验证写入是否成功
-                row_count = sum(1 for _ in properties_ws.iter_rows())
-                print(f"属性工作表当前行数: {row_count}")
-                
-                # 读取并打印刚刚写入的行
-                written_row = next(properties_ws.iter_rows(min_row=i+2, max_row=i+2, values_only=True))
-                print(f"刚刚写入的行实际内容: {written_row}")
-            
-            # 验证属性工作表完整内容
-            print(f"\n=== 属性工作表{properties_sheet_name}完整内容 ===")
-            for i, row in enumerate(properties_ws.iter_rows(), 1):
-                row_values = [cell.value for cell in row]
-                print(f"第{i}行: {row_values}")
-            
-            print(f"\n===== 成功处理表格: {table_name} =====")
-            
-            # 获取表格数据
-            all_data = InventoryData.query.filter_by(table_id=table.id).all()
-            print(f"成功获取表格{table_name}的{len(all_data)}条数据")
-            
-            # 生成数据工作表表头，包含所有列名和创建时间
-            data_headers = [col['column_name'] for col in columns] + ['创建时间']
-            data_ws.append(data_headers)
-            print(f"成功写入数据工作表表头: {data_headers}")
-            
-            # 写数据行
-            for i, item in enumerate(all_data):
-                try:
-                    print(f"处理表格{table_name}的数据行 {i+1}/{len(all_data)}")
-                    
-                    # 将JSON字符串转换为Python对象
-                    item_data = json.loads(item.data)
-                    
-                    # 处理数据行
-                    row = []
-                    for col in columns:
-                        value = item_data.get(col['column_name'], '')
-                        # 确保value不是None
-                        if value is None:
-                            value = ''
-                        
-                        # 处理链接对象和存储对象，提取文本部分
-                        if isinstance(value, dict):
-                            if '_text' in value:
-                                value = value['_text']
-                            elif '_storage' in value:
-                                value = value.get('_text', '')
-                            else:
-                                value = json.dumps(value)
-                        
-                        # 确保value是基本类型，可被Excel处理
-                        if not isinstance(value, (str, int, float, bool)):
-                            value = str(value)
-                        
-                        row.append(value)
-                    
-                    # 添加创建时间
-                    row.append(item.created_at.strftime('%Y-%m-%d %H:%M:%S'))
-                    data_ws.append(row)
-                    print(f"成功写入表格{table_name}的数据行 {i+1}")
-                except Exception as e:
-                    print(f"处理表格{table_name}的数据行 {i+1}失败: {str(e)}")
-                    # 打印详细错误信息，便于调试
-                    print(f"数据行原始内容: {item.data}")
-                    import traceback
-                    traceback.print_exc()
-                    continue  # 跳过无法处理的数据行
-            
-            print(f"成功写入表格{table_name}的所有数据")
-        
-        # 保存工作簿前的最终检查
-        print(f"\n=== 保存工作簿前的最终检查 ===")
-        print(f"工作簿中包含的所有工作表: {wb.sheetnames}")
-        
-        # 检查每个属性工作表的内容
-        for sheet_name in wb.sheetnames:
-            if sheet_name.endswith('_属性'):
-                print(f"\n=== 属性工作表{sheet_name}最终内容 ===")
-                ws = wb[sheet_name]
-                for i, row in enumerate(ws.iter_rows(), 1):
-                    row_values = [cell.value for cell in row]
-                    print(f"第{i}行: {row_values}")
-        
-        # ===== 导出冻存数据 =====
-        print("\n===== 开始导出冻存管理数据 =====")
-        tanks = NitrogenTank.query.all()
-        if tanks:
-            # Tanks sheet
-            tank_ws = wb.create_sheet(title='_cryo_tanks')
-            tank_ws.append(['id', 'name', 'description', 'created_at'])
-            for t in tanks:
-                tank_ws.append([t.id, t.name, t.description or '',
-                    t.created_at.strftime('%Y-%m-%d %H:%M:%S') if t.created_at else ''])
-            print(f"导出 {len(tanks)} 个液氮罐")
-
-            # Boxes sheet
-            box_ws = wb.create_sheet(title='_cryo_boxes')
-            box_ws.append(['id', 'tank_name', 'box_name', 'box_description', 'created_at'])
-            boxes = CryoBox.query.all()
-            for b in boxes:
-                tank = NitrogenTank.query.get(b.tank_id)
-                box_ws.append([b.id, tank.name if tank else '', b.box_name,
-                    b.box_description or '',
-                    b.created_at.strftime('%Y-%m-%d %H:%M:%S') if b.created_at else ''])
-            print(f"导出 {len(boxes)} 个冻存盒")
-
-            # Cells sheet
-            cell_ws = wb.create_sheet(title='_cryo_cells')
-            cell_ws.append(['box_name', 'row', 'col', 'label', 'is_manual', 'reason',
-                'linked_table_name', 'linked_data_index'])
-            cells = CryoCell.query.all()
-            # Pre-build data row index lookup: {table_id: {data_id: index}}
-            data_index_map = {}
-            for table in tables:
-                all_rows = InventoryData.query.filter_by(table_id=table.id).order_by(InventoryData.created_at).all()
-                data_index_map[table.id] = {row.id: idx for idx, row in enumerate(all_rows)}
-            for c in cells:
-                box = CryoBox.query.get(c.box_id)
-                box_name = box.box_name if box else ''
-                cell_data = json.loads(c.data) if c.data else {}
-                is_manual = cell_data.get('_manual', False)
-                reason = cell_data.get('_reason', '')
-                label = f'{ROW_LABELS[c.row-1]}{c.col}'
-
-                # Linked info for re-linking on import
-                linked_table_name = ''
-                linked_data_index = ''
-                if c.linked_table_id and c.linked_data_id:
-                    lt = TableStructure.query.get(c.linked_table_id)
-                    linked_table_name = lt.table_name if lt else ''
-                    idx_map = data_index_map.get(c.linked_table_id, {})
-                    linked_data_index = str(idx_map.get(c.linked_data_id, ''))
-
-                cell_ws.append([box_name, c.row, c.col, label, str(is_manual), reason,
-                    linked_table_name, linked_data_index])
-            print(f"导出 {len(cells)} 个冻存格子")
-
-        # 将工作簿保存到BytesIO对象
-        print("\n=== 开始保存工作簿到BytesIO对象 ===")
-        output = BytesIO()
-        wb.save(output)
-        print(f"工作簿保存成功，BytesIO位置: {output.tell()}字节")
-        
+        # 工作簿写入磁盘临时文件再分块发送，响应结束后自动删除
+        from werkzeug.wsgi import wrap_file
+        output = tempfile.TemporaryFile()
+        try:
+            build_all_data_workbook(output)
+        except ValueError as e:
+            output.close()
+            return jsonify({'code': 400, 'message': str(e), 'data': None}), 400
+        except Exception:
+            output.close()
+            raise
+        size = output.tell()
         output.seek(0)
-        print(f"BytesIO重置位置: {output.tell()}字节")
         
         # 记录操作日志
         log = OperationLog(
@@ -2135,26 +3832,16 @@ def export_all_data(current_user):
         )
         db.session.add(log)
         db.session.commit()
-        print("成功记录操作日志")
-        
-        # 设置响应头
-        from flask import Response
-        print("准备返回响应")
         
-        # 创建响应对象
-        response = Response(
-            output.getvalue(),
+        return Response(
+            wrap_file(request.environ, output),
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             headers={
                 'Content-Disposition': 'attachment; filename="all_data.xlsx"',
-                'Content-Length': str(len(output.getvalue())),
-            }
+                'Content-Length': str(size),
+            },
+            direct_passthrough=True
         )
-        
-        print(f"响应对象创建成功，响应内容长度: {len(output.getvalue())}字节")
-        print(f"响应头: {dict(response.headers)}")
-        
-        return response
     except Exception as e:
         import traceback
         error_msg = f"导出所有数据发生错误: {str(e)}"
@@ -2163,133 +3850,121 @@ def export_all_data(current_user):
         print(error_trace)
         return jsonify({'code': 500, 'message': '服务器内部错误，请联系管理员', 'data': None}), 500
 
-# 数据导入API - 从XLS文件导入数据
-@app.route('/api/v1/import-data', methods=['POST'])
-@token_required
-def import_data(current_user):
-    # 检查用户权限，只有admin角色可以执行此操作
-    if current_user.role != 'admin':
-        # 记录操作日志
-        log = OperationLog(
-            user_id=current_user.id,
-            operation='import_data',
-            table_id=None,
-            data_id=None
-        )
-        db.session.add(log)
-        db.session.commit()
-        
-        return jsonify({'code': 403, 'message': '权限不足，只有管理员可以执行此操作', 'data': None}), 403
+def import_workbook(file, user_id, on_progress=None):
+    """从导出格式的工作簿导入表格数据和冻存数据，返回每个工作表的导入结果；
+    on_progress(已处理工作表数, 工作表总数, 说明)在处理每个数据工作表前调用"""
+    from openpyxl import load_workbook
+    
+    # 读取文件内容
+    wb = load_workbook(file)
+    
+    # 处理每个工作表
+    results = []
+    imported_tables = []
+    
+    # 首先区分数据工作表和属性工作表
+    data_sheets = []
+    properties_sheets = {}
+    
+    for sheet_name in wb.sheetnames:
+        if sheet_name.startswith('_cryo_'):
+            continue  # 冻存数据工作表，稍后单独处理
+        if sheet_name.endswith('_属性'):
+            # 属性工作表，提取原始表格名称
+            original_table_name = sheet_name[:-3]  # 移除'_属性'后缀
+            properties_sheets[original_table_name] = sheet_name
+        else:
+            # 数据工作表
+            data_sheets.append(sheet_name)
     
-    try:
-        # 检查是否有文件上传
-        if 'file' not in request.files:
-            return jsonify({'code': 400, 'message': '请选择要导入的XLS文件', 'data': None}), 400
+    print(f"识别到数据工作表: {data_sheets}")
+    print(f"识别到属性工作表: {properties_sheets}")
+    
+    # 处理每个数据工作表
+    print(f"准备处理{len(data_sheets)}个数据工作表")
+    for i, sheet_name in enumerate(data_sheets):
+        print(f"\n===== 开始处理第{i+1}个数据工作表: {sheet_name} =====")
+        if on_progress:
+            on_progress(i, len(data_sheets), f'正在导入{sheet_name}')
+        ws = wb[sheet_name]
+        imported_tables.append(sheet_name)
         
-        file = request.files['file']
+        # 获取表头
+        try:
+            header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
+            print(f"工作表{sheet_name}的表头: {header_row}")
+            print(f"表头长度: {len(header_row)}")
+        except StopIteration:
+            print(f"工作表{sheet_name}没有表头行")
+            results.append({
+                'table_name': sheet_name,
+                'status': 'failed',
+                'message': '工作表没有表头行'
+            })
+            continue
         
-        if file.filename == '':
-            return jsonify({'code': 400, 'message': '请选择要导入的XLS文件', 'data': None}), 400
+        if len(header_row) < 2:  # 至少需要一个列名和一个数据行
+            print(f"工作表{sheet_name}表头格式不正确，至少需要一个列名和一个数据行")
+            results.append({
+                'table_name': sheet_name,
+                'status': 'failed',
+                'message': '表头格式不正确，至少需要一个列名和一个数据行'
+            })
+            continue
         
-        # 检查文件扩展名
-        if not file.filename.endswith('.xlsx') and not file.filename.endswith('.xls'):
-            return jsonify({'code': 400, 'message': '只支持XLS和XLSX文件格式', 'data': None}), 400
+        # 检查是否包含创建时间列
+        created_at_column_index = None
+        for i, header in enumerate(header_row):
+            if header == '创建时间':
+                created_at_column_index = i
+                break
         
-        from openpyxl import load_workbook
+        if created_at_column_index is None:
+            print(f"工作表{sheet_name}缺少创建时间列")
+            results.append({
+                'table_name': sheet_name,
+                'status': 'failed',
+                'message': '缺少创建时间列'
+            })
+            continue
+        else:
+            print(f"工作表{sheet_name}的创建时间列索引: {created_at_column_index}")
         
-        # 读取文件内容
-        wb = load_workbook(file)
+        # 获取数据列名
+        data_headers = header_row[:created_at_column_index] + header_row[created_at_column_index+1:]
         
-        # 处理每个工作表
-        results = []
-        imported_tables = []
+        # 查找对应的属性工作表
+        columns_def = []
+        properties_ws = None
         
-        # 首先区分数据工作表和属性工作表
-        data_sheets = []
-        properties_sheets = {}
+        print(f"准备查找表格{sheet_name}的属性工作表")
+        print(f"当前properties_sheets字典: {properties_sheets}")
         
-        for sheet_name in wb.sheetnames:
-            if sheet_name.startswith('_cryo_'):
-                continue  # 冻存数据工作表，稍后单独处理
-            if sheet_name.endswith('_属性'):
-                # 属性工作表，提取原始表格名称
-                original_table_name = sheet_name[:-3]  # 移除'_属性'后缀
-                properties_sheets[original_table_name] = sheet_name
-            else:
-                # 数据工作表
-                data_sheets.append(sheet_name)
-        
-        print(f"识别到数据工作表: {data_sheets}")
-        print(f"识别到属性工作表: {properties_sheets}")
-        
-        # 处理每个数据工作表
-        print(f"准备处理{len(data_sheets)}个数据工作表")
-        for i, sheet_name in enumerate(data_sheets):
-            print(f"\n===== 开始处理第{i+1}个数据工作表: {sheet_name} =====")
-            ws = wb[sheet_name]
-            imported_tables.append(sheet_name)
+        if sheet_name in properties_sheets:
+            # 找到属性工作表
+            properties_sheet_name = properties_sheets[sheet_name]
+            print(f"找到表格{sheet_name}的属性工作表: {properties_sheet_name}")
             
-            # 获取表头
             try:
-                header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
-                print(f"工作表{sheet_name}的表头: {header_row}")
-                print(f"表头长度: {len(header_row)}")
-            except StopIteration:
-                print(f"工作表{sheet_name}没有表头行")
-                results.append({
-                    'table_name': sheet_name,
-                    'status': 'failed',
-                    'message': '工作表没有表头行'
-                })
-                continue
-            
-            if len(header_row) < 2:  # 至少需要一个列名和一个数据行
-                print(f"工作表{sheet_name}表头格式不正确，至少需要一个列名和一个数据行")
-                results.append({
-                    'table_name': sheet_name,
-                    'status': 'failed',
-                    'message': '表头格式不正确，至少需要一个列名和一个数据行'
-                })
-                continue
-            
-            # 检查是否包含创建时间列
-            created_at_column_index = None
-            for i, header in enumerate(header_row):
-                if header == '创建时间':
-                    created_at_column_index = i
-                    break
-            
-            if created_at_column_index is None:
-                print(f"工作表{sheet_name}缺少创建时间列")
-                results.append({
-                    'table_name': sheet_name,
-                    'status': 'failed',
-                    'message': '缺少创建时间列'
-                })
-                continue
-            else:
-                print(f"工作表{sheet_name}的创建时间列索引: {created_at_column_index}")
-            
-            # 获取数据列名
-            data_headers = header_row[:created_at_column_index] + header_row[created_at_column_index+1:]
-            
-            # 查找对应的属性工作表
-            columns_def = []
-            properties_ws = None
-            
-            print(f"准备查找表格{sheet_name}的属性工作表")
-            print(f"当前properties_sheets字典: {properties_sheets}")
-            
-            if sheet_name in properties_sheets:
-                # 找到属性工作表
-                properties_sheet_name = properties_sheets[sheet_name]
-                print(f"找到表格{sheet_name}的属性工作表: {properties_sheet_name}")
+                properties_ws = wb[properties_sheet_name]
+                print(f"成功获取属性工作表对象")
+            except KeyError:
+                print(f"无法找到属性工作表{properties_sheet_name}")
+                # 使用默认配置
+                for header in data_headers:
+                    columns_def.append({
+                        'column_name': header,
+                        'data_type': 'string',
+                        'hidden': False
+                    })
                 
-                try:
-                    properties_ws = wb[properties_sheet_name]
-                    print(f"成功获取属性工作表对象")
-                except KeyError:
-                    print(f"无法找到属性工作表{properties_sheet_name}")
+            # 读取属性工作表数据
+            try:
+                properties_rows = list(properties_ws.iter_rows(min_row=1, values_only=True))
+                print(f"属性工作表{properties_sheet_name}共有{len(properties_rows)}行数据")
+                
+                if len(properties_rows) < 2:  # 至少需要表头和一行数据
+                    print(f"属性工作表{properties_sheet_name}格式不正确，使用默认配置")
                     # 使用默认配置
                     for header in data_headers:
                         columns_def.append({
@@ -2297,14 +3972,14 @@ def import_data(current_user):
                             'data_type': 'string',
                             'hidden': False
                         })
+                else:
+                    # 解析属性工作表
+                    properties_header = properties_rows[0]
+                    print(f"属性工作表{properties_sheet_name}的表头: {properties_header}")
                     
-                # 读取属性工作表数据
-                try:
-                    properties_rows = list(properties_ws.iter_rows(min_row=1, values_only=True))
-                    print(f"属性工作表{properties_sheet_name}共有{len(properties_rows)}行数据")
-                    
-                    if len(properties_rows) < 2:  # 至少需要表头和一行数据
-                        print(f"属性工作表{properties_sheet_name}格式不正确，使用默认配置")
+                    # 验证属性表头
+                    if list(properties_header) != EXPORT_PROPERTIES_HEADERS:
+                        print(f"属性工作表{properties_sheet_name}表头不匹配，使用默认配置")
                         # 使用默认配置
                         for header in data_headers:
                             columns_def.append({
@@ -2313,413 +3988,412 @@ def import_data(current_user):
                                 'hidden': False
                             })
                     else:
-                        # 解析属性工作表
-                        properties_header = properties_rows[0]
-                        print(f"属性工作表{properties_sheet_name}的表头: {properties_header}")
-                        
-                        # 验证属性表头
-                        expected_headers = ['column_name', 'data_type', 'dropDown', 'autoIncrement', 'prefix', 'hidden', 'is_storage']
-                        if list(properties_header) != expected_headers:
-                            print(f"属性工作表{properties_sheet_name}表头不匹配，使用默认配置")
-                            # 使用默认配置
-                            for header in data_headers:
+                        # 使用属性工作表定义的列配置
+                        for row in properties_rows[1:]:
+                            if len(row) >= 6:
                                 columns_def.append({
-                                    'column_name': header,
-                                    'data_type': 'string',
-                                    'hidden': False
+                                    'column_name': row[0] or '',
+                                    'data_type': row[1] or 'string',
+                                    'dropDown': bool(row[2]),
+                                    'autoIncrement': bool(row[3]),
+                                    'prefix': row[4] or '',
+                                    'hidden': bool(row[5]),
+                                    'is_storage': bool(row[6]) if len(row) > 6 else False
                                 })
-                        else:
-                            # 使用属性工作表定义的列配置
-                            for row in properties_rows[1:]:
-                                if len(row) >= 6:
-                                    columns_def.append({
-                                        'column_name': row[0] or '',
-                                        'data_type': row[1] or 'string',
-                                        'dropDown': bool(row[2]),
-                                        'autoIncrement': bool(row[3]),
-                                        'prefix': row[4] or '',
-                                        'hidden': bool(row[5]),
-                                        'is_storage': bool(row[6]) if len(row) > 6 else False
-                                    })
-                            print(f"成功读取表格{sheet_name}的列属性: {len(columns_def)}列")
-                except Exception as e:
-                    print(f"读取属性工作表{properties_sheet_name}失败: {str(e)}")
-                    # 使用默认配置
-                    for header in data_headers:
-                        columns_def.append({
-                            'column_name': header,
-                            'data_type': 'string',
-                            'hidden': False
-                        })
-            else:
-                # 没有属性工作表，使用默认配置
-                print(f"未找到表格{sheet_name}的属性工作表，使用默认配置")
+                        print(f"成功读取表格{sheet_name}的列属性: {len(columns_def)}列")
+            except Exception as e:
+                print(f"读取属性工作表{properties_sheet_name}失败: {str(e)}")
+                # 使用默认配置
                 for header in data_headers:
                     columns_def.append({
                         'column_name': header,
                         'data_type': 'string',
-                        'hidden': False,
-                        'is_storage': False
+                        'hidden': False
                     })
+        else:
+            # 没有属性工作表，使用默认配置
+            print(f"未找到表格{sheet_name}的属性工作表，使用默认配置")
+            for header in data_headers:
+                columns_def.append({
+                    'column_name': header,
+                    'data_type': 'string',
+                    'hidden': False,
+                    'is_storage': False
+                })
+        
+        print(f"表格{sheet_name}的列配置: {columns_def}")
+        
+        try:
+            # 检查表格是否已存在
+            existing_table = TableStructure.query.filter_by(table_name=sheet_name).first()
             
-            print(f"表格{sheet_name}的列配置: {columns_def}")
+            if existing_table:
+                # 如果表格已存在，删除现有表格及其数据
+                print(f"表格{sheet_name}已存在，删除现有表格和数据")
+                InventoryData.query.filter_by(table_id=existing_table.id).delete()
+                AutoIncrementSequence.query.filter_by(table_id=existing_table.id).delete()
+                auto_increment_blocks.invalidate(existing_table.id)
+                db.session.delete(existing_table)
+                sync_column_indexes(existing_table.id, None)
+                print(f"成功删除现有表格和数据")
             
-            try:
-                # 检查表格是否已存在
-                existing_table = TableStructure.query.filter_by(table_name=sheet_name).first()
-                
-                if existing_table:
-                    # 如果表格已存在，删除现有表格及其数据
-                    print(f"表格{sheet_name}已存在，删除现有表格和数据")
-                    InventoryData.query.filter_by(table_id=existing_table.id).delete()
-                    AutoIncrementSequence.query.filter_by(table_id=existing_table.id).delete()
-                    db.session.delete(existing_table)
-                    print(f"成功删除现有表格和数据")
-                
-                # 创建新的表格结构
-                columns_json = json.dumps(columns_def)
-                
-                new_table = TableStructure(
-                    table_name=sheet_name,
-                    columns=columns_json
-                )
-                db.session.add(new_table)
-                db.session.flush()  # 获取新表ID，但不提交事务
-                print(f"成功创建表格{sheet_name}，ID: {new_table.id}")
-                
-                # 初始化自增序列
-                for col in columns_def:
-                    if col.get('autoIncrement'):
-                        column_name = col['column_name']
-                        # 创建自增序列，初始值为0
-                        sequence = AutoIncrementSequence(
-                            table_id=new_table.id,
-                            column_name=column_name,
-                            current_value=0
-                        )
-                        db.session.add(sequence)
-                
-                # 提交表格和序列创建
-                db.session.commit()
-                print(f"成功初始化表格{sheet_name}的自增序列")
-            except Exception as e:
-                # 回滚事务
-                db.session.rollback()
-                print(f"创建表格{sheet_name}失败: {str(e)}")
-                results.append({
-                    'table_name': sheet_name,
-                    'status': 'failed',
-                    'message': f'创建表格结构失败: {str(e)}'
-                })
-                continue
+            # 创建新的表格结构
+            columns_json = json.dumps(columns_def)
             
-            # 处理数据行
-            success_count = 0
-            fail_count = 0
-            error_messages = []
+            new_table = TableStructure(
+                table_name=sheet_name,
+                columns=columns_json
+            )
+            db.session.add(new_table)
+            db.session.flush()  # 获取新表ID，但不提交事务
+            print(f"成功创建表格{sheet_name}，ID: {new_table.id}")
             
-            try:
-                # 从第二行开始读取数据
-                for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                    if len(row) < created_at_column_index + 1:
-                        fail_count += 1
-                        error_messages.append(f'第{row_num}行，数据为空')
-                        continue
-                    
-                    try:
-                        # 构建数据字典
-                        row_data = {}
-                        for i, header in enumerate(data_headers):
-                            if i < len(row):
-                                row_data[header] = str(row[i]) if row[i] is not None else ''
-                            else:
-                                row_data[header] = ''
-                        
-                        # 获取创建时间值
-                        created_at_str = row[created_at_column_index]
-                        created_at = None
-                        if created_at_str:
-                            # 尝试解析时间字符串
-                            from datetime import datetime
-                            try:
-                                created_at = datetime.strptime(created_at_str, '%Y-%m-%d %H:%M:%S')
-                            except ValueError:
-                                # 如果时间格式不正确，使用当前时间
-                                from datetime import datetime
-                                created_at = datetime.now()
+            # 初始化自增序列
+            for col in columns_def:
+                if col.get('autoIncrement'):
+                    column_name = col['column_name']
+                    # 创建自增序列，初始值为0
+                    sequence = AutoIncrementSequence(
+                        table_id=new_table.id,
+                        column_name=column_name,
+                        current_value=0
+                    )
+                    db.session.add(sequence)
+            
+            # 提交表格和序列创建
+            db.session.commit()
+            print(f"成功初始化表格{sheet_name}的自增序列")
+        except Exception as e:
+            # 回滚事务
+            db.session.rollback()
+            print(f"创建表格{sheet_name}失败: {str(e)}")
+            results.append({
+                'table_name': sheet_name,
+                'status': 'failed',
+                'message': f'创建表格结构失败: {str(e)}'
+            })
+            continue
+        
+        # 处理数据行
+        success_count = 0
+        fail_count = 0
+        error_messages = []
+        pending_rows = []  # [(行数据, 创建时间)]，自增列处理完后统一写入
+        
+        try:
+            # 从第二行开始读取数据
+            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+                if len(row) < created_at_column_index + 1:
+                    fail_count += 1
+                    error_messages.append(f'第{row_num}行，数据为空')
+                    continue
+                
+                try:
+                    # 构建数据字典
+                    row_data = {}
+                    for i, header in enumerate(data_headers):
+                        if i < len(row):
+                            row_data[header] = str(row[i]) if row[i] is not None else ''
                         else:
-                            # 如果没有创建时间，使用当前时间
+                            row_data[header] = ''
+                    
+                    # 获取创建时间值
+                    created_at_str = row[created_at_column_index]
+                    created_at = None
+                    if created_at_str:
+                        # 尝试解析时间字符串
+                        from datetime import datetime
+                        try:
+                            created_at = datetime.strptime(created_at_str, '%Y-%m-%d %H:%M:%S')
+                        except ValueError:
+                            # 如果时间格式不正确，使用当前时间
                             from datetime import datetime
                             created_at = datetime.now()
-                        
-                        # 保存库存数据记录
-                        new_data = InventoryData(
-                            table_id=new_table.id,
-                            data=json.dumps(row_data),
-                            created_by=current_user.id,
-                            created_at=created_at
-                        )
-                        db.session.add(new_data)
-                        success_count += 1
-                    except Exception as e:
-                        fail_count += 1
-                        error_messages.append(f'第{row_num}行，处理失败: {str(e)}')
-                
-                # 提交数据
-                db.session.commit()
-                print(f"成功导入表格{sheet_name}的{success_count}条数据")
-            except Exception as e:
-                # 回滚事务
-                db.session.rollback()
-                print(f"导入表格{sheet_name}的数据失败: {str(e)}")
-                results.append({
-                    'table_name': sheet_name,
-                    'status': 'failed',
-                    'message': f'导入数据失败: {str(e)}',
-                    'success_count': 0,
-                    'fail_count': 0,
-                    'error_messages': [f'数据导入失败: {str(e)}']
-                })
-                continue
+                    else:
+                        # 如果没有创建时间，使用当前时间
+                        from datetime import datetime
+                        created_at = datetime.now()
+                    
+                    pending_rows.append((row_data, created_at))
+                    success_count += 1
+                except Exception as e:
+                    fail_count += 1
+                    error_messages.append(f'第{row_num}行，处理失败: {str(e)}')
             
-            # 更新自增序列的当前值
-            try:
-                for col in columns_def:
-                    if col.get('autoIncrement'):
-                        column_name = col['column_name']
-                        prefix = col.get('prefix', '')
-                        
-                        # 获取该列的最大值
-                        all_data = InventoryData.query.filter_by(table_id=new_table.id).all()
-                        max_value = 0
-                        
-                        if all_data:
-                            import re
-                            pattern = re.compile(f'^{re.escape(prefix)}(\d+)$')
-                            
-                            for item in all_data:
-                                item_data = json.loads(item.data)
-                                if column_name in item_data:
-                                    value = item_data[column_name]
-                                    match = pattern.match(value)
-                                    if match:
-                                        numeric_part = int(match.group(1))
-                                        if numeric_part > max_value:
-                                            max_value = numeric_part
-                        
-                        # 更新自增序列
-                        sequence = AutoIncrementSequence.query.filter_by(
-                            table_id=new_table.id,
-                            column_name=column_name
-                        ).first()
-                        if sequence:
-                            sequence.current_value = max_value
-                            db.session.commit()
-                        print(f"成功更新表格{sheet_name}列{column_name}的自增序列，当前值为{max_value}")
-                
-                results.append({
-                    'table_name': sheet_name,
-                    'status': 'success',
-                    'message': f'成功导入{success_count}条数据，失败{fail_count}条',
-                    'success_count': success_count,
-                    'fail_count': fail_count,
-                    'error_messages': error_messages
-                })
-            except Exception as e:
-                # 回滚事务
-                db.session.rollback()
-                print(f"更新自增序列失败: {str(e)}")
-                results.append({
-                    'table_name': sheet_name,
-                    'status': 'failed',
-                    'message': f'更新自增序列失败: {str(e)}',
-                    'success_count': success_count,
-                    'fail_count': fail_count + 1,
-                    'error_messages': error_messages + [f'更新自增序列失败: {str(e)}']
-                })
-                continue
+            # 自增列：先把序列推进到导入数据中的最大编号，再为编号为空的行分配一段连续编号
+            for column_name, prefix, pattern in get_table_schema(new_table).auto_increment_columns:
+                max_value = 0
+                missing_rows = []
+                for row_data, _ in pending_rows:
+                    value = row_data.get(column_name) or ''
+                    match = pattern.match(value)
+                    if match:
+                        max_value = max(max_value, int(match.group(1)))
+                    elif not value:
+                        missing_rows.append(row_data)
+                reset_auto_increment(new_table.id, column_name, max_value, only_forward=True)
+                if missing_rows:
+                    start = allocate_auto_increment_range(new_table.id, column_name, len(missing_rows))
+                    for offset, row_data in enumerate(missing_rows):
+                        row_data[column_name] = f"{prefix}{start + offset}"
+                print(f"成功更新表格{sheet_name}列{column_name}的自增序列，当前值为{max_value + len(missing_rows)}")
+            
+            # 保存库存数据记录
+            for row_data, created_at in pending_rows:
+                db.session.add(InventoryData(
+                    table_id=new_table.id,
+                    data=json.dumps(row_data),
+                    created_by=user_id,
+                    created_at=created_at
+                ))
+            
+            # 提交数据
+            db.session.commit()
+            print(f"成功导入表格{sheet_name}的{success_count}条数据")
+        except Exception as e:
+            # 回滚事务
+            db.session.rollback()
+            print(f"导入表格{sheet_name}的数据失败: {str(e)}")
+            results.append({
+                'table_name': sheet_name,
+                'status': 'failed',
+                'message': f'导入数据失败: {str(e)}',
+                'success_count': 0,
+                'fail_count': 0,
+                'error_messages': [f'数据导入失败: {str(e)}']
+            })
+            continue
         
-        # 记录操作日志
-        log = OperationLog(
-            user_id=current_user.id,
-            operation='import_data',
-            table_id=None,
-            data_id=None
-        )
-        db.session.add(log)
+        results.append({
+            'table_name': sheet_name,
+            'status': 'success',
+            'message': f'成功导入{success_count}条数据，失败{fail_count}条',
+            'success_count': success_count,
+            'fail_count': fail_count,
+            'error_messages': error_messages
+        })
+    
+    # 记录操作日志
+    log = OperationLog(
+        user_id=user_id,
+        operation='import_data',
+        table_id=None,
+        data_id=None
+    )
+    db.session.add(log)
+    db.session.commit()
+
+    # ===== 导入冻存数据 =====
+    cryo_results = []
+    try:
+        # Name → ID lookups built during import
+        tank_name_to_id = {}
+        box_name_to_id = {}
+
+        # Import tanks
+        if '_cryo_tanks' in wb.sheetnames:
+            tws = wb['_cryo_tanks']
+            rows = list(tws.iter_rows(min_row=2, values_only=True))
+            for row in rows:
+                if not row[1]:
+                    continue
+                existing = NitrogenTank.query.filter_by(name=row[1]).first()
+                if not existing:
+                    tank = NitrogenTank(name=row[1], description=row[2] or '')
+                    db.session.add(tank)
+                    db.session.flush()
+                    tank_name_to_id[row[1]] = tank.id
+                else:
+                    tank_name_to_id[row[1]] = existing.id
+            cryo_results.append(f"Imported {len(rows)} tanks")
+
+        # Import boxes
+        if '_cryo_boxes' in wb.sheetnames:
+            bws = wb['_cryo_boxes']
+            rows = list(bws.iter_rows(min_row=2, values_only=True))
+            for row in rows:
+                tank_name = row[1]
+                box_name = row[2]
+                if not box_name:
+                    continue
+                tank_id = tank_name_to_id.get(tank_name)
+                if not tank_id:
+                    continue
+                existing = CryoBox.query.filter_by(tank_id=tank_id, box_name=box_name).first()
+                if not existing:
+                    box = CryoBox(tank_id=tank_id, box_name=box_name,
+                        box_description=row[3] or '', columns='[]')
+                    db.session.add(box)
+                    db.session.flush()
+                    box_name_to_id[f"{tank_name}|{box_name}"] = box.id
+                else:
+                    box_name_to_id[f"{tank_name}|{box_name}"] = existing.id
+            cryo_results.append(f"Imported {len(rows)} boxes")
+
         db.session.commit()
 
-        # ===== 导入冻存数据 =====
-        cryo_results = []
-        try:
-            # Name → ID lookups built during import
-            tank_name_to_id = {}
-            box_name_to_id = {}
-
-            # Import tanks
-            if '_cryo_tanks' in wb.sheetnames:
-                tws = wb['_cryo_tanks']
-                rows = list(tws.iter_rows(min_row=2, values_only=True))
-                for row in rows:
-                    if not row[1]:
-                        continue
-                    existing = NitrogenTank.query.filter_by(name=row[1]).first()
-                    if not existing:
-                        tank = NitrogenTank(name=row[1], description=row[2] or '')
-                        db.session.add(tank)
-                        db.session.flush()
-                        tank_name_to_id[row[1]] = tank.id
-                    else:
-                        tank_name_to_id[row[1]] = existing.id
-                cryo_results.append(f"Imported {len(rows)} tanks")
-
-            # Import boxes
-            if '_cryo_boxes' in wb.sheetnames:
-                bws = wb['_cryo_boxes']
-                rows = list(bws.iter_rows(min_row=2, values_only=True))
-                for row in rows:
-                    tank_name = row[1]
-                    box_name = row[2]
-                    if not box_name:
-                        continue
-                    tank_id = tank_name_to_id.get(tank_name)
-                    if not tank_id:
-                        continue
-                    existing = CryoBox.query.filter_by(tank_id=tank_id, box_name=box_name).first()
-                    if not existing:
-                        box = CryoBox(tank_id=tank_id, box_name=box_name,
-                            box_description=row[3] or '', columns='[]')
-                        db.session.add(box)
-                        db.session.flush()
-                        box_name_to_id[f"{tank_name}|{box_name}"] = box.id
-                    else:
-                        box_name_to_id[f"{tank_name}|{box_name}"] = existing.id
-                cryo_results.append(f"Imported {len(rows)} boxes")
+        # Import cells and re-link
+        if '_cryo_cells' in wb.sheetnames:
+            cws = wb['_cryo_cells']
+            rows = list(cws.iter_rows(min_row=2, values_only=True))
+            linked_cells = []
+            for row in rows:
+                box_name = row[0]
+                cell_row = int(row[1]) if row[1] else 0
+                cell_col = int(row[2]) if row[2] else 0
+                is_manual = row[4] == 'True'
+                reason = row[5] or ''
+                linked_table_name = row[6] or ''
+                linked_data_index_str = str(row[7] or '')
+
+                # Find box
+                box_id = None
+                for key, bid in box_name_to_id.items():
+                    if key.endswith(f"|{box_name}"):
+                        box_id = bid
+                        break
+
+                if not box_id or not (1 <= cell_row <= 9) or not (1 <= cell_col <= 9):
+                    continue
+
+                # Check if cell already exists
+                existing = CryoCell.query.filter_by(box_id=box_id, row=cell_row, col=cell_col).first()
+                if existing:
+                    continue
+
+                # Build cell data
+                cell_data = {}
+                if is_manual:
+                    cell_data = {'_manual': True, '_reason': reason}
+                elif linked_table_name and linked_data_index_str:
+                    # Find linked table and data row by index
+                    lt = TableStructure.query.filter_by(table_name=linked_table_name).first()
+                    if lt:
+                        all_rows = InventoryData.query.filter_by(table_id=lt.id).order_by(InventoryData.created_at).all()
+                        ld_idx = int(linked_data_index_str)
+                        if 0 <= ld_idx < len(all_rows):
+                            ld = all_rows[ld_idx]
+                            cell_data = {
+                                '_linked': True,
+                                '_table_id': lt.id,
+                                '_data_id': ld.id,
+                                '_table_name': lt.table_name,
+                                '_table_columns': json.loads(lt.columns),
+                                '_row_data': json.loads(ld.data)
+                            }
+                            linked_cells.append((box_id, cell_row, cell_col, lt.id, ld.id))
+
+                if cell_data:
+                    cell = CryoCell(box_id=box_id, row=cell_row, col=cell_col,
+                        data=json.dumps(cell_data, ensure_ascii=False))
+                    if linked_cells and linked_cells[-1][0] == box_id and linked_cells[-1][1] == cell_row and linked_cells[-1][2] == cell_col:
+                        cell.linked_table_id = linked_cells[-1][3]
+                        cell.linked_data_id = linked_cells[-1][4]
+                    db.session.add(cell)
 
             db.session.commit()
+            # Rebuild storage column links in table data
+            relinked = 0
+            for table_name in imported_tables:
+                table = TableStructure.query.filter_by(table_name=table_name).first()
+                if not table:
+                    continue
+                storage_cols = get_table_schema(table).storage_columns
+                if not storage_cols:
+                    continue
+
+                all_data = InventoryData.query.filter_by(table_id=table.id).all()
+                for data_row in all_data:
+                    row_dict = json.loads(data_row.data)
+                    for col_name in storage_cols:
+                        # Find cryo cells linked to this data row
+                        linked_cells = CryoCell.query.filter_by(
+                            linked_table_id=table.id,
+                            linked_data_id=data_row.id
+                        ).all()
+
+                        if not linked_cells:
+                            # If the original value was a storage text string, keep it as-is
+                            continue
+
+                        positions = []
+                        for lc in linked_cells:
+                            box = CryoBox.query.get(lc.box_id)
+                            tank = NitrogenTank.query.get(box.tank_id) if box else None
+                            positions.append({
+                                'tank_id': tank.id if tank else None,
+                                'tank_name': tank.name if tank else '',
+                                'box_id': lc.box_id,
+                                'box_name': box.box_name if box else '',
+                                'row': lc.row,
+                                'col': lc.col,
+                                'label': f'{ROW_LABELS[lc.row-1]}{lc.col}'
+                            })
 
-            # Import cells and re-link
-            if '_cryo_cells' in wb.sheetnames:
-                cws = wb['_cryo_cells']
-                rows = list(cws.iter_rows(min_row=2, values_only=True))
-                linked_cells = []
-                for row in rows:
-                    box_name = row[0]
-                    cell_row = int(row[1]) if row[1] else 0
-                    cell_col = int(row[2]) if row[2] else 0
-                    is_manual = row[4] == 'True'
-                    reason = row[5] or ''
-                    linked_table_name = row[6] or ''
-                    linked_data_index_str = str(row[7] or '')
-
-                    # Find box
-                    box_id = None
-                    for key, bid in box_name_to_id.items():
-                        if key.endswith(f"|{box_name}"):
-                            box_id = bid
-                            break
-
-                    if not box_id or not (1 <= cell_row <= 9) or not (1 <= cell_col <= 9):
-                        continue
-
-                    # Check if cell already exists
-                    existing = CryoCell.query.filter_by(box_id=box_id, row=cell_row, col=cell_col).first()
-                    if existing:
-                        continue
-
-                    # Build cell data
-                    cell_data = {}
-                    if is_manual:
-                        cell_data = {'_manual': True, '_reason': reason}
-                    elif linked_table_name and linked_data_index_str:
-                        # Find linked table and data row by index
-                        lt = TableStructure.query.filter_by(table_name=linked_table_name).first()
-                        if lt:
-                            all_rows = InventoryData.query.filter_by(table_id=lt.id).order_by(InventoryData.created_at).all()
-                            ld_idx = int(linked_data_index_str)
-                            if 0 <= ld_idx < len(all_rows):
-                                ld = all_rows[ld_idx]
-                                cell_data = {
-                                    '_linked': True,
-                                    '_table_id': lt.id,
-                                    '_data_id': ld.id,
-                                    '_table_name': lt.table_name,
-                                    '_table_columns': json.loads(lt.columns),
-                                    '_row_data': json.loads(ld.data)
-                                }
-                                linked_cells.append((box_id, cell_row, cell_col, lt.id, ld.id))
-
-                    if cell_data:
-                        cell = CryoCell(box_id=box_id, row=cell_row, col=cell_col,
-                            data=json.dumps(cell_data, ensure_ascii=False))
-                        if linked_cells and linked_cells[-1][0] == box_id and linked_cells[-1][1] == cell_row and linked_cells[-1][2] == cell_col:
-                            cell.linked_table_id = linked_cells[-1][3]
-                            cell.linked_data_id = linked_cells[-1][4]
-                        db.session.add(cell)
+                        text_parts = [f"{p['tank_name']} > {p['box_name']} > {p['label']}" for p in positions]
+                        row_dict[col_name] = {
+                            '_storage': True,
+                            '_positions': positions,
+                            '_text': ', '.join(text_parts)
+                        }
+                        relinked += 1
 
-                db.session.commit()
-                # Rebuild storage column links in table data
-                relinked = 0
-                for table_name in imported_tables:
-                    table = TableStructure.query.filter_by(table_name=table_name).first()
-                    if not table:
-                        continue
-                    columns = json.loads(table.columns)
-                    storage_cols = [c['column_name'] for c in columns if c.get('is_storage')]
-                    if not storage_cols:
-                        continue
-
-                    all_data = InventoryData.query.filter_by(table_id=table.id).all()
-                    for data_row in all_data:
-                        row_dict = json.loads(data_row.data)
-                        for col_name in storage_cols:
-                            # Find cryo cells linked to this data row
-                            linked_cells = CryoCell.query.filter_by(
-                                linked_table_id=table.id,
-                                linked_data_id=data_row.id
-                            ).all()
-
-                            if not linked_cells:
-                                # If the original value was a storage text string, keep it as-is
-                                continue
-
-                            positions = []
-                            for lc in linked_cells:
-                                box = CryoBox.query.get(lc.box_id)
-                                tank = NitrogenTank.query.get(box.tank_id) if box else None
-                                positions.append({
-                                    'tank_id': tank.id if tank else None,
-                                    'tank_name': tank.name if tank else '',
-                                    'box_id': lc.box_id,
-                                    'box_name': box.box_name if box else '',
-                                    'row': lc.row,
-                                    'col': lc.col,
-                                    'label': f'{ROW_LABELS[lc.row-1]}{lc.col}'
-                                })
+                    data_row.data = json.dumps(row_dict, ensure_ascii=False)
 
-                            text_parts = [f"{p['tank_name']} > {p['box_name']} > {p['label']}" for p in positions]
-                            row_dict[col_name] = {
-                                '_storage': True,
-                                '_positions': positions,
-                                '_text': ', '.join(text_parts)
-                            }
-                            relinked += 1
+            if relinked:
+                db.session.commit()
+                cryo_results.append(f"Relinked {relinked} storage columns")
 
-                        data_row.data = json.dumps(row_dict, ensure_ascii=False)
+            cryo_results.append(f"Imported {len(rows)} cells")
 
-                if relinked:
-                    db.session.commit()
-                    cryo_results.append(f"Relinked {relinked} storage columns")
+    except Exception as e:
+        print(f"Import cryo data error: {e}")
+        cryo_results.append(f"Cryo import partial: {str(e)}")
 
-                cryo_results.append(f"Imported {len(rows)} cells")
+    if cryo_results:
+        results.append({'cryo_import': cryo_results})
 
-        except Exception as e:
-            print(f"Import cryo data error: {e}")
-            cryo_results.append(f"Cryo import partial: {str(e)}")
+    return results
 
-        if cryo_results:
-            results.append({'cryo_import': cryo_results})
 
+# 数据导入API - 从XLS文件导入数据
+@app.route('/api/v1/import-data', methods=['POST'])
+@token_required
+def import_data(current_user):
+    # 检查用户权限，只有admin角色可以执行此操作
+    if current_user.role != 'admin':
+        # 记录操作日志
+        log = OperationLog(
+            user_id=current_user.id,
+            operation='import_data',
+            table_id=None,
+            data_id=None
+        )
+        db.session.add(log)
+        db.session.commit()
+        
+        return jsonify({'code': 403, 'message': '权限不足，只有管理员可以执行此操作', 'data': None}), 403
+    
+    try:
+        # 检查是否有文件上传
+        if 'file' not in request.files:
+            return jsonify({'code': 400, 'message': '请选择要导入的XLS文件', 'data': None}), 400
+        
+        file = request.files['file']
+        
+        if file.filename == '':
+            return jsonify({'code': 400, 'message': '请选择要导入的XLS文件', 'data': None}), 400
+        
+        # 检查文件扩展名
+        if not file.filename.endswith('.xlsx') and not file.filename.endswith('.xls'):
+            return jsonify({'code': 400, 'message': '只支持XLS和XLSX文件格式', 'data': None}), 400
+        
+        if request.args.get('async') == '1':
+            return submit_job_response('import_data', current_user, upload=file.stream)
+        
+        results = import_workbook(file, current_user.id)
+        
+        invalidate_table_schema()
         return jsonify({
             'code': 200,
             'message': '数据导入成功',
@@ -2730,6 +4404,7 @@ def import_data(current_user):
     except Exception as e:
         import traceback
         print(f"导入数据发生错误: {traceback.format_exc()}")
+        invalidate_table_schema()
         return jsonify({'code': 500, 'message': f'数据导入失败: {str(e)}', 'data': None}), 500
 
 # 修改密码路由
@@ -2749,10 +4424,14 @@ def change_password(current_user):
     if new_password != confirm_password:
         return jsonify({'code': 400, 'message': '新密码和确认密码不一致', 'data': None}), 400
     
-    from werkzeug.security import check_password_hash, generate_password_hash
+    from werkzeug.security import check_password_hash
+    
+    user = db.session.get(User, current_user.id)
+    if not user:
+        return jsonify({'code': 401, 'message': '用户不存在!', 'data': None}), 401
     
     # 验证当前密码是否正确
-    if not check_password_hash(current_user.password, current_password):
+    if not check_password_hash(user.password, current_password):
         return jsonify({'code': 400, 'message': '当前密码错误', 'data': None}), 400
     
     # 只验证密码长度大于零
@@ -2760,10 +4439,13 @@ def change_password(current_user):
         return jsonify({'code': 400, 'message': '新密码不能为空', 'data': None}), 400
     
     # 更新密码
-    current_user.password = generate_password_hash(new_password)
+    set_user_password(user, new_password)
+    # 修改密码后其他设备的登录会话需要重新登录
+    revoke_refresh_tokens(user.id)
     
     try:
         db.session.commit()
+        principal_cache.invalidate(user.id)
         return jsonify({
             'code': 200,
             'message': '密码修改成功',
@@ -2875,6 +4557,9 @@ def backup_now_api(current_user):
     if current_user.role != 'admin':
         return jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403
     
+    if request.args.get('async') == '1':
+        return submit_job_response('backup', current_user)
+    
     success, result = create_db_backup()
     
     if success:
@@ -2941,6 +4626,336 @@ def delete_backup_api(current_user, filename):
     except Exception as e:
         return jsonify({'code': 500, 'message': f'删除失败: {str(e)}', 'data': None}), 500
 
+# ==================== 后台任务 ====================
+
+# 导入、导出、备份、重建索引等耗时操作可以加 ?async=1 提交为后台任务：请求立即返回任务ID，
+# 任务在进程内的线程池中执行，客户端通过 GET /api/v1/jobs/<id> 轮询进度并下载结果文件。
+# 任务队列只支持单进程部署（main.py 的运行方式）：任务由提交它的进程执行，进程启动时会把
+# 未完成的任务标记为中断；多进程部署需设置 JOB_RECOVER_ON_STARTUP=0，否则会误判其他进程正在执行的任务
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', '2'))  # 同时执行的任务数
+app.config['JOB_MAX_ACTIVE_PER_USER'] = int(os.environ.get('JOB_MAX_ACTIVE_PER_USER', '3'))  # 每个用户排队和执行中的任务上限
+app.config['JOB_RETENTION_HOURS'] = int(os.environ.get('JOB_RETENTION_HOURS', '24'))  # 已结束任务及结果文件的保留时间
+app.config['JOB_RECOVER_ON_STARTUP'] = os.environ.get('JOB_RECOVER_ON_STARTUP', '1') != '0'
+JOB_FOLDER = os.path.join(get_app_root(), 'instance', 'jobs')
+JOB_ACTIVE_STATUSES = ('pending', 'running')
+_job_executor = ThreadPoolExecutor(max_workers=app.config['JOB_WORKERS'], thread_name_prefix='job')
+
+# 任务类型 → (处理函数, 执行中是否可取消)，由 register_job_handler 注册
+JOB_HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    """任务已被请求取消，由 JobContext.update 抛出"""
+
+
+class JobContext:
+    """传给任务处理函数的上下文：任务参数、上传的输入文件，以及进度上报和结果文件"""
+
+    def __init__(self, job):
+        self.job_id = job.id
+        self.user_id = job.created_by
+        self.params = json.loads(job.params) if job.params else {}
+        self.input_path = os.path.join(JOB_FOLDER, f'{job.id}.input')
+        self.result_file = None
+        self.result_filename = None
+
+    def result_path(self, suffix):
+        return os.path.join(JOB_FOLDER, f'{self.job_id}{suffix}')
+
+    def update(self, progress, message=None):
+        """写入任务进度（0-100）；已请求取消时抛出JobCancelled。
+        进度在处理函数的会话中写入并与其尚未提交的修改一起提交，上报进度的位置即提交点；
+        不使用独立连接，避免会话持有SQLite写锁时进度写入互相等待"""
+        cancel_requested = db.session.execute(text(
+            'UPDATE background_job SET progress = :progress, message = COALESCE(:message, message) '
+            'WHERE id = :id RETURNING cancel_requested'
+        ), {'id': self.job_id, 'progress': max(0, min(100, int(progress))), 'message': message}).scalar()
+        db.session.commit()
+        if cancel_requested:
+            raise JobCancelled()
+
+
+def register_job_handler(job_type, cancellable=True):
+    """注册任务处理函数：handler(context) 返回可JSON序列化的结果；
+    cancellable为False的任务（单个事务或单次文件复制）只能在排队时取消"""
+    def decorator(handler):
+        JOB_HANDLERS[job_type] = (handler, cancellable)
+        return handler
+    return decorator
+
+
+def _finish_job(job_id, status, message, progress=None, result=None, result_file=None, result_filename=None):
+    db.session.execute(text(
+        'UPDATE background_job SET status = :status, message = :message, progress = COALESCE(:progress, progress), '
+        'result = :result, result_file = :result_file, result_filename = :result_filename, finished_at = CURRENT_TIMESTAMP '
+        'WHERE id = :id'
+    ), {
+        'id': job_id, 'status': status, 'message': message, 'progress': progress,
+        'result': json.dumps(result, ensure_ascii=False) if result is not None else None,
+        'result_file': result_file, 'result_filename': result_filename,
+    })
+    db.session.commit()
+
+
+def _run_job(job_id):
+    with app.app_context():
+        # 原子地把任务从排队改为执行中，排队时已被取消的任务直接跳过
+        claimed = db.session.execute(text(
+            "UPDATE background_job SET status = 'running', started_at = CURRENT_TIMESTAMP "
+            "WHERE id = :id AND status = 'pending'"
+        ), {'id': job_id}).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+        
+        job = db.session.get(BackgroundJob, job_id)
+        handler, _ = JOB_HANDLERS[job.job_type]
+        context = JobContext(job)
+        try:
+            result = handler(context)
+        except Exception as e:
+            db.session.rollback()
+            if isinstance(e, JobCancelled):
+                _finish_job(job_id, 'cancelled', '任务已取消')
+            else:
+                import traceback
+                traceback.print_exc()
+                _finish_job(job_id, 'failed', str(e))
+            # 删除写了一半的结果文件
+            if context.result_file and os.path.exists(context.result_file):
+                os.remove(context.result_file)
+        else:
+            _finish_job(job_id, 'succeeded', '任务完成', progress=100, result=result,
+                        result_file=context.result_file, result_filename=context.result_filename)
+        finally:
+            if os.path.exists(context.input_path):
+                os.remove(context.input_path)
+
+
+def recover_interrupted_jobs():
+    """进程启动时把上次未完成的任务标记为失败（执行它们的线程已随进程退出）。
+    只适用于单进程部署，JOB_RECOVER_ON_STARTUP=0 时跳过"""
+    if not app.config['JOB_RECOVER_ON_STARTUP']:
+        return
+    BackgroundJob.query.filter(BackgroundJob.status.in_(JOB_ACTIVE_STATUSES)).update(
+        {'status': 'failed', 'message': '服务重启，任务已中断', 'finished_at': db.func.now()},
+        synchronize_session=False)
+    db.session.commit()
+
+
+def cleanup_finished_jobs():
+    """删除超过保留时间的已结束任务及其结果文件"""
+    expired = BackgroundJob.query.filter(
+        BackgroundJob.status.notin_(JOB_ACTIVE_STATUSES),
+        BackgroundJob.finished_at < db.func.datetime('now', f'-{app.config["JOB_RETENTION_HOURS"]} hours')
+    ).all()
+    for job in expired:
+        if job.result_file and os.path.exists(job.result_file):
+            os.remove(job.result_file)
+        db.session.delete(job)
+    db.session.commit()
+
+
+def submit_job(job_type, user_id, params=None, upload=None):
+    """创建任务并提交到线程池；upload为二进制文件对象，先复制到任务目录供任务读取。
+    用户进行中的任务达到上限时抛出ValueError"""
+    cleanup_finished_jobs()
+    active_count = BackgroundJob.query.filter(
+        BackgroundJob.created_by == user_id,
+        BackgroundJob.status.in_(JOB_ACTIVE_STATUSES)
+    ).count()
+    if active_count >= app.config['JOB_MAX_ACTIVE_PER_USER']:
+        raise ValueError(f'进行中的任务已达上限（{app.config["JOB_MAX_ACTIVE_PER_USER"]}个），请等待已有任务完成')
+    
+    job = BackgroundJob(
+        id=uuid.uuid4().hex,
+        job_type=job_type,
+        status='pending',
+        message='排队中',
+        params=json.dumps(params, ensure_ascii=False) if params else None,
+        created_by=user_id
+    )
+    if upload is not None:
+        os.makedirs(JOB_FOLDER, exist_ok=True)
+        with open(os.path.join(JOB_FOLDER, f'{job.id}.input'), 'wb') as f:
+            shutil.copyfileobj(upload, f)
+    db.session.add(job)
+    db.session.commit()
+    _job_executor.submit(_run_job, job.id)
+    return job
+
+
+def _job_dict(job):
+    def format_time(value):
+        return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+    
+    has_file = job.status == 'succeeded' and bool(job.result_file)
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'result': json.loads(job.result) if job.result else None,
+        'cancel_requested': job.cancel_requested,
+        'created_by': job.created_by,
+        'created_at': format_time(job.created_at),
+        'started_at': format_time(job.started_at),
+        'finished_at': format_time(job.finished_at),
+        'download_url': f'/api/v1/jobs/{job.id}/download' if has_file else None,
+        'result_filename': job.result_filename if has_file else None,
+    }
+
+
+def submit_job_response(job_type, current_user, params=None, upload=None):
+    """提交任务并返回202响应（任务数超限时返回429），供各接口的 ?async=1 分支使用"""
+    try:
+        job = submit_job(job_type, current_user.id, params, upload)
+    except ValueError as e:
+        return jsonify({'code': 429, 'message': str(e), 'data': None}), 429
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'code': 500, 'message': f'提交任务失败: {str(e)}', 'data': None}), 500
+    return jsonify({'code': 202, 'message': '任务已提交', 'data': _job_dict(job)}), 202
+
+
+def _progress_reporter(context):
+    """把 on_progress(已完成数, 总数, 说明) 形式的回调转换为任务进度"""
+    def on_progress(done, total, message):
+        context.update(done * 100 // total if total else 0, message)
+    return on_progress
+
+
+@register_job_handler('import_data')
+def _import_data_job(context):
+    try:
+        with open(context.input_path, 'rb') as f:
+            results = import_workbook(f, context.user_id, on_progress=_progress_reporter(context))
+    finally:
+        invalidate_table_schema()
+    return {'results': results}
+
+
+@register_job_handler('export_all_data')
+def _export_all_data_job(context):
+    context.result_file = context.result_path('.xlsx')
+    context.result_filename = 'all_data.xlsx'
+    with open(context.result_file, 'wb') as output:
+        build_all_data_workbook(output, on_progress=_progress_reporter(context))
+    db.session.add(OperationLog(user_id=context.user_id, operation='export_all_data', table_id=None, data_id=None))
+    db.session.commit()
+    return {'filename': context.result_filename}
+
+
+@register_job_handler('import_table_data')
+def _import_table_data_job(context):
+    table = db.session.get(TableStructure, context.params['table_id'])
+    if not table:
+        raise ValueError('表格结构不存在')
+    total_size = os.path.getsize(context.input_path)
+    with open(context.input_path, 'rb') as raw:
+        csv_file = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        # 每写入并提交一块产出一次进度，按已读取的文件字节数估算百分比
+        for result in _import_csv_rows(table, csv_file, context.user_id):
+            if not result['done']:
+                context.update(raw.tell() * 100 // total_size if total_size else 0,
+                               f'已处理{result["processed_count"]}行')
+    return result
+
+
+@register_job_handler('backup', cancellable=False)
+def _backup_job(context):
+    success, result = create_db_backup()
+    if not success:
+        raise RuntimeError(f'备份失败: {result}')
+    return {'filename': result}
+
+
+@register_job_handler('rebuild_search_index', cancellable=False)
+def _rebuild_search_index_job(context):
+    app.config['SEARCH_INDEX_AVAILABLE'] = ensure_search_index()
+    if not app.config['SEARCH_INDEX_AVAILABLE']:
+        raise ValueError('当前数据库不支持全文索引')
+    return {'indexed_count': rebuild_search_index()}
+
+
+def _get_visible_job(current_user, job_id):
+    """获取任务，只有创建者和管理员可见；返回 (job, 错误响应)"""
+    job = db.session.get(BackgroundJob, job_id)
+    if not job:
+        return None, (jsonify({'code': 404, 'message': '任务不存在', 'data': None}), 404)
+    if current_user.role != 'admin' and job.created_by != current_user.id:
+        return None, (jsonify({'code': 403, 'message': '权限不足', 'data': None}), 403)
+    return job, None
+
+
+# 任务列表：普通用户只能看到自己的任务，管理员可以看到全部；支持按 status 筛选
+@app.route('/api/v1/jobs', methods=['GET'])
+@token_required
+def list_jobs(current_user):
+    query = BackgroundJob.query
+    if current_user.role != 'admin':
+        query = query.filter(BackgroundJob.created_by == current_user.id)
+    status = request.args.get('status')
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+    jobs = query.order_by(BackgroundJob.created_at.desc()).limit(100).all()
+    return jsonify({'code': 200, 'message': 'success', 'data': {'items': [_job_dict(job) for job in jobs]}}), 200
+
+
+# 任务状态与进度
+@app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    job, error = _get_visible_job(current_user, job_id)
+    if error:
+        return error
+    return jsonify({'code': 200, 'message': 'success', 'data': _job_dict(job)}), 200
+
+
+# 取消任务：排队中的任务直接取消；执行中的可取消任务在下一次上报进度时停止（已提交的部分保留）
+@app.route('/api/v1/jobs/<job_id>/cancel', methods=['POST'])
+@token_required
+def cancel_job(current_user, job_id):
+    job, error = _get_visible_job(current_user, job_id)
+    if error:
+        return error
+    if job.status not in JOB_ACTIVE_STATUSES:
+        return jsonify({'code': 400, 'message': '任务已结束，无法取消', 'data': _job_dict(job)}), 400
+    _, cancellable = JOB_HANDLERS[job.job_type]
+    
+    try:
+        # 条件更新，避免与工作线程领取任务互相覆盖
+        cancelled = BackgroundJob.query.filter_by(id=job.id, status='pending').update(
+            {'status': 'cancelled', 'message': '任务已取消', 'cancel_requested': True, 'finished_at': db.func.now()},
+            synchronize_session=False)
+        if not cancelled:
+            if not cancellable:
+                db.session.rollback()
+                return jsonify({'code': 400, 'message': '该任务执行中无法取消', 'data': _job_dict(job)}), 400
+            BackgroundJob.query.filter(BackgroundJob.id == job.id, BackgroundJob.status.in_(JOB_ACTIVE_STATUSES)).update(
+                {'cancel_requested': True}, synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(job)
+        return jsonify({'code': 200, 'message': '已请求取消任务', 'data': _job_dict(job)}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'code': 500, 'message': f'取消任务失败: {str(e)}', 'data': None}), 500
+
+
+# 下载任务结果文件
+@app.route('/api/v1/jobs/<job_id>/download', methods=['GET'])
+@token_required
+def download_job_result(current_user, job_id):
+    job, error = _get_visible_job(current_user, job_id)
+    if error:
+        return error
+    if job.status != 'succeeded' or not job.result_file or not os.path.exists(job.result_file):
+        return jsonify({'code': 404, 'message': '任务结果文件不存在', 'data': None}), 404
+    return send_from_directory(JOB_FOLDER, os.path.basename(job.result_file),
+                               as_attachment=True, download_name=job.result_filename)
+
+
 # ========== 冻存管理 API ==========
 
 # ---------- 液氮罐 CRUD ----------
@@ -3049,6 +5064,16 @@ def get_cryo_boxes(current_user, tank_id):
     if not tank:
         return jsonify({'code': 404, 'message': '液氮罐不存在', 'data': None}), 404
 
+    versions = db.session.execute(text(
+        "SELECT cryo_box.id, cryo_box_stats.data_version FROM cryo_box "
+        "LEFT JOIN cryo_box_stats ON cryo_box_stats.box_id = cryo_box.id "
+        "WHERE cryo_box.tank_id = :tank_id ORDER BY cryo_box.id"
+    ), {'tank_id': tank_id}).all()
+    etag = _make_etag('cryo_boxes', tank.id, tank.name, tank.description, [tuple(row) for row in versions])
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
     boxes = CryoBox.query.filter_by(tank_id=tank_id).order_by(CryoBox.created_at.desc()).all()
 
     result = []
@@ -3068,7 +5093,7 @@ def get_cryo_boxes(current_user, tank_id):
             'updated_at': box.updated_at.strftime('%Y-%m-%d %H:%M:%S') if box.updated_at else ''
         })
 
-    return jsonify({
+    return _with_etag((jsonify({
         'code': 200,
         'message': 'success',
         'data': {
@@ -3079,7 +5104,7 @@ def get_cryo_boxes(current_user, tank_id):
             },
             'boxes': result
         }
-    }), 200
+    }), 200), etag)
 
 
 @app.route('/api/v1/cryo-tanks/<int:tank_id>/boxes', methods=['POST'])
@@ -3178,6 +5203,11 @@ def _is_meaningful_cryo_cell(cell):
 @token_required
 def get_cryo_grid(current_user, box_id):
     """获取盒子的 9x9 网格数据"""
+    etag = _cryo_box_etag(box_id)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
     box = CryoBox.query.get(box_id)
     if not box:
         return jsonify({'code': 404, 'message': '冻存盒不存在', 'data': None}), 404
@@ -3223,7 +5253,7 @@ def get_cryo_grid(current_user, box_id):
     occupied = len([cell for cell in cells if _is_meaningful_cryo_cell(cell)])
     total = 81
 
-    return jsonify({
+    return _with_etag((jsonify({
         'code': 200,
         'message': 'success',
         'data': {
@@ -3240,7 +5270,7 @@ def get_cryo_grid(current_user, box_id):
             'occupied': occupied,
             'total': total
         }
-    }), 200
+    }), 200), etag)
 
 
 @app.route('/api/v1/cryo-boxes/<int:box_id>/available-positions', methods=['GET'])
@@ -3409,6 +5439,12 @@ def delete_cryo_cell(current_user, box_id, row, col):
     return jsonify({'code': 200, 'message': '格子已清空', 'data': None}), 200
 
 
+# 启动时维护：按列配置同步表达式索引（旧版本创建的是覆盖所有表格数据行的索引，这里替换为部分索引），
+# 并标记上次进程退出时未完成的后台任务
+with app.app_context():
+    ensure_column_indexes()
+    recover_interrupted_jobs()
+
 # 启动定时备份调度器
 start_backup_scheduler()
 
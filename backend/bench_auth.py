@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""认证链路性能测试（进程内，使用Flask test client，无需启动服务）
+
+测量内容:
+  - 登录延迟：按密码哈希方法（scrypt、pbkdf2等）分别统计
+  - token_required开销：无认证接口与最简单的认证接口的延迟差，分别在登录用户缓存命中/关闭时测量
+  - /api/v1/auth/me 延迟
+  - 多线程并发下 /api/v1/auth/me 和登录的吞吐量
+
+结果以JSON写入文件（p50/p95/p99毫秒、ops/sec），便于部署前对比性能回退。
+
+用法:
+  python bench_auth.py
+  python bench_auth.py --iterations 200 --threads 8 --output bench_auth_results.json
+  python bench_auth.py --methods scrypt,pbkdf2:sha256:600000
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# 必须在导入app之前指定临时数据库，测试结束后删除。
+# 测试会创建使用固定密码的管理员账号，因此总是覆盖已设置的DATABASE_URI，不写入实际使用的数据库
+_tmp_dir = tempfile.TemporaryDirectory(prefix='bench_auth_')
+os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(_tmp_dir.name, 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as inventory_app  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+app = inventory_app.app
+db = inventory_app.db
+User = inventory_app.User
+
+BENCH_PASSWORD = 'bench-password-123'
+
+
+def summarize(samples, elapsed=None):
+    """samples为每次请求耗时（秒），返回毫秒分位数和每秒操作数"""
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def percentile(p):
+        # 最近秩法：第 ceil(p/100 * n) 个样本
+        index = max(0, min(count - 1, math.ceil(p / 100 * count) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    total = elapsed if elapsed is not None else sum(ordered)
+    return {
+        'count': count,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'mean_ms': round(sum(ordered) / count * 1000, 3),
+        'ops_per_sec': round(count / total, 2) if total else None
+    }
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def check(response, name):
+    if response.status_code != 200:
+        raise RuntimeError(f'{name} 返回 {response.status_code}: {response.get_data(as_text=True)[:200]}')
+
+
+def create_bench_user(username, method):
+    """创建指定哈希方法的测试用户（不是首次登录，不是默认密码）"""
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            user = User(username=username, role='admin')
+            db.session.add(user)
+        user.password = generate_password_hash(BENCH_PASSWORD, method=method)
+        user.first_login = False
+        user.password_is_default = False
+        db.session.commit()
+
+
+def bench_login(client, username, iterations):
+    def login():
+        check(client.post('/api/v1/auth/login', json={'username': username, 'password': BENCH_PASSWORD}), 'login')
+    login()  # 预热
+    return summarize(timed(login, iterations))
+
+
+def bench_concurrent(make_request, threads, iterations):
+    """每个线程使用独立的test client执行iterations次请求，返回整体吞吐量和延迟分布"""
+    samples = []
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        client = app.test_client()
+        local = []
+        try:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                make_request(client)
+                local.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e))
+        with lock:
+            samples.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f'并发测试失败: {errors[0]}')
+    result = summarize(samples, elapsed)
+    result['threads'] = threads
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='认证链路性能测试')
+    parser.add_argument('--iterations', type=int, default=100, help='每项测试的请求次数（登录按哈希方法各执行一半）')
+    parser.add_argument('--threads', type=int, default=4, help='并发测试的线程数')
+    parser.add_argument('--methods', default='scrypt,pbkdf2:sha256', help='要测试的密码哈希方法，逗号分隔')
+    parser.add_argument('--output', default='bench_auth_results.json', help='结果JSON文件路径')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    methods = [m.strip() for m in args.methods.split(',') if m.strip()]
+    login_iterations = max(1, args.iterations // 2)
+    results = {}
+
+    # 1. 各哈希方法的登录延迟
+    for method in methods:
+        username = f'bench_{method.replace(":", "_")}'
+        create_bench_user(username, method)
+        results[f'login[{method}]'] = bench_login(client, username, login_iterations)
+        print(f'login[{method}]: {results[f"login[{method}]"]}')
+
+    # 后续测试使用第一种哈希方法的用户
+    username = f'bench_{methods[0].replace(":", "_")}'
+    response = client.post('/api/v1/auth/login', json={'username': username, 'password': BENCH_PASSWORD})
+    check(response, 'login')
+    headers = {'Authorization': f'Bearer {response.get_json()["data"]["token"]}'}
+
+    # 2. token_required开销：/health无认证，/api/v1/auth/principal-cache只做认证和返回计数
+    def health():
+        check(client.get('/health'), 'health')
+
+    def authed():
+        check(client.get('/api/v1/auth/principal-cache', headers=headers), 'principal-cache')
+
+    health()
+    authed()
+    results['baseline[/health]'] = summarize(timed(health, args.iterations))
+    results['token_required[cache]'] = summarize(timed(authed, args.iterations))
+    cache_ttl = inventory_app.principal_cache.ttl
+    inventory_app.principal_cache.ttl = 0  # 关闭缓存（get不再命中预热阶段的缓存），每次请求都查询用户
+    results['token_required[no_cache]'] = summarize(timed(authed, args.iterations))
+    inventory_app.principal_cache.ttl = cache_ttl
+    baseline = results['baseline[/health]']['p50_ms']
+    results['token_required[cache]']['overhead_p50_ms'] = round(results['token_required[cache]']['p50_ms'] - baseline, 3)
+    results['token_required[no_cache]']['overhead_p50_ms'] = round(results['token_required[no_cache]']['p50_ms'] - baseline, 3)
+
+    # 3. /auth/me
+    def me():
+        check(client.get('/api/v1/auth/me', headers=headers), 'auth/me')
+    results['auth_me'] = summarize(timed(me, args.iterations))
+
+    # 4. 并发吞吐量
+    results['concurrent[auth_me]'] = bench_concurrent(
+        lambda c: check(c.get('/api/v1/auth/me', headers=headers), 'auth/me'),
+        args.threads, args.iterations)
+    results['concurrent[login]'] = bench_concurrent(
+        lambda c: check(c.post('/api/v1/auth/login', json={'username': username, 'password': BENCH_PASSWORD}), 'login'),
+        args.threads, login_iterations)
+
+    for name in ('baseline[/health]', 'token_required[cache]', 'token_required[no_cache]', 'auth_me',
+                 'concurrent[auth_me]', 'concurrent[login]'):
+        print(f'{name}: {results[name]}')
+
+    report = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'password_hash_workers': inventory_app.PASSWORD_HASH_WORKERS,
+            'principal_cache_ttl': cache_ttl
+        },
+        'parameters': {
+            'iterations': args.iterations,
+            'login_iterations': login_iterations,
+            'threads': args.threads,
+            'methods': methods
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'结果已写入 {args.output}')
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        _tmp_dir.cleanup()
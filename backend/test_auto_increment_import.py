@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""自增编号预留块缓存测试（进程内，使用临时数据库，无需启动服务）
+
+启用 AUTO_INCREMENT_BLOCK_SIZE 时，整库导入先在会话中重置序列再为编号为空的行分配编号，
+分配不能再去另开连接等待会话自己持有的写锁（之前会等待超时后报 database is locked）。
+"""
+import os
+import sys
+import tempfile
+import time
+import json
+from io import BytesIO
+
+# 必须在导入app之前指定临时数据库和预留块大小
+_tmp_dir = tempfile.TemporaryDirectory(prefix='test_auto_increment_')
+os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(_tmp_dir.name, 'test.db')
+os.environ['AUTO_INCREMENT_BLOCK_SIZE'] = '10'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as inventory_app  # noqa: E402
+from openpyxl import load_workbook  # noqa: E402
+
+app = inventory_app.app
+db = inventory_app.db
+TableStructure = inventory_app.TableStructure
+InventoryData = inventory_app.InventoryData
+AutoIncrementSequence = inventory_app.AutoIncrementSequence
+
+passed = 0
+failed = 0
+
+def test(name, fn):
+    global passed, failed
+    try:
+        with app.app_context():
+            fn()
+        passed += 1
+        print(f"  PASS {name}")
+    except AssertionError as e:
+        failed += 1
+        print(f"  FAIL {name}: {e}")
+    except Exception as e:
+        failed += 1
+        print(f"  ERROR {name}: {e}")
+
+def create_table(name, row_count):
+    columns = [
+        {'column_name': '编号', 'data_type': 'string', 'autoIncrement': True, 'prefix': 'S', 'hidden': False},
+        {'column_name': '名称', 'data_type': 'string', 'hidden': False},
+    ]
+    table = TableStructure(table_name=name, columns=json.dumps(columns))
+    db.session.add(table)
+    db.session.commit()
+    for i in range(row_count):
+        number = inventory_app.allocate_auto_increment_range(table.id, '编号', 1)
+        db.session.add(InventoryData(table_id=table.id, data=json.dumps({'编号': f'S{number}', '名称': f'样本{i}'}),
+                                     created_by=1))
+        db.session.commit()
+    return table.id
+
+def sequence_value(table_id):
+    return AutoIncrementSequence.query.filter_by(table_id=table_id, column_name='编号').one().current_value
+
+def test_block_cache_reserves_blocks():
+    table_id = create_table('预留块', 3)
+    assert sequence_value(table_id) == 10, f"expected a reserved block of 10, got {sequence_value(table_id)}"
+
+def test_import_with_blank_auto_increment_values():
+    create_table('导入', 3)
+    output = BytesIO()
+    inventory_app.build_all_data_workbook(output)
+    output.seek(0)
+    wb = load_workbook(output)
+    for row in wb['导入'].iter_rows(min_row=2):
+        row[0].value = None  # 清空自增编号，导入时重新分配
+    file = BytesIO()
+    wb.save(file)
+    file.seek(0)
+
+    start = time.time()
+    results = inventory_app.import_workbook(file, 1)
+    elapsed = time.time() - start
+    result = next(r for r in results if r['table_name'] == '导入')
+    assert result['status'] == 'success', f"import failed: {result['message']}"
+    assert result['success_count'] == 3, f"expected 3 rows, got {result['success_count']}"
+    assert elapsed < 3, f"import waited {elapsed:.1f}s for the write lock"
+
+    table = TableStructure.query.filter_by(table_name='导入').one()
+    numbers = sorted(json.loads(row.data)['编号'] for row in InventoryData.query.filter_by(table_id=table.id))
+    assert len(set(numbers)) == 3 and all(n.startswith('S') and n[1:].isdigit() for n in numbers), numbers
+
+def test_allocate_inside_write_transaction():
+    table_id = create_table('事务内分配', 0)
+    inventory_app.reset_auto_increment(table_id, '编号', 5)
+    start = time.time()
+    first = inventory_app.allocate_auto_increment_range(table_id, '编号', 2)
+    assert time.time() - start < 3, "allocation waited for the session's own write lock"
+    assert first == 6, f"expected 6, got {first}"
+    db.session.rollback()
+    # 回滚后编号随调用方事务一起撤销，缓存中没有留下会被重复分配的区间
+    first = inventory_app.allocate_auto_increment_range(table_id, '编号', 1)
+    db.session.commit()
+    assert first == 1, f"expected 1 after rollback, got {first}"
+
+print("\n[自增编号预留块]")
+try:
+    test("block cache reserves AUTO_INCREMENT_BLOCK_SIZE values", test_block_cache_reserves_blocks)
+    test("workbook import with blank auto-increment cells", test_import_with_blank_auto_increment_values)
+    test("allocation after a write in the same transaction", test_allocate_inside_write_transaction)
+finally:
+    with app.app_context():
+        db.engine.dispose()
+    _tmp_dir.cleanup()
+
+print(f"\n  {passed} passed, {failed} failed")
+sys.exit(1 if failed else 0)
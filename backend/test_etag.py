@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""ETag 条件请求测试：删除后重建的表格/冻存盒复用同一个id时，旧ETag不能再返回304"""
+import requests
+import sys
+
+BASE = "http://127.0.0.1:5000"
+passed = 0
+failed = 0
+
+def test(name, fn):
+    global passed, failed
+    try:
+        fn()
+        passed += 1
+        print(f"  PASS {name}")
+    except AssertionError as e:
+        failed += 1
+        print(f"  FAIL {name}: {e}")
+    except Exception as e:
+        failed += 1
+        print(f"  ERROR {name}: {e}")
+
+def login(username="admin", password="admin123"):
+    r = requests.post(f"{BASE}/api/v1/auth/login",
+        json={"username": username, "password": password})
+    assert r.status_code == 200, f"Login failed: {r.text}"
+    return r.json()['data']['token']
+
+def api(method, path, token=None, **kwargs):
+    headers = kwargs.pop('headers', {})
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    return requests.request(method, f"{BASE}{path}", headers=headers, **kwargs)
+
+def create_table_with_row(token, name):
+    r = api('POST', '/api/v1/tables', token,
+        json={"table_name": name, "columns": [{"column_name": "名称", "data_type": "string"}]})
+    assert r.status_code == 200, r.text
+    table_id = r.json()['data']['id']
+    r = api('POST', f'/api/v1/tables/{table_id}/data', token, json={"data": {"名称": name}})
+    assert r.status_code == 200, r.text
+    return table_id
+
+def test_table_recreated_with_same_id():
+    table_id = create_table_with_row(TOKEN, "ETagTest")
+    r = api('GET', f'/api/v1/tables/{table_id}/data', TOKEN)
+    etag = r.headers.get('ETag')
+    assert r.status_code == 200 and etag, f"missing ETag: {r.status_code}"
+    r = api('GET', f'/api/v1/tables/{table_id}/data', TOKEN, headers={'If-None-Match': etag})
+    assert r.status_code == 304, f"expected 304, got {r.status_code}"
+
+    r = api('DELETE', f'/api/v1/tables/{table_id}', TOKEN)
+    assert r.status_code == 200, r.text
+    new_id = create_table_with_row(TOKEN, "ETagTest")
+    assert new_id == table_id, f"id not reused ({new_id} != {table_id}), test inconclusive"
+    r = api('GET', f'/api/v1/tables/{new_id}/data', TOKEN, headers={'If-None-Match': etag})
+    assert r.status_code == 200, f"stale ETag matched recreated table: {r.status_code}"
+    api('DELETE', f'/api/v1/tables/{new_id}', TOKEN)
+
+def test_box_recreated_with_same_id():
+    r = api('POST', '/api/v1/cryo-tanks', TOKEN, json={"name": "ETagTank"})
+    tank_id = r.json()['data']['id']
+    r = api('POST', f'/api/v1/cryo-tanks/{tank_id}/boxes', TOKEN, json={"box_name": "B1"})
+    box_id = r.json()['data']['id']
+    r = api('GET', f'/api/v1/cryo-boxes/{box_id}/grid', TOKEN)
+    etag = r.headers.get('ETag')
+    assert r.status_code == 200 and etag, f"missing ETag: {r.status_code}"
+
+    api('DELETE', f'/api/v1/cryo-boxes/{box_id}', TOKEN)
+    r = api('POST', f'/api/v1/cryo-tanks/{tank_id}/boxes', TOKEN, json={"box_name": "B1"})
+    new_id = r.json()['data']['id']
+    assert new_id == box_id, f"id not reused ({new_id} != {box_id}), test inconclusive"
+    r = api('GET', f'/api/v1/cryo-boxes/{new_id}/grid', TOKEN, headers={'If-None-Match': etag})
+    assert r.status_code == 200, f"stale ETag matched recreated box: {r.status_code}"
+    api('DELETE', f'/api/v1/cryo-tanks/{tank_id}', TOKEN)
+
+print("\n[ETag]")
+TOKEN = login()
+test("table delete -> recreate does not return 304", test_table_recreated_with_same_id)
+test("cryo box delete -> recreate does not return 304", test_box_recreated_with_same_id)
+
+print(f"\n  {passed} passed, {failed} failed")
+sys.exit(1 if failed else 0)
@@ -30,18 +30,49 @@ axios.interceptors.request.use(
   }
 )
 
+// 使用刷新令牌换取新的访问令牌，多个请求同时过期时只刷新一次
+let refreshPromise = null
+const refreshAccessToken = () => {
+  const refreshToken = localStorage.getItem('refresh_token')
+  if (!refreshToken) return Promise.reject(new Error('no refresh token'))
+  if (!refreshPromise) {
+    refreshPromise = axios.post('/api/v1/auth/refresh', { refresh_token: refreshToken })
+      .then(response => {
+        localStorage.setItem('token', response.data.data.token)
+        localStorage.setItem('refresh_token', response.data.data.refresh_token)
+        return response.data.data.token
+      })
+      .finally(() => {
+        refreshPromise = null
+      })
+  }
+  return refreshPromise
+}
+
 // 配置axios响应拦截器
 axios.interceptors.response.use(
   response => response,
-  error => {
+  async error => {
     // 检查是否是登录API的401错误，如果是则不处理，让登录组件自己处理
     if (error.response && error.response.status === 401) {
-      // 检查请求URL是否是登录API
-      const isLoginRequest = error.config.url === '/api/v1/auth/login'
+      // 检查请求URL是否是登录/刷新API
+      const isAuthRequest = ['/api/v1/auth/login', '/api/v1/auth/refresh'].includes(error.config.url)
       
-      if (!isLoginRequest) {
+      if (!isAuthRequest) {
+        // 访问令牌过期时先尝试刷新，成功后重试原请求
+        if (!error.config._retried && localStorage.getItem('refresh_token')) {
+          try {
+            const token = await refreshAccessToken()
+            error.config._retried = true
+            error.config.headers.Authorization = `Bearer ${token}`
+            return axios(error.config)
+          } catch (refreshError) {
+            // 刷新失败，按登录过期处理
+          }
+        }
         // 非登录请求的401错误，处理为登录过期
         localStorage.removeItem('token')
+        localStorage.removeItem('refresh_token')
         localStorage.removeItem('user')
         window.location.href = '/login'
         message.error('登录已过期，请重新登录')
@@ -105,6 +136,9 @@ const Login = ({ setIsLoggedIn, t }) => {
           console.log('=== 正常登录流程 ===')
           // 正常登录流程
           localStorage.setItem('token', response.data.data.token)
+          if (response.data.data.refresh_token) {
+            localStorage.setItem('refresh_token', response.data.data.refresh_token)
+          }
           localStorage.setItem('user', JSON.stringify(response.data.data.user))
           setIsLoggedIn(true)
           console.log('准备显示成功提示: 登录成功')
@@ -257,7 +291,13 @@ const MainLayout = ({ isLoggedIn, setIsLoggedIn, t, lang, changeLang }) => {
   }, [])
 
   const handleLogout = () => {
+    // 撤销服务端的刷新令牌，失败不影响本地退出
+    const refreshToken = localStorage.getItem('refresh_token')
+    if (refreshToken) {
+      axios.post('/api/v1/auth/logout', { refresh_token: refreshToken }).catch(() => {})
+    }
     localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
     localStorage.removeItem('user')
     setIsLoggedIn(false)
     navigate('/login')
@@ -251,17 +251,18 @@ const CryoGrid = () => {
     if (dragSelected.size === 0) return
 
     const cellsToClear = []
-    const linkedRows = new Map() // key: "tableId,dataId" → {table_id, data_id, positions: [...]}
+    const linkedRows = new Map() // key: tableId → [dataId, ...]
     dragSelected.forEach(key => {
       const [r, c] = key.split(',').map(Number)
       const cell = gridData?.grid?.[r - 1]?.[c - 1]
       if (cell) {
         cellsToClear.push({ row: r, col: c, cell })
         if (cell.linked_table_id && cell.linked_data_id) {
-          const lk = `${cell.linked_table_id},${cell.linked_data_id}`
-          if (!linkedRows.has(lk)) {
-            linkedRows.set(lk, { table_id: cell.linked_table_id, data_id: cell.linked_data_id })
+          const dataIds = linkedRows.get(cell.linked_table_id) || []
+          if (!dataIds.includes(cell.linked_data_id)) {
+            dataIds.push(cell.linked_data_id)
           }
+          linkedRows.set(cell.linked_table_id, dataIds)
         }
       }
     })
@@ -271,29 +272,31 @@ const CryoGrid = () => {
       return
     }
 
-    // Check linked rows for last-position warnings
+    // Check linked rows for last-position warnings (one bulk fetch per table)
     const solePositionWarnings = []
-    for (const [, info] of linkedRows) {
+    for (const [tableId, dataIds] of linkedRows) {
       try {
-        const resp = await axios.get(`/api/v1/tables/${info.table_id}/data/${info.data_id}`)
+        const resp = await axios.post(`/api/v1/tables/${tableId}/data/fetch`, { ids: dataIds })
         if (resp.data.code === 200) {
-          const rowData = resp.data.data.data
-          // Find storage columns and count remaining positions
-          for (const [colName, val] of Object.entries(rowData)) {
-            if (typeof val === 'object' && val._storage && val._positions) {
-              // Count how many of these positions are being cleared
-              const remainingAfterClear = val._positions.filter(p => {
-                const key = `${p.row},${p.col}`
-                return !dragSelected.has(key)
-              })
-              if (val._positions.length > 0 && remainingAfterClear.length === 0) {
-                solePositionWarnings.push({
-                  table_name: resp.data.data.table_name || `Table ${info.table_id}`,
-                  col_name: colName,
-                  positions: val._positions,
-                  data_id: info.data_id,
-                  table_id: info.table_id
+          const tableName = resp.data.data.table_name || `Table ${tableId}`
+          for (const item of resp.data.data.items) {
+            // Find storage columns and count remaining positions
+            for (const [colName, val] of Object.entries(item.data)) {
+              if (val && typeof val === 'object' && val._storage && val._positions) {
+                // Count how many of these positions are being cleared
+                const remainingAfterClear = val._positions.filter(p => {
+                  const key = `${p.row},${p.col}`
+                  return !dragSelected.has(key)
                 })
+                if (val._positions.length > 0 && remainingAfterClear.length === 0) {
+                  solePositionWarnings.push({
+                    table_name: tableName,
+                    col_name: colName,
+                    positions: val._positions,
+                    data_id: item.id,
+                    table_id: tableId
+                  })
+                }
               }
             }
           }
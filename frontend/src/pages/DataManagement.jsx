@@ -7,6 +7,9 @@ import { TableContext } from '../App'
 import MultiSelectDelete from '../components/MultiSelectDelete'
 import StoragePositionPicker from './StoragePositionPicker'
 
+// 聚合模式下展开分组时每页加载的原始记录数
+const AGGREGATE_CHILDREN_PAGE_SIZE = 50
+
 const DataManagement = () => {
   const tableContext = useContext(TableContext);
   const tables = tableContext?.tables || [];
@@ -42,6 +45,11 @@ const DataManagement = () => {
   // 聚合/归类模式
   const [aggregateMode, setAggregateMode] = useState(false)
   const [aggregateColumn, setAggregateColumn] = useState('')
+  const [aggregateGroups, setAggregateGroups] = useState([])
+  const [aggregateTotal, setAggregateTotal] = useState(0)
+  const [aggregateLoading, setAggregateLoading] = useState(false)
+  // 各分组已加载的原始记录 {分组行id: {items, total, page, loading}}
+  const [aggregateChildren, setAggregateChildren] = useState({})
   
   // 复制行相关状态
   const [copiedOriginalData, setCopiedOriginalData] = useState(null)
@@ -78,27 +86,91 @@ const DataManagement = () => {
 
   const getAggregateSettingKey = (tableId) => `aggregate_settings_${tableId}`
   const getPageSizeSettingKey = () => 'page_size_setting_global'
-  const loadAggregateSource = async () => {
-    if (!selectedTable) return []
+  // 聚合模式：分组在后端完成，这里只加载当前页的分组
+  const loadAggregateGroups = async () => {
+    if (!selectedTable || !aggregateColumn) return
+
+    setAggregateLoading(true)
+    try {
+      const params = {
+        column: aggregateColumn,
+        page,
+        per_page: pageSize
+      }
+      if (currentSearchText) {
+        params.search = currentSearchText
+      }
+      const response = await axios.get(`/api/v1/tables/${selectedTable.id}/data/groups`, { params })
+      if (response.data.code === 200) {
+        const groups = (response.data.data.items || []).map(group => {
+          const groupKey = group.key || '(空)'
+          return {
+            id: `agg-${groupKey}`,
+            _aggregate: true,
+            _aggregateKey: groupKey,
+            _groupValue: group.key,
+            _count: group.count,
+            _storageCount: group.storage_count,
+            data: { ...(group.latest?.data || {}) }
+          }
+        })
+        setAggregateGroups(groups)
+        setAggregateTotal(response.data.data.total || 0)
+        // 分组数据变化后，展开行的原始记录需要重新加载
+        setAggregateChildren({})
+      } else {
+        message.error(response.data.message)
+        setAggregateGroups([])
+        setAggregateTotal(0)
+      }
+    } catch (error) {
+      message.error('获取聚合数据失败')
+      console.error('Load aggregate groups failed:', error)
+      setAggregateGroups([])
+      setAggregateTotal(0)
+    } finally {
+      setAggregateLoading(false)
+    }
+  }
 
-    const allItems = []
-    let currentPage = 1
-    let totalCount = 0
-    const perPage = 100
+  // 按需加载某个分组的原始记录（展开时加载，支持分页）
+  const loadAggregateChildren = async (record, childPage = 1) => {
+    if (!selectedTable || !aggregateColumn || !record?._aggregate) return
 
-    do {
-      const response = await axios.get(`/api/v1/tables/${selectedTable.id}/data`, {
-        params: { page: currentPage, per_page: perPage }
+    setAggregateChildren(prev => ({
+      ...prev,
+      [record.id]: { ...(prev[record.id] || { items: [], total: 0 }), page: childPage, loading: true }
+    }))
+    try {
+      const response = await axios.get(`/api/v1/tables/${selectedTable.id}/data/groups/items`, {
+        params: {
+          column: aggregateColumn,
+          key: record._groupValue,
+          page: childPage,
+          per_page: AGGREGATE_CHILDREN_PAGE_SIZE
+        }
       })
-      if (response.data.code !== 200) break
-      const items = response.data.data.items || []
-      totalCount = response.data.data.total || 0
-      allItems.push(...items)
-      currentPage += 1
-      if (items.length === 0) break
-    } while (allItems.length < totalCount)
-
-    return allItems
+      if (response.data.code === 200) {
+        setAggregateChildren(prev => ({
+          ...prev,
+          [record.id]: {
+            items: response.data.data.items || [],
+            total: response.data.data.total || 0,
+            page: childPage,
+            loading: false
+          }
+        }))
+      } else {
+        message.error(response.data.message)
+      }
+    } catch (error) {
+      message.error('获取分组记录失败')
+      console.error('Load aggregate children failed:', error)
+      setAggregateChildren(prev => ({
+        ...prev,
+        [record.id]: { ...(prev[record.id] || { items: [], total: 0 }), loading: false }
+      }))
+    }
   }
   
   // 获取当前表格的搜索状态
@@ -346,29 +418,8 @@ const DataManagement = () => {
     if (!selectedTable) return
 
     if (aggregateMode && aggregateColumn) {
-      const allItems = await loadAggregateSource()
-      setAggregateAllData(allItems)
-
-      if (currentSearchText) {
-        const keyword = currentSearchText.trim()
-        const grouped = buildFilteredAggregatedData(allItems, keyword)
-        setCurrentSearchState({
-          searchResults: grouped,
-          isSearching: true,
-          searchCount: grouped.length,
-          highlightedText: keyword
-        })
-        setTotal(grouped.length)
-      } else {
-        setCurrentSearchState({
-          searchText: '',
-          searchResults: [],
-          isSearching: false,
-          searchCount: 0,
-          highlightedText: ''
-        })
-        setTotal(allItems.length)
-      }
+      // 只重新加载当前页的分组，不再拉取整张表
+      await loadAggregateGroups()
       return
     }
 
@@ -835,9 +886,22 @@ const DataManagement = () => {
           }
         })
         
-        // 编辑模式
-        response = await axios.put(`/api/v1/tables/${selectedTable.id}/data/${currentData.id}`, {
-          data: submitData
+        // 编辑模式：只提交有变化的字段（JSON merge-patch，null 表示删除该字段）
+        const patchData = {}
+        const patchKeys = new Set([...Object.keys(submitData), ...Object.keys(currentData.data || {})])
+        patchKeys.forEach(key => {
+          const oldValue = currentData.data?.[key]
+          const newValue = submitData[key] === undefined ? null : submitData[key]
+          if (newValue === null) {
+            if (oldValue !== undefined && oldValue !== null) {
+              patchData[key] = null
+            }
+          } else if (JSON.stringify(newValue) !== JSON.stringify(oldValue)) {
+            patchData[key] = newValue
+          }
+        })
+        response = await axios.patch(`/api/v1/tables/${selectedTable.id}/data/${currentData.id}`, {
+          data: patchData
         })
       } else {
         // 复制模式或添加模式
@@ -949,16 +1013,12 @@ const DataManagement = () => {
       const keyword = currentState.searchText.trim()
 
       if (aggregateMode && aggregateColumn) {
-        const source = aggregateAllData.length > 0 ? aggregateAllData : await loadAggregateSource()
-        const grouped = buildFilteredAggregatedData(source, keyword)
+        // 聚合模式的搜索由后端完成，更新关键词后由effect重新加载分组
         setCurrentSearchState({
-          searchResults: grouped,
-          isSearching: true,
-          searchCount: grouped.length,
+          isSearching: false,
           highlightedText: keyword
         })
         setCurrentSearchText(keyword)
-        setTotal(grouped.length)
         setPage(1)
       } else {
         // 调用后端API进行搜索，支持分页
@@ -1652,126 +1712,36 @@ const DataManagement = () => {
     return selectedTable.columns.filter(col => !col.is_storage && !col.autoIncrement)
   }
 
-  const buildAggregatedData = (source = []) => {
-    if (!aggregateMode || !aggregateColumn) return source
-
-    const groups = new Map()
-    source.forEach(record => {
-      const raw = record?.data?.[aggregateColumn]
-      const key = typeof raw === 'object' && raw !== null
-        ? (raw._text !== undefined ? raw._text : JSON.stringify(raw))
-        : String(raw ?? '')
-      const groupKey = key.trim() || '(空)'
-      if (!groups.has(groupKey)) {
-        groups.set(groupKey, {
-          id: `agg-${groupKey}`,
-          _aggregate: true,
-          _aggregateKey: groupKey,
-          _children: [],
-          _count: 0,
-          _storageCount: 0,
-          data: { ...(record.data || {}) }
-        })
-      }
-      const group = groups.get(groupKey)
-      group._children.push(record)
-      group._count += 1
-      group.data[aggregateColumn] = raw
-      const storageCount = Object.values(record.data || {}).reduce((sum, value) => {
-        if (typeof value === 'object' && value !== null && value._storage) {
-          return sum + (Array.isArray(value._positions) ? value._positions.length : 0)
-        }
-        return sum
-      }, 0)
-      group._storageCount += storageCount
-    })
-
-    return Array.from(groups.values()).map(group => ({
-      ...group,
-      _children: group._children
-    }))
-  }
-
-  const getRecordSearchText = (record) => {
-    const values = Object.values(record?.data || {})
-    return values.map(value => {
-      if (typeof value === 'object' && value !== null) {
-        if (value._text !== undefined) return String(value._text ?? '')
-        return JSON.stringify(value)
-      }
-      return String(value ?? '')
-    }).join(' ')
-  }
-
-  const buildFilteredAggregatedData = (source = [], keyword = '') => {
-    const grouped = buildAggregatedData(source)
-    const trimmedKeyword = keyword.trim()
-    if (!trimmedKeyword) return grouped
-
-    let matcher = null
-    try {
-      matcher = new RegExp(trimmedKeyword, 'i')
-    } catch (error) {
-      matcher = null
-    }
-
-    return grouped.filter(group => {
-      const groupText = getRecordSearchText({ data: group.data })
-      const groupMatches = matcher
-        ? matcher.test(groupText)
-        : groupText.toLowerCase().includes(trimmedKeyword.toLowerCase())
-
-      if (groupMatches) return true
-
-      return Array.isArray(group._children) && group._children.some(child => {
-        const childText = getRecordSearchText(child)
-        return matcher
-          ? matcher.test(childText)
-          : childText.toLowerCase().includes(trimmedKeyword.toLowerCase())
-      })
-    })
-  }
-
-  const [aggregateAllData, setAggregateAllData] = useState([])
-  const [aggregateAllLoading, setAggregateAllLoading] = useState(false)
-
   useEffect(() => {
-    const loadAllForAggregate = async () => {
-      if (!aggregateMode || !aggregateColumn || !selectedTable) return
-      setAggregateAllLoading(true)
-      try {
-        const allItems = await loadAggregateSource()
-        setAggregateAllData(allItems)
-      } catch (error) {
-        console.error('Load all data for aggregate failed:', error)
-      } finally {
-        setAggregateAllLoading(false)
-      }
-    }
+    if (!aggregateMode || !aggregateColumn || !selectedTable) return
+    loadAggregateGroups()
+  }, [aggregateMode, aggregateColumn, selectedTable, page, pageSize, currentSearchText])
 
-    loadAllForAggregate()
-  }, [aggregateMode, aggregateColumn, selectedTable])
+  // 已展开的分组在分组数据刷新后重新加载原始记录
+  useEffect(() => {
+    if (!aggregateMode || !aggregateColumn) return
+    aggregateGroups
+      .filter(group => expandedRowKeys.includes(group.id) && !aggregateChildren[group.id])
+      .forEach(group => loadAggregateChildren(group))
+  }, [aggregateGroups, expandedRowKeys, aggregateChildren])
 
   const getDisplayData = () => {
-    const source = aggregateMode && aggregateColumn
-      ? (getCurrentSearchState().isSearching ? getCurrentSearchState().searchResults : aggregateAllData)
-      : (getCurrentSearchState().isSearching ? getCurrentSearchState().searchResults : dataList)
-    if (!aggregateMode || !aggregateColumn) return source
-    return getCurrentSearchState().isSearching ? source : buildAggregatedData(source)
+    if (aggregateMode && aggregateColumn) return aggregateGroups
+    return getCurrentSearchState().isSearching ? getCurrentSearchState().searchResults : dataList
   }
 
   const displayData = getDisplayData()
   const displayTotal = aggregateMode && aggregateColumn
-    ? displayData.length
+    ? aggregateTotal
     : (getCurrentSearchState().isSearching ? getCurrentSearchState().searchCount : total)
 
   const getAggregateExpandedRows = (record) => {
-    if (!record?._aggregate || !Array.isArray(record._children)) return null
-    const rows = record._children
+    if (!record?._aggregate) return null
+    const children = aggregateChildren[record.id] || { items: [], total: record._count, page: 1, loading: true }
     return (
       <div style={{ padding: '12px 16px', background: '#fafafa', border: '1px solid #e8e8e8', borderTop: 'none' }}>
         <div style={{ marginBottom: 8, color: '#333', fontWeight: 600 }}>
-          同组原始记录，共 {rows.length} 条
+          同组原始记录，共 {children.total} 条
         </div>
         <div style={{ marginBottom: 12, color: '#888', fontSize: 12 }}>
           点击左侧展开箭头查看这一组的原始数据行
@@ -1779,13 +1749,19 @@ const DataManagement = () => {
         <MultiSelectDelete
           columns={generateColumns(true).visibleColumns}
           hiddenColumns={generateColumns(true).hiddenColumns}
-          dataSource={rows}
+          dataSource={children.items}
           rowKey="id"
           showSelectionColumn={true}
-          loading={false}
+          loading={!!children.loading}
           deleteLoading={deleteLoading}
           onDelete={handleDelete}
-          pagination={false}
+          pagination={children.total > AGGREGATE_CHILDREN_PAGE_SIZE ? {
+            current: children.page,
+            pageSize: AGGREGATE_CHILDREN_PAGE_SIZE,
+            total: children.total,
+            onChange: (childPage) => loadAggregateChildren(record, childPage),
+            showSizeChanger: false
+          } : false}
           expandable={{}}
           highlightedRowId={highlightedRowId}
         />
@@ -2206,15 +2182,18 @@ const DataManagement = () => {
               value: col.column_name,
               label: col.column_name
             }))}
-            onChange={setAggregateColumn}
+            onChange={(value) => {
+              setAggregateColumn(value || '')
+              setPage(1)
+            }}
             allowClear
           />
           <div style={{ color: '#888', fontSize: 12 }}>
             打开后，相同依据列值会合并为一行，展开可查看同组全部原始记录
           </div>
-          {aggregateMode && aggregateColumn && aggregateAllLoading && (
+          {aggregateMode && aggregateColumn && aggregateLoading && (
             <div style={{ color: '#1890ff', fontSize: 12 }}>
-              正在加载全部数据用于全局聚合...
+              正在加载聚合数据...
             </div>
           )}
         </div>
@@ -2236,7 +2215,7 @@ const DataManagement = () => {
             请从左侧菜单选择一个表格来管理数据
           </div>
         </Card>
-      ) : (loading || (aggregateMode && aggregateColumn && aggregateAllLoading)) ? (
+      ) : (loading || (aggregateMode && aggregateColumn && aggregateLoading)) ? (
         <Card
           style={{ 
             textAlign: 'center', 
@@ -2297,7 +2276,7 @@ const DataManagement = () => {
                 dataSource={displayData}
                 rowKey="id"
                 showSelectionColumn={!aggregateMode || !aggregateColumn}
-                loading={loading || aggregateAllLoading}
+                loading={loading || aggregateLoading}
                 deleteLoading={deleteLoading}
                 onDelete={handleDelete}
                 pagination={{
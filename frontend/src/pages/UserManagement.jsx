@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import { Table, Button, Modal, Form, Input, Select, message } from 'antd'
-import { PlusOutlined, DeleteOutlined } from '@ant-design/icons'
+import { PlusOutlined, DeleteOutlined, UsergroupAddOutlined } from '@ant-design/icons'
 import axios from 'axios'
 
 const { Option } = Select
@@ -11,6 +11,9 @@ const UserManagement = () => {
   const [form] = Form.useForm()
   const [loading, setLoading] = useState(false)
   const [deletingId, setDeletingId] = useState(null)
+  const [isBatchModalVisible, setIsBatchModalVisible] = useState(false)
+  const [batchForm] = Form.useForm()
+  const [batchSubmitting, setBatchSubmitting] = useState(false)
 
   // 获取用户列表
   const fetchUsers = async () => {
@@ -69,6 +72,56 @@ const UserManagement = () => {
     }
   }
 
+  // 显示批量添加用户模态框
+  const showBatchModal = () => {
+    batchForm.resetFields()
+    setIsBatchModalVisible(true)
+  }
+
+  // 批量添加用户：每行一个用户名，统一角色；不提供密码，后端使用默认密码，首次登录时要求修改
+  const handleBatchAddUsers = async (values) => {
+    const usernames = values.usernames
+      .split('\n')
+      .map(name => name.trim())
+      .filter(Boolean)
+    if (usernames.length === 0) {
+      message.warning('请输入用户名')
+      return
+    }
+    setBatchSubmitting(true)
+    try {
+      const response = await axios.post('/api/v1/users/batch', {
+        users: usernames.map(username => ({ username, role: values.role }))
+      })
+      if (response.data.code === 200) {
+        const { error_count: errorCount, results } = response.data.data
+        if (errorCount > 0) {
+          Modal.warning({
+            title: response.data.message,
+            content: (
+              <div>
+                {results.filter(item => !item.success).map(item => (
+                  <div key={item.index}>{item.username || `第${item.index + 1}行`}：{item.message}</div>
+                ))}
+              </div>
+            )
+          })
+        } else {
+          message.success(response.data.message)
+        }
+        setIsBatchModalVisible(false)
+        fetchUsers() // 刷新用户列表
+      } else {
+        message.error(response.data.message)
+      }
+    } catch (error) {
+      console.error('批量添加用户失败:', error)
+      message.error(error.response?.data?.message || '批量添加用户失败')
+    } finally {
+      setBatchSubmitting(false)
+    }
+  }
+
   // 删除用户
   const handleDeleteUser = async (userId) => {
     try {
@@ -152,13 +205,22 @@ const UserManagement = () => {
     <div>
       <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: 16 }}>
         <h2>用户管理</h2>
-        <Button
-          type="primary"
-          icon={<PlusOutlined />}
-          onClick={showAddModal}
-        >
-          添加用户
-        </Button>
+        <div>
+          <Button
+            icon={<UsergroupAddOutlined />}
+            onClick={showBatchModal}
+            style={{ marginRight: 8 }}
+          >
+            批量添加
+          </Button>
+          <Button
+            type="primary"
+            icon={<PlusOutlined />}
+            onClick={showAddModal}
+          >
+            添加用户
+          </Button>
+        </div>
       </div>
 
       <Table
@@ -211,6 +273,50 @@ const UserManagement = () => {
           </Form.Item>
         </Form>
       </Modal>
+
+      {/* 批量添加用户模态框 */}
+      <Modal
+        title="批量添加用户"
+        open={isBatchModalVisible}
+        onCancel={() => setIsBatchModalVisible(false)}
+        footer={null}
+      >
+        <Form
+          form={batchForm}
+          layout="vertical"
+          onFinish={handleBatchAddUsers}
+        >
+          <Form.Item
+            name="usernames"
+            label="用户名（每行一个）"
+            rules={[{ required: true, message: '请输入用户名' }]}
+            extra="初始密码为默认密码 000000，用户首次登录时需要修改密码"
+          >
+            <Input.TextArea rows={8} placeholder={'student01\nstudent02\nstudent03'} />
+          </Form.Item>
+
+          <Form.Item
+            name="role"
+            label="角色"
+            rules={[{ required: true, message: '请选择角色' }]}
+          >
+            <Select placeholder="请选择角色">
+              <Option value="admin">管理员</Option>
+              <Option value="leader">组长</Option>
+              <Option value="member">组员</Option>
+            </Select>
+          </Form.Item>
+
+          <Form.Item style={{ display: 'flex', justifyContent: 'flex-end', marginTop: 24 }}>
+            <Button onClick={() => setIsBatchModalVisible(false)} style={{ marginRight: 8 }}>
+              取消
+            </Button>
+            <Button type="primary" htmlType="submit" loading={batchSubmitting}>
+              添加
+            </Button>
+          </Form.Item>
+        </Form>
+      </Modal>
     </div>
   )
 }